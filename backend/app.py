@@ -1,10 +1,19 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import requests
 import os
+import hashlib
 import json
 import re
-from datetime import datetime, timedelta
+import threading
+import time
+import uuid
+import atexit
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from textblob import TextBlob
 import openai
@@ -17,6 +26,29 @@ except ImportError:
     print("Warning: scikit-learn not available, some features may be limited")
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
+from shared_cache import SharedCache
+from semantic_cache import SemanticCache
+from rooms import RoomRegistry, room_key, sse_stream
+from prefetch import Prefetcher
+from jobs import JobManager
+from http_cache import compress, data_etag, is_not_modified, project_articles
+from cassette import Cassette, CassetteMiss
+from conversation import ConversationStats, default_plan, parse_message, parse_plan
+from trending import TrendEngine
+from fulltext import FullTextFetcher
+from snapshots import SnapshotStore, snapshot_name
+from summarizer import summarize_batch
+from changelog import ChangeLog
+from warm_state import WarmState
+import deadlines
+from deadlines import DeadlineExceeded
+from articles import ArticleRecord, fallback_summary, json_default
+from profiling import RequestProfiler, StackSampler, sampled
+from prompts import article_text, build_prompt, count_tokens, fit_articles, fit_text, prompt_stats
+from llm_scheduler import (
+    LLMQueueFull, LLMScheduler, lowered,
+    PRIORITY_CHAT, PRIORITY_CONVERSATION, PRIORITY_SUMMARY
+)
 
 # Download required NLTK data
 try:
@@ -29,7 +61,17 @@ except LookupError:
 # Load environment variables
 load_dotenv()
 
+class PlazaJSONProvider(DefaultJSONProvider):
+    """Serializes article records to their API dict shape."""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, ArticleRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = PlazaJSONProvider(app)
 CORS(app)
 
 # API Keys
@@ -41,8 +83,109 @@ ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 openai.api_key = OPENAI_API_KEY
 anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
 
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+# Record/replay of NewsAPI and LLM responses for offline profiling
+upstream_cassette = Cassette(
+    mode=os.getenv('PLAZA_CASSETTE_MODE', 'off'),
+    directory=os.getenv('PLAZA_CASSETTE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')),
+    latency_scale=float(os.getenv('PLAZA_CASSETTE_LATENCY_SCALE', '1.0'))
+)
+
+# Fixed seed so persona and name choices (and therefore prompts) repeat between runs
+if os.getenv('PLAZA_RANDOM_SEED'):
+    import random
+    random.seed(int(os.getenv('PLAZA_RANDOM_SEED')))
+
+# LLM rate limits per provider (requests/tokens per minute, unset = unlimited)
+llm_scheduler = LLMScheduler(
+    limits={
+        # Concurrency is capped by default, so a queue (and priority order) forms under load without rate limits
+        'openai': {'rpm': _env_int('OPENAI_RPM'), 'tpm': _env_int('OPENAI_TPM'),
+                   'concurrency': _env_int('OPENAI_CONCURRENCY', 8)},
+        'anthropic': {'rpm': _env_int('ANTHROPIC_RPM'), 'tpm': _env_int('ANTHROPIC_TPM'),
+                      'concurrency': _env_int('ANTHROPIC_CONCURRENCY', 8)}
+    },
+    max_queue_depth=_env_int('LLM_MAX_QUEUE_DEPTH', 50)
+)
+
+# Cache shared by all worker processes (SQLite in WAL mode)
+CACHE_PATH = os.getenv('PLAZA_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'plaza.sqlite3'))
+topic_articles_cache = SharedCache(CACHE_PATH, 'topic_articles', ttl_seconds=_env_int('NEWS_CACHE_TTL', 600), max_entries=200)
+summary_cache = SharedCache(CACHE_PATH, 'summaries', ttl_seconds=_env_int('SUMMARY_CACHE_TTL', 86400), max_entries=50000)
+news_cache = SharedCache(CACHE_PATH, 'news', ttl_seconds=_env_int('NEWS_CACHE_TTL', 600), max_entries=200)
+
+# Append-only log of new and changed /api/news articles, for `since=<cursor>` polling
+news_changes = ChangeLog(CACHE_PATH, max_entries=_env_int('NEWS_CHANGELOG_MAX', 20000))
+
+# Server-side chat sessions (keyed by subtopic and session ID)
+CHAT_SESSION_HISTORY = 6  # Messages kept per session for prompt context
+chat_sessions = SharedCache(
+    CACHE_PATH, 'chat_sessions',
+    ttl_seconds=_env_int('CHAT_SESSION_TTL', 1800),
+    max_entries=_env_int('CHAT_SESSION_MAX', 5000)
+)
+
+# Similarity-based answer cache for /api/chat
+chat_answer_cache = SemanticCache(
+    threshold=float(os.getenv('CHAT_CACHE_THRESHOLD', '0.8')),
+    max_entries=_env_int('CHAT_CACHE_MAX', 5000),
+    variant_rate=float(os.getenv('CHAT_CACHE_VARIANT_RATE', '0.25')),
+    ttl_seconds=_env_int('CHAT_CACHE_TTL', 3600)
+)
+
+# Token budgets for the article context in each kind of prompt
+SUMMARY_CONTEXT_TOKENS = _env_int('SUMMARY_CONTEXT_TOKENS', 700)
+CONVERSATION_CONTEXT_TOKENS = _env_int('CONVERSATION_CONTEXT_TOKENS', 600)
+CHAT_CONTEXT_TOKENS = _env_int('CHAT_CONTEXT_TOKENS', 200)
+
+# Conversation generation: 'single' (one completion) or 'parallel' (plan, then one call per message)
+CONVERSATION_MODE = os.getenv('CONVERSATION_MODE', 'single')
+CONVERSATION_MESSAGE_RETRIES = _env_int('CONVERSATION_MESSAGE_RETRIES', 1)
+conversation_executor = ThreadPoolExecutor(max_workers=_env_int('CONVERSATION_PARALLELISM', 8), thread_name_prefix='conversation')
+conversation_stats = ConversationStats()
+
+# Sliding-window keyword/entity counts over ingested articles for /api/trending. Articles are
+# bucketed by publish time, so the window covers the 7 days fetch_news_articles asks for
+trend_engine = TrendEngine(
+    bucket_seconds=_env_int('TRENDING_BUCKET_SECONDS', 3600),
+    buckets=_env_int('TRENDING_BUCKETS', 168),
+    recent_buckets=_env_int('TRENDING_RECENT_BUCKETS', 3)
+)
+
+# Full article text for enrichment (NewsAPI truncates `content` to ~200 chars); opt-in
+FULLTEXT_BUDGET_SECONDS = float(os.getenv('FULLTEXT_BUDGET_SECONDS', '8'))
+article_text_cache = SharedCache(CACHE_PATH, 'article_text', ttl_seconds=_env_int('FULLTEXT_CACHE_TTL', 604800), max_entries=20000)
+fulltext_fetcher = FullTextFetcher(
+    article_text_cache,
+    max_workers=_env_int('FULLTEXT_WORKERS', 16),
+    per_host=_env_int('FULLTEXT_PER_HOST', 2),
+    fresh_seconds=_env_int('FULLTEXT_FRESH_SECONDS', 21600),
+    wrap=lambda url, fn: upstream_cassette.call('article', {'url': url}, fn)
+) if os.getenv('FULLTEXT_FETCH', 'off') == 'on' else None
+
+# Latency budgets per endpoint (seconds, 0 = none). Every stage below gets what is left, and
+# responses cut short are marked `partial`
+REQUEST_BUDGETS = {
+    'get_news': float(os.getenv('NEWS_BUDGET_SECONDS', '20')),
+    'get_topic_data': float(os.getenv('TOPIC_BUDGET_SECONDS', '30')),
+    'get_subtopics': float(os.getenv('SUBTOPICS_BUDGET_SECONDS', '20')),
+    'get_subtopic_data': float(os.getenv('SUBTOPIC_BUDGET_SECONDS', '30'))
+}
+NEWS_API_TIMEOUT = (3.05, float(os.getenv('NEWS_API_TIMEOUT', '10')))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+# LLM summaries stop when less than this is left, keeping time for the conversation
+SUMMARY_DEADLINE_RESERVE = float(os.getenv('SUMMARY_DEADLINE_RESERVE', '8'))
+partial_responses = Counter()
+
+# Models (OpenAI prefix caching needs gpt-4o or newer)
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+ANTHROPIC_MODEL = os.getenv('ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
+
 # NewsAPI configuration
-NEWS_API_URL = 'https://newsapi.org/v2/everything'
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/everything')
 
 # Initialize bias detection model (optional - requires transformers)
 try:
@@ -161,6 +304,117 @@ TOPIC_KEYWORDS = {
     ]
 }
 
+def _usage_value(usage, name):
+    """Read a usage field from an SDK object or a plain dict (older SDKs keep unknown fields as dicts)."""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(name)
+    return getattr(usage, name, None)
+
+def _record_llm_usage(site, result, seconds):
+    if result.get('input_tokens') is not None:
+        prompt_stats.record_usage(
+            site, result['input_tokens'], result.get('cached_tokens'),
+            result.get('cache_write_tokens'), seconds
+        )
+
+def openai_complete(prompt, max_tokens, temperature, priority, system='', site='other'):
+    """Run an OpenAI chat completion through the LLM scheduler and return the text.
+    
+    The static `system` prompt goes first so OpenAI's automatic prefix
+    caching can reuse it between calls.
+    """
+    estimate = count_tokens(system) + count_tokens(prompt) + max_tokens
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    request_data = {'model': OPENAI_MODEL, 'system': system, 'prompt': prompt,
+                    'max_tokens': max_tokens, 'temperature': temperature}
+    
+    def call():
+        response = openai.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=deadlines.timeout(LLM_TIMEOUT_SECONDS)
+        )
+        usage = response.usage
+        return {
+            'text': response.choices[0].message.content,
+            'input_tokens': usage.prompt_tokens if usage else None,
+            'output_tokens': usage.completion_tokens if usage else None,
+            'cached_tokens': _usage_value(_usage_value(usage, 'prompt_tokens_details'), 'cached_tokens') or 0
+        }
+    
+    def timed_call():
+        started = time.monotonic()
+        result = upstream_cassette.call('openai', request_data, call)
+        _record_llm_usage(site, result, time.monotonic() - started)
+        return result
+    
+    try:
+        result = llm_scheduler.run('openai', priority, timed_call, tokens=estimate, timeout=deadlines.remaining())
+    except Exception as e:
+        # Waited or called until the request ran out of time, or a speculative call was shed
+        if deadlines.expired() or (isinstance(e, LLMQueueFull) and lowered()):
+            deadlines.mark_partial(site)
+        raise
+    if result['input_tokens'] is not None:
+        llm_scheduler.refund('openai', estimate - result['input_tokens'] - result['output_tokens'])
+    return result['text'].strip()
+
+def anthropic_complete(prompt, max_tokens, priority, system='', site='other'):
+    """Run an Anthropic message call through the LLM scheduler and return the text.
+    
+    The static `system` prompt is marked as a cache breakpoint so repeated
+    calls read it from Anthropic's prompt cache.
+    """
+    estimate = count_tokens(system) + count_tokens(prompt) + max_tokens
+    request_data = {'model': ANTHROPIC_MODEL, 'system': system, 'prompt': prompt, 'max_tokens': max_tokens}
+    extra = {}
+    if system:
+        extra['system'] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        extra['extra_headers'] = {'anthropic-beta': 'prompt-caching-2024-07-31'}
+    
+    def call():
+        response = anthropic_client.messages.create(
+            model=ANTHROPIC_MODEL,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=deadlines.timeout(LLM_TIMEOUT_SECONDS),
+            **extra
+        )
+        usage = response.usage
+        cached = _usage_value(usage, 'cache_read_input_tokens') or 0
+        written = _usage_value(usage, 'cache_creation_input_tokens') or 0
+        return {
+            'text': response.content[0].text,
+            # input_tokens excludes cache reads and writes; count them all
+            'input_tokens': usage.input_tokens + cached + written if usage else None,
+            'output_tokens': usage.output_tokens if usage else None,
+            'cached_tokens': cached,
+            'cache_write_tokens': written
+        }
+    
+    def timed_call():
+        started = time.monotonic()
+        result = upstream_cassette.call('anthropic', request_data, call)
+        _record_llm_usage(site, result, time.monotonic() - started)
+        return result
+    
+    try:
+        result = llm_scheduler.run('anthropic', priority, timed_call, tokens=estimate, timeout=deadlines.remaining())
+    except Exception as e:
+        # Waited or called until the request ran out of time, or a speculative call was shed
+        if deadlines.expired() or (isinstance(e, LLMQueueFull) and lowered()):
+            deadlines.mark_partial(site)
+        raise
+    if result['input_tokens'] is not None:
+        llm_scheduler.refund('anthropic', estimate - result['input_tokens'] - result['output_tokens'])
+    return result['text'].strip()
+
 def categorize_article(title, description, content):
     """Categorize an article based on its title, description, and content."""
     text = f"{title} {description} {content}".lower()
@@ -200,62 +454,126 @@ def fetch_news_articles(query=None, days_back=7, page_size=100):
     if query:
         params['q'] = query
     
-    try:
-        response = requests.get(NEWS_API_URL, params=params)
+    def call():
+        response = requests.get(NEWS_API_URL, params=params, timeout=deadlines.timeout(NEWS_API_TIMEOUT))
         response.raise_for_status()
-        data = response.json()
+        return response.json()
+    
+    try:
+        data = upstream_cassette.call('newsapi', {'params': params}, call)
         
         if data['status'] == 'ok':
             return data['articles']
         else:
             print(f"NewsAPI error: {data.get('message', 'Unknown error')}")
             return []
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, CassetteMiss, DeadlineExceeded) as e:
         print(f"Error fetching news: {e}")
+        if deadlines.expired():
+            deadlines.mark_partial('fetch')
         return []
 
-def summarize_article(article):
-    """Summarize an article using OpenAI or Anthropic."""
+SUMMARY_PROMPT_PREFIX = "Please provide a concise, neutral summary of this news article in 2-3 sentences:\n\n"
+
+# 'llm' (extractive summary only as the fallback), 'extractive' (never call the LLM),
+# or 'hybrid' (serve the extractive summary now, fill in the LLM summary in the background)
+SUMMARY_MODE = os.getenv('SUMMARY_MODE', 'llm')
+SUMMARY_BACKFILL_MAX_QUEUE_DEPTH = _env_int('SUMMARY_BACKFILL_MAX_QUEUE_DEPTH', 10)
+summary_backfill_executor = ThreadPoolExecutor(max_workers=_env_int('SUMMARY_BACKFILL_WORKERS', 2),
+                                               thread_name_prefix='summary-backfill')
+summary_backfill_lock = threading.Lock()
+summary_backfills = set()  # cache keys with an LLM summary queued or running
+summary_counts = {'llm': 0, 'extractive': 0, 'cached': 0, 'fallback': 0, 'backfilled': 0, 'backfill_skipped': 0}
+
+def count_summary(kind):
+    with summary_backfill_lock:
+        summary_counts[kind] += 1
+
+def llm_summary(article):
+    """Summary from OpenAI or Anthropic, or None if neither is available or the call fails."""
+    title = article.get('title', '')
+    full_text = article_text(article)
+    fitted = fit_text(full_text, SUMMARY_CONTEXT_TOKENS, title)
+    system, prompt = build_prompt(
+        'summary', SUMMARY_PROMPT_PREFIX, f"Title: {title}\nContent: {fitted}\n\nSummary:",
+        tokens_saved=count_tokens(full_text) - count_tokens(fitted)
+    )
+
+    try:
+        if OPENAI_API_KEY:
+            return openai_complete(prompt, max_tokens=150, temperature=0.3, priority=PRIORITY_SUMMARY,
+                                   system=system, site='summary')
+        elif anthropic_client:
+            return anthropic_complete(prompt, max_tokens=150, priority=PRIORITY_SUMMARY,
+                                      system=system, site='summary')
+    except Exception as e:
+        print(f"Error summarizing article: {e}")
+    return None
+
+def backfill_summary(article, cache_key):
+    """Generate the LLM summary in the background; later fetches pick it up from the summary cache."""
+    with summary_backfill_lock:
+        # Summary calls are the first to be shed; don't queue more while the scheduler is busy
+        if cache_key in summary_backfills or llm_scheduler.queue_depth() > SUMMARY_BACKFILL_MAX_QUEUE_DEPTH:
+            summary_counts['backfill_skipped'] += 1
+            return
+        summary_backfills.add(cache_key)
+
+    def run():
+        try:
+            summary = llm_summary(article)
+            if summary:
+                summary_cache.set(cache_key, summary)
+                count_summary('backfilled')
+        finally:
+            with summary_backfill_lock:
+                summary_backfills.discard(cache_key)
+
+    summary_backfill_executor.submit(run)
+
+def summarize_article(article, extractive=None):
+    """Summarize an article using OpenAI or Anthropic, or locally depending on SUMMARY_MODE.
+    
+    `extractive` is the article's local summary when it was already computed
+    for its batch (see summarize_batch).
+    """
     content = article.get('content', '') or article.get('description', '')
     title = article.get('title', '')
     
     if not content:
-        return article.get('description', '')[:200] + '...'
+        return fallback_summary(article.get('description', ''))
     
-    # Truncate content if too long
-    if len(content) > 3000:
-        content = content[:3000] + "..."
+    # Summaries are shared across workers and topics
+    cache_key = hashlib.sha1(f"{title}\n{content}".encode('utf-8')).hexdigest()
+    cached = summary_cache.get(cache_key)
+    if cached:
+        count_summary('cached')
+        return cached
     
-    prompt = f"""
-    Please provide a concise, neutral summary of this news article in 2-3 sentences:
+    if extractive is None:
+        extractive = summarize_batch([article])[0]
+    llm_available = bool(OPENAI_API_KEY or anthropic_client)
     
-    Title: {title}
-    Content: {content}
+    if SUMMARY_MODE == 'llm' and llm_available:
+        if deadlines.expired(SUMMARY_DEADLINE_RESERVE):
+            # Out of time for LLM summaries; leave the rest of the budget to later stages
+            deadlines.mark_partial('summary')
+        else:
+            summary = llm_summary(article)
+            if summary:
+                summary_cache.set(cache_key, summary)
+                count_summary('llm')
+                return summary
+    elif SUMMARY_MODE == 'hybrid' and llm_available:
+        backfill_summary(article, cache_key)
     
-    Summary:
-    """
+    if extractive:
+        count_summary('extractive')
+        return extractive
     
-    try:
-        if OPENAI_API_KEY:
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
-                temperature=0.3
-            )
-            return response.choices[0].message.content.strip()
-        elif anthropic_client:
-            response = anthropic_client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=150,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
-    except Exception as e:
-        print(f"Error summarizing article: {e}")
-    
-    # Fallback to description truncation
-    return article.get('description', '')[:200] + '...'
+    # Nothing to extract from; fall back to description truncation
+    count_summary('fallback')
+    return fallback_summary(article.get('description', ''))
 
 def detect_bias(article):
     """Detect potential bias in an article."""
@@ -437,65 +755,28 @@ def clean_json_string(json_str):
     
     return json_str
 
-def generate_conversation(articles, topic, style="casual"):
-    """Generate a texting conversation based on article opinions using Anthropic."""
-    if not articles:
-        return []
-    
-    # Create context from articles with their opinions/sentiment
-    article_contexts = []
-    for article in articles[:5]:  # Use top 5 articles
-        title = article.get('title', '')
-        description = article.get('description', '')
-        content = article.get('content', '')
-        source = article.get('source', 'Unknown')
-        
-        # Get bias/sentiment analysis
-        bias_analysis = article.get('bias_analysis', {})
-        sentiment = bias_analysis.get('bias_type', 'neutral')
-        
-        article_contexts.append(f"""
-Article: {title}
-Source: {source}
-URL: {article.get('url', '')}
-Content: {description[:300]}...
-Sentiment: {sentiment}
-""")
-    
-    context = f"Recent news articles about {topic}:\n" + "\n".join(article_contexts)
-    
-    # Create conversation prompt based on style
-    if style == "genz":
-        style_instructions = """
-Create a Gen Z-style texting conversation (max one sentence per person) where each news source reacts to the articles with their typical perspective and tone. Use:
+CONVERSATION_STYLE_INSTRUCTIONS = {
+    'genz': """Create a Gen Z-style texting conversation (max one sentence per person) where each news source reacts to the articles with their typical perspective and tone. Use:
 - Gen Z slang, abbreviations, and emojis (ngl, ok but, bruh, etc.)
 - Casual language and modern expressions
 - Different perspectives from each source
 - References to the actual articles
 - Natural conversation flow
 - Max 6-8 messages total
-"""
-    else:  # casual style
-        style_instructions = """
-Create a casual, natural texting conversation (max one sentence per person) where each news source reacts to the articles with their typical perspective and tone. Use:
+""",
+    'casual': """Create a casual, natural texting conversation (max one sentence per person) where each news source reacts to the articles with their typical perspective and tone. Use:
 - Casual, conversational language
 - Different perspectives from each source
 - References to the actual articles
 - Natural conversation flow
 - Max 6-8 messages total
 """
+}
 
-    prompt = f"""
-You are creating a short texting conversation between different news sources discussing these articles.
-
-{context}
-
-{style_instructions}
-
-CRITICAL: You must return ONLY a valid JSON array. Follow this EXACT format:
+CONVERSATION_OUTPUT_RULES = """CRITICAL: You must return ONLY a valid JSON array. Follow this EXACT format:
 [
-  {{"speaker": "Reuters", "side": "left", "text": "Your message here", "timestamp": "2024-01-15T10:30:00Z", "source_url": "https://example.com", "quote": "Relevant quote from the article"}},
-  {{"speaker": "BBC News", "side": "right", "text": "Another message here", "timestamp": "2024-01-15T10:31:00Z", "source_url": "https://example.com", "quote": "Another relevant quote"}}
+  {"speaker": "Reuters", "side": "left", "text": "Your message here", "timestamp": "2024-01-15T10:30:00Z", "source_url": "https://example.com", "quote": "Relevant quote from the article"},
+  {"speaker": "BBC News", "side": "right", "text": "Another message here", "timestamp": "2024-01-15T10:31:00Z", "source_url": "https://example.com", "quote": "Another relevant quote"}
 ]
 
 RULES:
@@ -508,20 +789,183 @@ RULES:
 - For source_url, use the actual URL from the article context
 - For quote, extract a relevant 1-2 sentence quote from the article content that supports the speaker's perspective
 - Alternate the "side" field between "left" and "right" for each message to create a natural conversation flow
+"""
+
+# Static part of the conversation prompt, kept identical across calls
+CONVERSATION_PROMPT_PREFIXES = {
+    style: ("You are creating a short texting conversation between different news sources discussing these articles.\n\n"
+            f"{instructions}\n{CONVERSATION_OUTPUT_RULES}\n")
+    for style, instructions in CONVERSATION_STYLE_INSTRUCTIONS.items()
+}
 
-Return ONLY the JSON array, no other text.
+CONVERSATION_PLAN_PREFIX = """You are planning a short texting conversation between different news sources discussing these articles.
+
+Plan 6-8 turns. For each turn give the news source speaking (use actual news source names from the articles), the number of the article it reacts to, and a short angle (under 12 words) that differs from the other turns. Alternate between sources so it reads as a natural conversation.
+
+Return ONLY the JSON plan, an array in this EXACT format:
+[
+  {"speaker": "Reuters", "article": 1, "angle": "Questions the timeline"},
+  {"speaker": "BBC News", "article": 2, "angle": "Points to the wider impact"}
+]
 """
+
+CONVERSATION_MESSAGE_STYLES = {
+    'genz': "Write in a Gen Z texting style (max one sentence) using Gen Z slang, abbreviations, and emojis (ngl, ok but, bruh, etc.).",
+    'casual': "Write in a casual, natural texting style (max one sentence) using conversational language."
+}
+
+CONVERSATION_MESSAGE_PREFIXES = {
+    style: ("You are writing one message in a short texting conversation between different news sources discussing these articles. "
+            "The conversation plan lists every turn so your message fits with the others.\n\n"
+            f"{instructions} React to the article named in your turn with the source's typical perspective and tone.\n\n"
+            "Return ONLY the JSON object in this EXACT format:\n"
+            '{"text": "Your message here", "quote": "Relevant 1-2 sentence quote from the article"}\n')
+    for style, instructions in CONVERSATION_MESSAGE_STYLES.items()
+}
+
+def render_conversation_article(article, text):
+    """One article in the conversation context (numbered in parallel mode)."""
+    bias_analysis = article.get('bias_analysis', {})
+    label = f"Article {article['number']}" if 'number' in article else "Article"
+    return (f"{label}: {article.get('title', '')}\n"
+            f"Source: {article.get('source', 'Unknown')}\n"
+            f"URL: {article.get('url', '')}\n"
+            f"Content: {text}\n"
+            f"Sentiment: {bias_analysis.get('bias_type', 'neutral')}\n")
+
+def enrichment_text(article):
+    """Text of an article for prompts: the fetched full text when cached, else the NewsAPI fields."""
+    if fulltext_fetcher:
+        full_text = fulltext_fetcher.cached_text(article.get('url'))
+        if full_text:
+            return full_text
+    return article_text(article)
+
+def generate_conversation(articles, topic, style="casual"):
+    """Generate a texting conversation based on article opinions.
+    
+    CONVERSATION_MODE=single asks one completion for the whole conversation;
+    parallel plans the turns first and generates each message concurrently.
+    """
+    if not articles:
+        return []
+    if not anthropic_client and not OPENAI_API_KEY:
+        return create_basic_conversation(articles, topic, style)
+    if deadlines.expired():
+        deadlines.mark_partial('conversation')
+        return create_basic_conversation(articles, topic, style)
+    
+    started = time.monotonic()
+    parses = {'parses': 0, 'parse_failures': 0}
+    if CONVERSATION_MODE == 'parallel':
+        conversation = generate_conversation_parallel(articles, topic, style, parses)
+    else:
+        conversation = generate_conversation_single(articles, topic, style, parses)
+    conversation_stats.record(CONVERSATION_MODE, time.monotonic() - started, len(conversation), **parses)
+    return conversation
+
+def generate_conversation_parallel(articles, topic, style, parses):
+    """Plan the turns in one short call, then write each message in its own call."""
+    numbered = [dict(article, number=i + 1) for i, article in enumerate(articles[:5])]
+    blocks, tokens_saved = fit_articles(numbered, CONVERSATION_CONTEXT_TOKENS, render_conversation_article,
+                                        text_of=enrichment_text)
+    context = f"Recent news articles about {topic}:\n\n" + "\n".join(blocks)
+    
+    def complete(system, prompt, max_tokens, priority, site):
+        if anthropic_client:
+            return anthropic_complete(prompt, max_tokens=max_tokens, priority=priority, system=system, site=site)
+        return openai_complete(prompt, max_tokens=max_tokens, temperature=0.8, priority=priority, system=system, site=site)
+    
+    plan = None
+    try:
+        system, prompt = build_prompt(
+            'conversation_plan', CONVERSATION_PLAN_PREFIX,
+            f"{context}\nReturn ONLY the JSON array, no other text.\n", tokens_saved=tokens_saved
+        )
+        parses['parses'] += 1
+        plan = parse_plan(complete(system, prompt, 200, PRIORITY_CONVERSATION, 'conversation_plan'), len(numbered))
+    except Exception as e:
+        print(f"Error planning conversation: {e}")
+    if plan is None:
+        parses['parse_failures'] += 1
+        plan = default_plan(numbered)
+    
+    plan_text = "\n".join(
+        f"{i + 1}. {turn['speaker']} (article {turn['article']}){': ' + turn['angle'] if turn['angle'] else ''}"
+        for i, turn in enumerate(plan)
+    )
+    
+    def write(index, turn):
+        system, prompt = build_prompt(
+            'conversation_message',
+            CONVERSATION_MESSAGE_PREFIXES.get(style, CONVERSATION_MESSAGE_PREFIXES['casual']),
+            f"{context}\nConversation plan:\n{plan_text}\n\n"
+            f"Write message {index + 1}, from {turn['speaker']}, about article {turn['article']}.\n"
+            "Return ONLY the JSON object, no other text.\n"
+        )
+        results = []
+        for attempt in range(1 + CONVERSATION_MESSAGE_RETRIES):
+            if attempt and deadlines.expired():
+                deadlines.mark_partial('conversation_message')
+                break
+            try:
+                message = parse_message(complete(system, prompt, 120, PRIORITY_CONVERSATION, 'conversation_message'))
+            except Exception as e:
+                print(f"Error generating conversation message: {e}")
+                message = None
+            results.append(message)
+            if message is not None:
+                break
+        return message, results
+    
+    # Each message call runs with the request's deadline, and is sampled if the request is profiled
+    futures = [conversation_executor.submit(contextvars.copy_context().run, sampled, write, i, turn)
+               for i, turn in enumerate(plan)]
+    conversation = []
+    used_names = set()
+    for turn, future in zip(plan, futures):
+        message, results = future.result()
+        parses['parses'] += len(results)
+        parses['parse_failures'] += sum(1 for result in results if result is None)
+        if message is None:
+            continue
+        article = numbered[turn['article'] - 1]
+        random_name = get_random_name()
+        while random_name in used_names:
+            random_name = get_random_name()
+        used_names.add(random_name)
+        conversation.append({
+            'speaker': random_name,
+            'side': 'right' if len(conversation) % 2 == 1 else 'left',
+            'text': message['text'],
+            'timestamp': datetime.now().isoformat(),
+            'source_url': article.get('url', ''),
+            'quote': message['quote'],
+            'news_source': turn['speaker'],
+            'news_source_url': article.get('url', '')
+        })
+    
+    return conversation or create_basic_conversation(articles, topic, style)
+
+def generate_conversation_single(articles, topic, style, parses):
+    """Ask one completion for the whole conversation as a JSON array."""
+    blocks, tokens_saved = fit_articles(articles[:5], CONVERSATION_CONTEXT_TOKENS, render_conversation_article,
+                                        text_of=enrichment_text)
+    system, prompt = build_prompt(
+        'conversation',
+        CONVERSATION_PROMPT_PREFIXES.get(style, CONVERSATION_PROMPT_PREFIXES['casual']),
+        f"Recent news articles about {topic}:\n\n" + "\n".join(blocks) +
+        "\nReturn ONLY the JSON array, no other text.\n",
+        tokens_saved=tokens_saved
+    )
     
     try:
         if anthropic_client:
-            response = anthropic_client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=800,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            response_text = response.content[0].text.strip()
+            response_text = anthropic_complete(prompt, max_tokens=800, priority=PRIORITY_CONVERSATION,
+                                               system=system, site='conversation')
             
             # Try to parse JSON response
+            parses['parses'] += 1
             try:
                 import json
                 import re
@@ -579,6 +1023,7 @@ Return ONLY the JSON array, no other text.
                     raise ValueError("No valid messages found in JSON")
                     
             except (json.JSONDecodeError, ValueError) as e:
+                parses['parse_failures'] += 1
                 print(f"JSON parsing failed: {e}")
                 print(f"Response text: {response_text[:500]}...")
                 print(f"Cleaned JSON text: {json_text[:500]}...")
@@ -600,6 +1045,8 @@ Return ONLY the JSON array, no other text.
                     conversation = []
                     used_names = set()
                     for pattern in message_patterns:
+                        if deadlines.expired():
+                            break
                         matches = re.findall(pattern, response_text, re.IGNORECASE | re.DOTALL)
                         if matches:
                             for i, match in enumerate(matches):
@@ -638,18 +1085,16 @@ Return ONLY the JSON array, no other text.
                 except Exception as extract_error:
                     print(f"Message extraction failed: {extract_error}")
                 
-                # If all else fails, create conversation from text
+                # If all else fails, create conversation from text (or canned messages if out of time)
+                if deadlines.expired():
+                    deadlines.mark_partial('conversation')
+                    return create_basic_conversation(articles, topic, style)
                 return create_fallback_conversation(response_text, articles, style)
                 
         elif OPENAI_API_KEY:
             # Fallback to OpenAI if Anthropic not available
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.8
-            )
-            response_text = response.choices[0].message.content.strip()
+            response_text = openai_complete(prompt, max_tokens=500, temperature=0.8, priority=PRIORITY_CONVERSATION,
+                                            system=system, site='conversation')
             return create_fallback_conversation(response_text, articles, style)
         else:
             # No AI available, create basic conversation
@@ -775,14 +1220,44 @@ def create_basic_conversation(articles, topic, style="casual"):
     
     return conversation
 
+def build_processed_article(article_id, article, topic, summary, bias_analysis):
+    """Shape a raw NewsAPI article and its enrichments into a compact article record."""
+    return ArticleRecord(
+        article_id,
+        article.get('title', ''),
+        article.get('description', ''),
+        article.get('content', ''),
+        article.get('url', ''),
+        article.get('urlToImage', ''),
+        article.get('publishedAt', ''),
+        (article.get('source') or {}).get('name', ''),
+        topic,
+        summary,
+        bias_analysis
+    )
+
 def process_articles(articles):
     """Process and enhance articles with summaries and bias detection."""
     processed_articles = []
+    articles = [article for article in articles if article.get('title') and article.get('description')]
     
-    for article in articles:
-        if not article.get('title') or not article.get('description'):
-            continue
-        
+    # Download the full text of the whole batch concurrently; pages that miss the
+    # budget are enriched from the NewsAPI snippet now and from the cache next time
+    full_texts = {}
+    if fulltext_fetcher and not deadlines.expired():
+        full_texts = fulltext_fetcher.fetch_all([article.get('url') for article in articles],
+                                                timeout=deadlines.timeout(FULLTEXT_BUDGET_SECONDS))
+    
+    # Enrichment reads the full text when we have it; the articles themselves keep NewsAPI's fields
+    enrich_from = [
+        dict(article, content=full_texts[article.get('url')]) if full_texts.get(article.get('url')) else article
+        for article in articles
+    ]
+    
+    # Local summaries for the whole batch in one pass (primary, first pass or fallback per SUMMARY_MODE)
+    extractive_summaries = summarize_batch(enrich_from)
+    
+    for article, enriched, extractive in zip(articles, enrich_from, extractive_summaries):
         # Categorize the article
         topic = categorize_article(
             article.get('title', ''),
@@ -791,39 +1266,518 @@ def process_articles(articles):
         )
         
         # Generate summary
-        summary = summarize_article(article)
+        summary = summarize_article(enriched, extractive)
         
         # Detect bias
-        bias_analysis = detect_bias(article)
+        bias_analysis = detect_bias(enriched)
         
-        processed_article = {
-            'id': len(processed_articles) + 1,
-            'title': article.get('title', ''),
-            'description': article.get('description', ''),
-            'content': article.get('content', ''),
-            'url': article.get('url', ''),
-            'urlToImage': article.get('urlToImage', ''),
-            'publishedAt': article.get('publishedAt', ''),
-            'source': article.get('source', {}).get('name', ''),
-            'topic': topic,
-            'summary': summary,
-            'bias_analysis': bias_analysis
-        }
+        processed_article = build_processed_article(
+            len(processed_articles) + 1, article, topic, summary, bias_analysis
+        )
+        trend_engine.add_article(processed_article)
         
         processed_articles.append(processed_article)
     
     return processed_articles
 
+def fetch_topic_articles(topic_name, page_size=50, progress=None):
+    """Fetch and process articles for a topic, keeping only those categorized under it.
+    
+    Results are cached across workers for NEWS_CACHE_TTL seconds, and
+    concurrent requests for the same topic share a single upstream fetch.
+    `progress(stage)` is called with 'fetch' and 'enrich' as they complete.
+    """
+    report = progress or (lambda stage: None)
+    
+    def load():
+        articles = fetch_news_articles(query=topic_name, days_back=7, page_size=page_size)
+        report('fetch')
+        processed_articles = process_articles(articles)
+        return [article for article in processed_articles 
+                if article['topic'].lower() == topic_name.lower()]
+    
+    filtered_articles = [
+        ArticleRecord.from_dict(article)
+        for article in topic_articles_cache.get_or_compute(f"{topic_name.lower()}:{page_size}", load) or []
+    ]
+    # Articles processed by other workers reach this one through the shared cache;
+    # ones already counted are skipped by the trend engine
+    for article in filtered_articles:
+        trend_engine.add_article(article)
+    report('fetch')
+    report('enrich')
+    return filtered_articles
+
+def topic_articles_version(topic_name, page_size=50):
+    """When the cached articles for a topic were fetched (UTC datetime), or None if not cached."""
+    stored_at = topic_articles_cache.stored_at(f"{topic_name.lower()}:{page_size}")
+    return None if stored_at is None else datetime.fromtimestamp(stored_at, tz=timezone.utc)
+
+def news_feed(query):
+    return (query or '').strip().lower()
+
+def news_cache_key(query, days_back):
+    return f"{news_feed(query)}:{days_back}"
+
+def fetch_news_feed(query=None, days_back=7):
+    """Processed /api/news articles and the change-log cursor they correspond to.
+    
+    Cached across workers for NEWS_CACHE_TTL seconds; each fetch appends its
+    new and changed articles to the change log.
+    """
+    feed = news_feed(query)
+    
+    def load():
+        articles = process_articles(fetch_news_articles(query=query, days_back=days_back))
+        if not articles:
+            return None
+        return {'cursor': news_changes.append(feed, articles), 'articles': articles}
+    
+    cached = news_cache.get_or_compute(news_cache_key(query, days_back), load) or {'cursor': 0, 'articles': []}
+    return [ArticleRecord.from_dict(article) for article in cached['articles']], cached['cursor']
+
+def refresh_expired_feed(query, days_back):
+    """Reload a feed whose cache entry has expired, logging its changes."""
+    if news_cache.stored_at(news_cache_key(query, days_back)) is None:
+        fetch_news_feed(query=query, days_back=days_back)
+
+# Shared plaza rooms: one conversation per subtopic x style for all viewers
+ROOM_TTL = _env_int('ROOM_TTL', 1800)
+conversation_cache = SharedCache(CACHE_PATH, 'conversations', ttl_seconds=ROOM_TTL, max_entries=2000)
+
+def generate_shared_conversation(articles, topic, style="casual"):
+    """generate_conversation, computed once across workers for the same articles and style."""
+    key = hashlib.sha1(json.dumps(
+        [topic, style, [article.get('url', '') for article in articles]]
+    ).encode('utf-8')).hexdigest()
+    conversation = conversation_cache.get_or_compute(key, lambda: generate_conversation(articles, topic, style))
+    # None if the deadline passed while another worker was generating it
+    return conversation if conversation is not None else create_basic_conversation(articles, topic, style)
+
+# Room state is shared by the workers, so any worker can serve any room's stream
+room_store = SharedCache(CACHE_PATH, 'rooms', ttl_seconds=ROOM_TTL, max_entries=_env_int('ROOM_MAX', 500))
+plaza_rooms = RoomRegistry(
+    generate_shared_conversation,
+    max_rooms=_env_int('ROOM_MAX', 500),
+    ttl_seconds=ROOM_TTL,
+    store=room_store,
+    load_article=ArticleRecord.from_dict
+)
+ROOM_REFRESH_SECONDS = _env_int('ROOM_REFRESH_SECONDS', 300)
+ROOM_SYNC_SECONDS = float(os.getenv('ROOM_SYNC_SECONDS', 5))
+
+def refresh_rooms():
+    """Append messages about newly published articles to rooms that have viewers."""
+    rooms_by_topic = {}
+    for room in plaza_rooms.active_rooms():
+        rooms_by_topic.setdefault(room.topic_name.lower(), []).append(room)
+    
+    for topic_name, rooms in rooms_by_topic.items():
+        subtopics = extract_subtopics(fetch_topic_articles(topic_name), topic_name)
+        # Subtopic IDs depend on batch order, titles are stable
+        subtopics_by_title = {subtopic['title']: subtopic for subtopic in subtopics}
+        for room in rooms:
+            latest = subtopics_by_title.get(room.subtopic['title'])
+            if latest:
+                # Every worker runs this; the first to append generates, the others pick up its messages
+                plaza_rooms.add_articles(room, latest['articles'])
+    
+    plaza_rooms.keep_alive()
+
+def room_refresher():
+    while True:
+        time.sleep(ROOM_REFRESH_SECONDS)
+        try:
+            refresh_rooms()
+        except Exception as e:
+            print(f"Error refreshing rooms: {e}")
+
+def room_syncer():
+    """Push messages appended by other workers to this worker's subscribers."""
+    while True:
+        time.sleep(ROOM_SYNC_SECONDS)
+        try:
+            plaza_rooms.sync_active()
+        except Exception as e:
+            print(f"Error syncing rooms: {e}")
+
+# Rooms, chat answers and trend counts are kept in memory; save them for warm restarts
+# (WARM_STATE_DIR='' disables). The SQLite cache survives restarts by itself
+WARM_STATE_DIR = os.getenv('WARM_STATE_DIR', os.path.join(os.path.dirname(CACHE_PATH), 'warm'))
+WARM_STATE_INTERVAL = _env_int('WARM_STATE_INTERVAL', 300)
+warm_state = WarmState(
+    WARM_STATE_DIR,
+    max_age=_env_int('WARM_STATE_MAX_AGE', 7200),
+    default=json_default
+) if WARM_STATE_DIR else None
+if warm_state is not None:
+    warm_state.register(
+        'rooms', plaza_rooms.export_state,
+        lambda rooms, _: plaza_rooms.restore_state(rooms)
+    )
+    warm_state.register('chat_answers', chat_answer_cache.export_state,
+                        lambda entries, _: chat_answer_cache.restore_state(entries))
+    warm_state.register('trending', trend_engine.export_state, trend_engine.restore_state)
+    # Restored counters only load into an empty engine, so restore them before any request can
+    # count articles. With preload_app this runs once in the master and workers inherit the result
+    try:
+        warm_state.restore(['trending'])
+    except Exception as e:
+        print(f"Error restoring trend counts: {e}")
+
+def save_warm_state():
+    # Only workers that served requests have state; with preload_app the master never does
+    if warm_state is None or _background_pid != os.getpid():
+        return
+    try:
+        warm_state.save()
+    except Exception as e:
+        print(f"Error saving warm state: {e}")
+
+def warm_state_keeper():
+    """Restore the state saved by earlier processes, then save this worker's periodically."""
+    try:
+        restored = warm_state.restore(['rooms', 'chat_answers'])
+        if any(restored.values()):
+            print(f"Restored warm state: {restored}")
+    except Exception as e:
+        print(f"Error restoring warm state: {e}")
+    while WARM_STATE_INTERVAL > 0:
+        time.sleep(WARM_STATE_INTERVAL)
+        save_warm_state()
+
+atexit.register(save_warm_state)
+
+_background_pid = None
+
+# Opt-in profiling. Requests carrying PROFILE_TOKEN (X-Plaza-Profile header or ?profile=)
+# are sampled and allocation-traced; PROFILE_SAMPLE_HZ > 0 also samples all threads continuously
+request_profiler = RequestProfiler(
+    token=os.getenv('PROFILE_TOKEN'),
+    interval=_env_int('PROFILE_INTERVAL_MS', 2) / 1000,
+    max_profiles=_env_int('PROFILE_MAX', 100),
+    ttl_seconds=_env_int('PROFILE_TTL', 3600),
+    # Any worker can serve a profile, whichever worker recorded it
+    store=SharedCache(CACHE_PATH, 'profiles', ttl_seconds=_env_int('PROFILE_TTL', 3600),
+                      max_entries=_env_int('PROFILE_MAX', 100))
+)
+PROFILE_SAMPLE_HZ = float(os.getenv('PROFILE_SAMPLE_HZ', '0'))
+continuous_sampler = StackSampler(1 / PROFILE_SAMPLE_HZ, skip_idle=True) if PROFILE_SAMPLE_HZ > 0 else None
+
+def profile_token():
+    return request.headers.get('X-Plaza-Profile') or request.args.get('profile')
+
+def start_background_threads():
+    """Start per-process background work. Threads do not survive fork, so each worker starts its own."""
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+    if ROOM_REFRESH_SECONDS > 0:
+        threading.Thread(target=room_refresher, daemon=True).start()
+    if ROOM_SYNC_SECONDS > 0:
+        threading.Thread(target=room_syncer, daemon=True).start()
+    if continuous_sampler is not None:
+        continuous_sampler.start()
+    if snapshot_store is not None and SNAPSHOT_INTERVAL > 0:
+        threading.Thread(target=snapshot_builder, daemon=True).start()
+    if warm_state is not None:
+        threading.Thread(target=warm_state_keeper, daemon=True).start()
+
+@app.before_request
+def start_request_profile():
+    if request_profiler.authorized(profile_token()):
+        g.profile = request_profiler.start(f"{request.method} {request.full_path}")
+
+@app.before_request
+def ensure_background_threads():
+    start_background_threads()
+
+@app.before_request
+def start_request_deadline():
+    budget = REQUEST_BUDGETS.get(request.endpoint)
+    if budget:
+        g.deadline = deadlines.start(budget)
+
+@app.teardown_request
+def finish_request_deadline(exc):
+    token = g.pop('deadline', None)
+    if token is not None:
+        if deadlines.partial_stages():
+            partial_responses[request.endpoint] += 1
+        deadlines.finish(token)
+
+# Registered before finalize_response so that it runs after it and includes compression
+@app.after_request
+def finish_request_profile(response):
+    session = g.pop('profile', None)
+    if session is not None:
+        response.headers['X-Plaza-Profile-Id'] = request_profiler.finish(session, status=response.status_code)
+    return response
+
+@app.teardown_request
+def abandon_request_profile(exc):
+    # Requests that raised never reach after_request
+    session = g.pop('profile', None)
+    if session is not None:
+        request_profiler.finish(session, error=str(exc))
+
+# Speculatively generate conversations for the first subtopics of a listing
+prefetcher = Prefetcher(
+    plaza_rooms,
+    top_n=_env_int('PREFETCH_TOP_N', 3),
+    max_in_flight=_env_int('PREFETCH_MAX_IN_FLIGHT', 4),
+    max_per_minute=_env_int('PREFETCH_PER_MINUTE', 30),
+    is_busy=lambda: llm_scheduler.queue_depth() > _env_int('PREFETCH_MAX_QUEUE_DEPTH', 5)
+)
+
+class SubtopicNotFound(LookupError):
+    pass
+
+SUBTOPIC_STAGES = ['fetch', 'enrich', 'cluster', 'converse']
+
+def find_subtopic_room(topic_name, subtopic_id, style, report):
+    """The room for a subtopic: open in this or another worker, or created from the current listing.
+    
+    Raises SubtopicNotFound if there is no such room and the subtopic is not in the listing.
+    """
+    room = plaza_rooms.get(room_key(topic_name, subtopic_id, style))
+    if room is not None:
+        for stage in ('fetch', 'enrich', 'cluster'):
+            report(stage)
+        return room
+    
+    # Get subtopics to find the specific one
+    subtopics = extract_subtopics(fetch_topic_articles(topic_name, progress=report), topic_name)
+    report('cluster')
+    for subtopic in subtopics:
+        if subtopic['id'] == subtopic_id:
+            return plaza_rooms.get_or_create(topic_name, subtopic, style)
+    raise SubtopicNotFound(subtopic_id)
+
+def build_subtopic_payload(topic_name, subtopic_id, style, progress=None):
+    """Articles and shared conversation for a subtopic, as returned by the API.
+    
+    `progress(stage)` is called as each of SUBTOPIC_STAGES completes.
+    Raises SubtopicNotFound if the subtopic is not in the current listing.
+    """
+    report = progress or (lambda stage: None)
+    room = find_subtopic_room(topic_name, subtopic_id, style, report)
+    
+    # The viewer picked this subtopic; queued prefetches for the others are not needed
+    prefetcher.record_view(room.key)
+    prefetcher.cancel(topic_name, style, keep={room.key})
+    
+    # Generate (once) or reuse the shared conversation for this subtopic and style
+    conversation = plaza_rooms.conversation(room)
+    report('converse')
+    
+    return {
+        'success': True,
+        'topic': topic_name,
+        'subtopic': room.subtopic,
+        'articles': room.articles,
+        'conversation': conversation
+    }
+
+# Background jobs for clients that poll instead of waiting on the request. Job status is
+# shared by the workers, so polls and streams can reach any of them
+JOB_RESULT_TTL = _env_int('JOB_RESULT_TTL', 300)
+job_manager = JobManager(
+    max_workers=_env_int('JOB_WORKERS', 4),
+    result_ttl=JOB_RESULT_TTL,
+    store=SharedCache(CACHE_PATH, 'jobs', ttl_seconds=JOB_RESULT_TTL, max_entries=2000)
+)
+
+def api_response(payload, etag=None, last_modified=None):
+    """JSON response honouring the `fields` projection, with data-version validators if known."""
+    response = jsonify(project_articles(payload, request.args.get('fields')))
+    if etag:
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # Let browsers cache but always revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def with_partial(payload):
+    """Mark a payload as `partial` if the request's deadline cut any stage short."""
+    stages = deadlines.partial_stages()
+    payload['partial'] = bool(stages)
+    if stages:
+        payload['partial_stages'] = stages
+    return payload
+
+def not_modified_response(etag, last_modified=None):
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Pre-rendered /api/subtopics and /api/subtopic responses, served from disk (SNAPSHOT_DIR enables)
+SNAPSHOT_INTERVAL = _env_int('SNAPSHOT_INTERVAL', 600)
+SNAPSHOT_TOPICS = os.getenv('SNAPSHOT_TOPICS', 'business,entertainment,general,health,science,sports,technology').split(',')
+SNAPSHOT_STYLES = ('casual', 'genz')
+# `fields` values rendered for each endpoint (the ones the frontend asks for)
+SNAPSHOT_FIELDS = {'subtopics': ('', 'id,title'), 'subtopic': ('', '-content,-bias_analysis')}
+snapshot_store = SnapshotStore(
+    os.getenv('SNAPSHOT_DIR'),
+    max_age=_env_int('SNAPSHOT_MAX_AGE', 3600)
+) if os.getenv('SNAPSHOT_DIR') else None
+
+def snapshot_response(endpoint, *parts, live_since=None):
+    """The pre-rendered response for this request, or None to generate it live.
+    
+    A snapshot built before `live_since` (when the live data last changed) is skipped.
+    """
+    if snapshot_store is None:
+        return None
+    snapshot = snapshot_store.current()
+    fields = request.args.get('fields', '')
+    if snapshot is None or fields not in SNAPSHOT_FIELDS[endpoint] or \
+            (live_since is not None and live_since > snapshot['built_at']):
+        snapshot_store.miss()
+        return None
+    
+    name = snapshot_name(endpoint, *parts, fields=fields)
+    etag = data_etag('snapshot', snapshot['version'], name)
+    built_at = datetime.fromtimestamp(snapshot['built_at'], tz=timezone.utc)
+    if is_not_modified(request, etag, built_at):
+        return not_modified_response(etag, built_at)
+    
+    found = snapshot_store.read(snapshot, name, gzip_ok='gzip' in request.accept_encodings)
+    if found is None:
+        return None
+    body, encoding = found
+    response = app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag, weak=True)
+    response.last_modified = built_at
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Plaza-Snapshot'] = snapshot['version']
+    return response
+
+def build_snapshot():
+    """Pre-render the listing and every subtopic of SNAPSHOT_TOPICS in each style, then swap it in.
+    
+    Returns the new version, or None if another process is already building one.
+    Topics that fail are left out and served live.
+    """
+    lock = snapshot_store.build_lock()
+    if lock is None:
+        return None
+    try:
+        with snapshot_store.begin() as writer:
+            def render(payload, endpoint, *parts):
+                for fields in SNAPSHOT_FIELDS[endpoint]:
+                    body = app.json.dumps(project_articles(payload, fields)).encode('utf-8')
+                    writer.write(snapshot_name(endpoint, *parts, fields=fields), body)
+            
+            for topic_name in SNAPSHOT_TOPICS:
+                try:
+                    filtered_articles = fetch_topic_articles(topic_name)
+                    subtopics = extract_subtopics(filtered_articles, topic_name)
+                    render({
+                        'success': True,
+                        'topic': topic_name,
+                        'subtopics': subtopics,
+                        'total_articles': len(filtered_articles)
+                    }, 'subtopics', topic_name)
+                    
+                    for subtopic in subtopics:
+                        for style in SNAPSHOT_STYLES:
+                            # Same shared room the live endpoint uses, without counting a view
+                            room = plaza_rooms.get_or_create(topic_name, subtopic, style)
+                            plaza_rooms.ensure_conversation(room)
+                            render({
+                                'success': True,
+                                'topic': topic_name,
+                                'subtopic': room.subtopic,
+                                'articles': room.articles,
+                                'conversation': room.conversation
+                            }, 'subtopic', topic_name, subtopic['id'], style)
+                except Exception as e:
+                    print(f"Error building snapshot for {topic_name}: {e}")
+        return writer.version
+    finally:
+        lock.close()
+
+def snapshot_builder():
+    # Every worker runs this; the age check and build lock keep it to one build per interval
+    while True:
+        age = snapshot_store.age()
+        if age is None or age >= SNAPSHOT_INTERVAL:
+            try:
+                build_snapshot()
+            except Exception as e:
+                print(f"Error building snapshot: {e}")
+            age = 0
+        time.sleep(max(SNAPSHOT_INTERVAL - age, 1))
+
+def room_validators(room):
+    """ETag and Last-Modified for a room's current conversation."""
+    etag = data_etag('subtopic', room.key, room.updated_at, request.query_string)
+    return etag, datetime.fromtimestamp(room.updated_at, tz=timezone.utc)
+
+@app.after_request
+def finalize_response(response):
+    """Body-hash ETags for GET responses without a data version, then compression."""
+    if request.method == 'GET' and response.status_code == 200 and response.mimetype == 'application/json':
+        if not response.get_etag()[0]:
+            response.add_etag(weak=True)
+        response.make_conditional(request)
+    return compress(response, request.accept_encodings)
+
 # API Endpoints
 
 @app.route('/api/news', methods=['GET'])
 def get_news():
-    """Get the latest news articles with summaries and bias analysis."""
+    """Get the latest news articles with summaries and bias analysis.
+    
+    With `since=<cursor>` (the `cursor` of an earlier response) only articles
+    added or changed after it are returned, matched by `url`. `wait=<seconds>`
+    holds the request until there are some (long polling). If the cursor is
+    older than the change log, the full list is returned with `reset: true`.
+    """
     try:
         query = request.args.get('q', None)
         days_back = int(request.args.get('days', 7))
+        since = int(request.args['since']) if 'since' in request.args else None
+        
+        # Polls with a cursor only refresh the feed when its cache entry has expired; otherwise
+        # they are answered from the change log without loading the whole feed
+        articles = cursor = None
+        if since is None or news_cache.stored_at(news_cache_key(query, days_back)) is None:
+            articles, cursor = fetch_news_feed(query=query, days_back=days_back)
         
-        articles = fetch_news_articles(query=query, days_back=days_back)
+        if since is not None:
+            feed = news_feed(query)
+            wait = min(float(request.args.get('wait', 0)), 30)
+            if deadlines.remaining() is not None:
+                # Stay within the endpoint's budget
+                wait = min(wait, deadlines.remaining())
+            if wait > 0:
+                # Reload the feed if its cache entry expires while waiting, so the poll can see new articles
+                news_changes.wait(feed, since, wait, refresh=lambda: refresh_expired_feed(query, days_back))
+            changes = news_changes.since(feed, since)
+            if changes is not None:
+                changed, cursor, has_more = changes
+                cutoff = (datetime.now(timezone.utc) - timedelta(days=days_back)).strftime('%Y-%m-%dT%H:%M:%S')
+                changed = [article for article in changed if article.get('publishedAt', '') >= cutoff]
+                return api_response(with_partial({
+                    'success': True,
+                    'articles': changed,
+                    'total_articles': len(changed),
+                    'cursor': str(cursor),
+                    'has_more': has_more,
+                    'reset': False
+                }))
+            if articles is None:
+                articles, cursor = fetch_news_feed(query=query, days_back=days_back)
         
         if not articles:
             return jsonify({
@@ -832,13 +1786,13 @@ def get_news():
                 'articles': []
             })
         
-        processed_articles = process_articles(articles)
-        
-        return jsonify({
+        return api_response(with_partial({
             'success': True,
-            'articles': processed_articles,
-            'total_articles': len(processed_articles)
-        })
+            'articles': articles,
+            'total_articles': len(articles),
+            'cursor': str(cursor),
+            'reset': since is not None
+        }))
         
     except Exception as e:
         return jsonify({
@@ -852,12 +1806,7 @@ def get_topic_data(topic_name):
     """Get articles and generate conversation for a specific topic."""
     try:
         # Fetch articles for the topic
-        articles = fetch_news_articles(query=topic_name, days_back=7, page_size=20)
-        processed_articles = process_articles(articles)
-        
-        # Filter articles by topic
-        filtered_articles = [article for article in processed_articles 
-                           if article['topic'].lower() == topic_name.lower()]
+        filtered_articles = fetch_topic_articles(topic_name, page_size=20)
         
         # Generate conversation
         conversation = generate_conversation(filtered_articles, topic_name)
@@ -867,13 +1816,13 @@ def get_topic_data(topic_name):
         for article in filtered_articles[:5]:
             facts.append(article['summary'])
         
-        return jsonify({
+        return api_response(with_partial({
             'success': True,
             'topic': topic_name,
             'articles': filtered_articles,
             'conversation': conversation,
             'facts': facts
-        })
+        }))
         
     except Exception as e:
         return jsonify({
@@ -888,23 +1837,41 @@ def get_topic_data(topic_name):
 def get_subtopics(topic_name):
     """Get subtopics and headlines for a main topic (e.g., Business -> Figma IPO, Tesla earnings, etc.)."""
     try:
-        # Fetch articles for the topic
-        articles = fetch_news_articles(query=topic_name, days_back=7, page_size=50)
-        processed_articles = process_articles(articles)
+        # Pre-rendered listing: no fetching, clustering or serialization
+        snapshot = snapshot_response('subtopics', topic_name)
+        if snapshot is not None:
+            return snapshot
         
-        # Filter articles by topic
-        filtered_articles = [article for article in processed_articles 
-                           if article['topic'].lower() == topic_name.lower()]
+        # Unchanged since the client's copy: skip clustering and serialization
+        version = topic_articles_version(topic_name)
+        if version is not None:
+            etag = data_etag('subtopics', topic_name.lower(), version.timestamp(), request.query_string)
+            if is_not_modified(request, etag, version):
+                # Repeat visitors get prefetches too, from the listing they already have
+                prefetcher.schedule_unchanged(
+                    topic_name, request.args.get('style', 'casual'),
+                    lambda: extract_subtopics(fetch_topic_articles(topic_name), topic_name)
+                )
+                return not_modified_response(etag, version)
+        
+        # Fetch articles for the topic
+        filtered_articles = fetch_topic_articles(topic_name)
         
         # Group articles by subtopics using clustering or keyword extraction
         subtopics = extract_subtopics(filtered_articles, topic_name)
         
-        return jsonify({
+        # Start generating conversations for the subtopics most likely to be opened
+        prefetcher.schedule(topic_name, subtopics, request.args.get('style', 'casual'))
+        
+        version = topic_articles_version(topic_name)
+        etag = data_etag('subtopics', topic_name.lower(), version.timestamp(), request.query_string) if version else None
+        
+        return api_response(with_partial({
             'success': True,
             'topic': topic_name,
             'subtopics': subtopics,
             'total_articles': len(filtered_articles)
-        })
+        }), etag, version)
         
     except Exception as e:
         return jsonify({
@@ -913,69 +1880,267 @@ def get_subtopics(topic_name):
             'subtopics': []
         }), 500
 
+@app.route('/api/trending', methods=['GET'])
+def get_trending():
+    """Keywords and entities appearing faster recently than over the rest of the window.
+
+    Optional `topic` (e.g. Technology), `limit` and `min_count` (recent mentions).
+    """
+    try:
+        topic = request.args.get('topic')
+        limit = min(int(request.args.get('limit', 20)), 100)
+        min_count = int(request.args.get('min_count', 2))
+
+        return api_response({
+            'success': True,
+            'topic': topic,
+            'window_seconds': trend_engine.window_seconds(),
+            'recent_seconds': trend_engine.bucket_seconds * trend_engine.recent_buckets,
+            'trending': trend_engine.trending(topic=topic, limit=limit, min_recent=min_count)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error computing trending terms: {str(e)}',
+            'trending': []
+        }), 500
+
 @app.route('/api/subtopic/<topic_name>/<subtopic_id>', methods=['GET'])
 def get_subtopic_data(topic_name, subtopic_id):
-    """Get articles and conversation for a specific subtopic."""
+    """Get articles and conversation for a specific subtopic.
+    
+    The conversation is shared by everyone viewing the subtopic in the same
+    style; it is generated by the first viewer and reused afterwards.
+    """
     try:
         # Get conversation style from query parameter
         style = request.args.get('style', 'casual')
         
-        # Fetch articles for the main topic
-        articles = fetch_news_articles(query=topic_name, days_back=7, page_size=50)
-        processed_articles = process_articles(articles)
+        room = plaza_rooms.get(room_key(topic_name, subtopic_id, style))
         
-        # Filter articles by topic
-        filtered_articles = [article for article in processed_articles 
-                           if article['topic'].lower() == topic_name.lower()]
+        # Pre-rendered, unless this worker's room has new messages since the snapshot
+        snapshot = snapshot_response(
+            'subtopic', topic_name, subtopic_id, style,
+            live_since=room.updated_at if room is not None and room.conversation is not None else None
+        )
+        if snapshot is not None:
+            return snapshot
         
-        # Get subtopics to find the specific one
-        subtopics = extract_subtopics(filtered_articles, topic_name)
-        target_subtopic = None
+        # Unchanged shared conversation since the client's copy (a partial one is regenerated)
+        if room is not None and room.conversation is not None and not room.partial:
+            etag, last_modified = room_validators(room)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified)
         
-        for subtopic in subtopics:
-            if subtopic['id'] == subtopic_id:
-                target_subtopic = subtopic
-                break
+        payload = with_partial(build_subtopic_payload(topic_name, subtopic_id, style))
+        room = plaza_rooms.get(room_key(topic_name, subtopic_id, style))
+        etag, last_modified = room_validators(room) if room else (None, None)
+        
+        return api_response(payload, etag, last_modified)
         
-        if not target_subtopic:
+    except SubtopicNotFound:
+        return jsonify({
+            'success': False,
+            'message': 'Subtopic not found'
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching subtopic data: {str(e)}',
+            'articles': [],
+            'conversation': []
+        }), 500
+
+@app.route('/api/jobs/subtopic/<topic_name>/<subtopic_id>', methods=['POST'])
+def create_subtopic_job(topic_name, subtopic_id):
+    """Start (or join) a background job building a subtopic's articles and conversation."""
+    style = request.args.get('style', 'casual')
+    
+    def run(job):
+        try:
+            return build_subtopic_payload(topic_name, subtopic_id, style, progress=job.complete_stage)
+        except SubtopicNotFound:
+            raise ValueError('Subtopic not found')
+    
+    job = job_manager.submit(('subtopic', topic_name.lower(), subtopic_id, style), SUBTOPIC_STAGES, run)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/jobs/{job.id}",
+        'events_url': f"/api/jobs/{job.id}/events"
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, stage progress and (once done) the result.
+    
+    With `wait=<seconds>` the request is held until the job changes past
+    `version` (long polling).
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found or expired'
+        }), 404
+    
+    wait = min(float(request.args.get('wait', 0)), 30)
+    if wait > 0:
+        job.wait_for_change(int(request.args.get('version', job.version)), wait)
+    
+    return jsonify(dict(job.to_dict(), success=True))
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Server-Sent Events with a progress event per change and a final result event."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found or expired'
+        }), 404
+    
+    def events():
+        version = -1
+        while True:
+            version = job.wait_for_change(version, 15)
+            data = job.to_dict(include_result=False)
+            if job.finished:
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict(), default=json_default)}\n\n"
+                return
+            yield f"event: progress\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/rooms/<topic_name>/<subtopic_id>/stream', methods=['GET'])
+def stream_room(topic_name, subtopic_id):
+    """Server-Sent Events stream of a subtopic's shared conversation."""
+    style = request.args.get('style', 'casual')
+    try:
+        room = find_subtopic_room(topic_name, subtopic_id, style, lambda stage: None)
+    except SubtopicNotFound:
+        return jsonify({
+            'success': False,
+            'message': 'Subtopic not found'
+        }), 404
+    # A room rebuilt from the listing takes its conversation from the shared conversation cache
+    plaza_rooms.ensure_conversation(room)
+    
+    return Response(sse_stream(room), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+CHAT_STYLE_INSTRUCTIONS = {
+    'genz': "Respond in a Gen Z texting style (max one sentence) with your perspective on this topic. Use Gen Z slang, abbreviations, and emojis if appropriate.",
+    'casual': "Respond in a casual, conversational style (max one sentence) with your perspective on this topic. Use natural, friendly language that's easy to understand."
+}
+
+def chat_prompt_prefix(persona_name, style):
+    """Static part of the chat prompt for a persona and style."""
+    persona = PERSONAS[persona_name]
+    return (f"You are {persona_name}, {persona['background']}.\n"
+            f"Your perspective: {persona['perspective']}\n"
+            f"Your communication style: {persona['style']}\n\n"
+            f"{CHAT_STYLE_INSTRUCTIONS.get(style, CHAT_STYLE_INSTRUCTIONS['casual'])}\n"
+            "If there are relevant articles mentioned in the context, reference them briefly.\n"
+            "Be authentic to your background but keep it conversational and engaging.\n\n")
+
+def compile_chat_context(topic, subtopic, articles):
+    """Build the static part of the chat prompt context from article summaries."""
+    articles_context = ""
+    tokens_saved = 0
+    if articles:
+        # Fit the top 3 article summaries into the chat token budget
+        article_summaries, tokens_saved = fit_articles(
+            articles[:3], CHAT_CONTEXT_TOKENS,
+            render=lambda article, text: f"- {article.get('title', '')}: {text}",
+            text_of=lambda article: article.get('summary') or article_text(article)
+        )
+        articles_context = f"Relevant articles:\n" + "\n".join(article_summaries)
+    
+    context = f"Topic: {topic}"
+    if subtopic:
+        context += f"\nSubtopic: {subtopic}"
+    if articles_context:
+        context += f"\n{articles_context}"
+    
+    # Use the first article as the source for responses
+    source_url = ""
+    quote = ""
+    if articles:
+        source_url = articles[0].get('url', '')
+        quote = articles[0].get('description', '')[:200] + "..." if articles[0].get('description') else ""
+    
+    return {'context': context, 'context_tokens_saved': tokens_saved, 'source_url': source_url, 'quote': quote}
+
+def chat_session_key(subtopic_id, session_id):
+    return f"{subtopic_id}:{session_id}"
+
+@app.route('/api/chat/session', methods=['POST'])
+def create_chat_session():
+    """Create a chat session holding the precompiled article context for a subtopic."""
+    try:
+        data = request.json
+        subtopic_id = data.get('subtopic_id', '')
+        style = data.get('style', 'casual')
+        
+        if not subtopic_id:
             return jsonify({
                 'success': False,
-                'message': 'Subtopic not found'
-            }), 404
+                'message': 'No subtopic_id provided'
+            }), 400
         
-        # Get articles for this specific subtopic
-        subtopic_articles = target_subtopic.get('articles', [])
+        session_id = uuid.uuid4().hex
+        compiled = compile_chat_context(data.get('topic', ''), data.get('subtopic', ''), data.get('articles', []))
         
-        # Generate conversation for this subtopic with the specified style
-        conversation = generate_conversation(subtopic_articles, target_subtopic['title'], style)
+        # The user is replying to the room's generated conversation; start the history with its last messages
+        # Rooms are keyed by the topic's category; `topic` is its display title
+        room = plaza_rooms.get(room_key(data.get('category') or data.get('topic', ''), subtopic_id, style))
+        seed = room.conversation if room is not None and room.conversation else data.get('history', [])
+        history = [{'speaker': message.get('speaker', ''), 'text': message.get('text', '')}
+                   for message in seed[-CHAT_SESSION_HISTORY:]]
+        chat_sessions.set(chat_session_key(subtopic_id, session_id), {
+            'topic': data.get('topic', ''),
+            'subtopic': data.get('subtopic', ''),
+            'context': compiled['context'],
+            'context_tokens_saved': compiled['context_tokens_saved'],
+            'source_url': compiled['source_url'],
+            'quote': compiled['quote'],
+            'style': style,
+            'history': history
+        })
         
         return jsonify({
             'success': True,
-            'topic': topic_name,
-            'subtopic': target_subtopic,
-            'articles': subtopic_articles,
-            'conversation': conversation
+            'session_id': session_id,
+            'subtopic_id': subtopic_id,
+            'expires_in': chat_sessions.ttl_seconds
         })
         
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Error fetching subtopic data: {str(e)}',
-            'articles': [],
-            'conversation': []
+            'message': f'Error creating chat session: {str(e)}'
         }), 500
 
 @app.route('/api/chat', methods=['POST'])
 def chat_endpoint():
-    """Handle user chat messages and generate AI responses."""
+    """Handle user chat messages and generate AI responses.
+    
+    With `session_id` and `subtopic_id` the article context and history come
+    from the server-side session and only `message` needs to be sent.
+    """
     try:
         data = request.json
         user_message = data.get('message', '')
-        topic = data.get('topic', '')
-        subtopic = data.get('subtopic', '')
-        articles = data.get('articles', [])
-        conversation_history = data.get('history', [])
-        style = data.get('style', 'casual')
+        session_id = data.get('session_id')
         
         if not user_message:
             return jsonify({
@@ -983,6 +2148,28 @@ def chat_endpoint():
                 'message': 'No message provided'
             }), 400
         
+        session = None
+        if session_id:
+            session_key = chat_session_key(data.get('subtopic_id', ''), session_id)
+            session = chat_sessions.get(session_key)
+            if session is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'Chat session not found or expired',
+                    'session_expired': True
+                }), 404
+            compiled = session
+            topic = session['topic']
+            subtopic = session['subtopic']
+            conversation_history = session['history']
+            style = data.get('style', session['style'])
+        else:
+            topic = data.get('topic', '')
+            subtopic = data.get('subtopic', '')
+            compiled = compile_chat_context(topic, subtopic, data.get('articles', []))
+            conversation_history = data.get('history', [])
+            style = data.get('style', 'casual')
+        
         # Generate response from a random persona
         import random
         selected_persona = random.choice(list(PERSONAS.keys()))
@@ -995,93 +2182,67 @@ def chat_endpoint():
             history_context = "\n".join([f"{msg.get('speaker', 'User')}: {msg.get('text', '')}" 
                                        for msg in recent_messages])
         
-        # Create context from articles if available
-        articles_context = ""
-        if articles:
-            article_summaries = []
-            for article in articles[:3]:  # Use top 3 articles
-                summary = article.get('summary', article.get('description', ''))[:200]
-                article_summaries.append(f"- {article.get('title', '')}: {summary}")
-            articles_context = f"Relevant articles:\n" + "\n".join(article_summaries)
-        
         # Build the full context
-        full_context = f"Topic: {topic}"
-        if subtopic:
-            full_context += f"\nSubtopic: {subtopic}"
-        if articles_context:
-            full_context += f"\n{articles_context}"
+        full_context = compiled['context']
         if history_context:
             full_context += f"\nRecent conversation:\n{history_context}"
         
-        # Create style-specific instructions
-        if style == "genz":
-            style_instruction = "Respond in a Gen Z texting style (max one sentence) with your perspective on this topic. Use Gen Z slang, abbreviations, and emojis if appropriate."
-        else:  # casual style
-            style_instruction = "Respond in a casual, conversational style (max one sentence) with your perspective on this topic. Use natural, friendly language that's easy to understand."
+        # Follow-ups ("why?") only share answers within the same recent conversation
+        history_digest = hashlib.sha1(history_context.encode('utf-8')).hexdigest()[:16] if history_context else ''
+        cache_scope = (topic, subtopic, selected_persona, style, history_digest)
+        ai_response = chat_answer_cache.lookup(cache_scope, user_message)
         
-        prompt = f"""
-        You are {selected_persona}, {persona['background']}.
-        Your perspective: {persona['perspective']}
-        Your communication style: {persona['style']}
-        
-        Context:
-        {full_context}
-        
-        User's question: {user_message}
-        
-        {style_instruction}
-        If there are relevant articles mentioned in the context, reference them briefly.
-        Be authentic to your background but keep it conversational and engaging.
-        """
-        
-        try:
-            if anthropic_client:
-                response = anthropic_client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=100,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                ai_response = response.content[0].text.strip()
-            elif OPENAI_API_KEY:
-                response = openai.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=100,
-                    temperature=0.8
-                )
-                ai_response = response.choices[0].message.content.strip()
-            else:
+        if ai_response is None:
+            system, prompt = build_prompt(
+                'chat', chat_prompt_prefix(selected_persona, style),
+                f"Context:\n{full_context}\n\nUser's question: {user_message}\n",
+                tokens_saved=compiled.get('context_tokens_saved', 0)
+            )
+            try:
+                if anthropic_client:
+                    ai_response = anthropic_complete(prompt, max_tokens=100, priority=PRIORITY_CHAT,
+                                                     system=system, site='chat')
+                    chat_answer_cache.store(cache_scope, user_message, ai_response)
+                elif OPENAI_API_KEY:
+                    ai_response = openai_complete(prompt, max_tokens=100, temperature=0.8, priority=PRIORITY_CHAT,
+                                                  system=system, site='chat')
+                    chat_answer_cache.store(cache_scope, user_message, ai_response)
+                else:
+                    if style == "genz":
+                        ai_response = f"ngl this is actually pretty interesting from my perspective as {persona['background']} 🤔"
+                    else:
+                        ai_response = f"This is actually pretty interesting from my perspective as {persona['background']}"
+            except Exception as e:
+                print(f"Error generating AI response: {e}")
                 if style == "genz":
-                    ai_response = f"ngl this is actually pretty interesting from my perspective as {persona['background']} 🤔"
+                    ai_response = "ngl this is a complex topic but i'm having some technical difficulties rn 😅"
                 else:
-                    ai_response = f"This is actually pretty interesting from my perspective as {persona['background']}"
-        except Exception as e:
-            print(f"Error generating AI response: {e}")
-            if style == "genz":
-                ai_response = "ngl this is a complex topic but i'm having some technical difficulties rn 😅"
-            else:
-                ai_response = "This is a complex topic but I'm having some technical difficulties right now"
+                    ai_response = "This is a complex topic but I'm having some technical difficulties right now"
         
-        # Find a relevant article for source information
-        source_url = ""
-        quote = ""
-        if articles:
-            # Use the first article as the source
-            source_url = articles[0].get('url', '')
-            quote = articles[0].get('description', '')[:200] + "..." if articles[0].get('description') else ""
+        source_url = compiled['source_url']
+        response_message = {
+            'speaker': get_random_name(),
+            'side': 'left',
+            'text': ai_response,
+            'timestamp': datetime.now().isoformat(),
+            'source_url': source_url,
+            'quote': compiled['quote'],
+            'news_source': selected_persona,
+            'news_source_url': source_url
+        }
+        
+        if session is not None:
+            # Atomic, so concurrent messages in one session do not drop each other's turns
+            def add_turn(stored):
+                stored['history'].append({'speaker': 'User', 'text': user_message})
+                stored['history'].append({'speaker': selected_persona, 'text': ai_response})
+                del stored['history'][:-CHAT_SESSION_HISTORY]
+                return stored
+            chat_sessions.update(session_key, add_turn)
         
         return jsonify({
             'success': True,
-            'response': {
-                'speaker': get_random_name(),
-                'side': 'left',
-                'text': ai_response,
-                'timestamp': datetime.now().isoformat(),
-                'source_url': source_url,
-                'quote': quote,
-                'news_source': selected_persona,
-                'news_source_url': source_url
-            }
+            'response': response_message
         })
         
     except Exception as e:
@@ -1119,6 +2280,40 @@ def get_article_bias(article_id):
         }), 500
 
 
+@app.route('/api/profiles/continuous', methods=['GET'])
+def get_continuous_profile():
+    """Always-on sampler output: top functions, or collapsed stacks with ?format=collapsed."""
+    if not request_profiler.authorized(profile_token()):
+        return jsonify({'success': False, 'message': 'Profiling token required'}), 403
+    if continuous_sampler is None:
+        return jsonify({'success': False, 'message': 'Continuous sampling is off (set PROFILE_SAMPLE_HZ)'}), 404
+    
+    if request.args.get('format') == 'collapsed':
+        response = Response(continuous_sampler.collapsed(), mimetype='text/plain')
+    else:
+        response = jsonify({
+            'success': True,
+            'sample_hz': PROFILE_SAMPLE_HZ,
+            'samples': continuous_sampler.samples,
+            'top_functions': continuous_sampler.top_functions(int(request.args.get('limit', 30)))
+        })
+    if request.args.get('reset'):
+        continuous_sampler.reset()
+    return response
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """A stored request profile; ?format=collapsed returns the stacks for flamegraph tools."""
+    if not request_profiler.authorized(profile_token()):
+        return jsonify({'success': False, 'message': 'Profiling token required'}), 403
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'message': 'Profile not found or expired'}), 404
+    
+    if request.args.get('format') == 'collapsed':
+        return Response(profile['collapsed'], mimetype='text/plain')
+    return jsonify(dict(profile, success=True))
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -1131,5 +2326,34 @@ def health_check():
         'bias_detection_available': bias_analyzer is not None
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics (LLM queue depth and wait times)."""
+    return jsonify({
+        'timestamp': datetime.now().isoformat(),
+        'llm_scheduler': llm_scheduler.snapshot(),
+        'cassette': upstream_cassette.stats(),
+        'shared_cache': {
+            'topic_articles': topic_articles_cache.stats(),
+            'summaries': summary_cache.stats(),
+            'conversations': conversation_cache.stats()
+        },
+        'chat_sessions': chat_sessions.stats(),
+        'chat_answer_cache': chat_answer_cache.stats(),
+        'prompts': prompt_stats.snapshot(),
+        'conversation_modes': conversation_stats.snapshot(),
+        'trending': trend_engine.stats(),
+        'profiling': request_profiler.stats(),
+        'fulltext': fulltext_fetcher.stats() if fulltext_fetcher else {'enabled': False},
+        'snapshots': snapshot_store.stats() if snapshot_store else {'enabled': False},
+        'summaries': dict(summary_counts, mode=SUMMARY_MODE, backfills_in_flight=len(summary_backfills)),
+        'news_changes': news_changes.stats(),
+        'deadlines': {'budgets': REQUEST_BUDGETS, 'partial_responses': dict(partial_responses)},
+        'warm_state': warm_state.stats() if warm_state else {'enabled': False},
+        'rooms': plaza_rooms.stats(),
+        'prefetch': prefetcher.stats(),
+        'jobs': job_manager.stats()
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Compact in-memory representation of processed articles.
+
+ArticleRecord holds the fields of a processed article in slots instead of
+a dict. The often repeated `source` and `topic` strings are interned, the
+bias analysis is kept as a flat tuple instead of two nested dicts, and a
+summary that is just the description fallback is not stored at all.
+
+Records are read-only Mappings with the API's JSON keys, so
+`article.get('title')` and `article['topic']` keep working. `to_dict()`
+produces today's JSON shape where articles leave the process.
+"""
+
+import sys
+from collections.abc import Mapping
+
+FIELDS = (
+    'id', 'title', 'description', 'content', 'url', 'urlToImage', 'publishedAt',
+    'source', 'topic', 'summary', 'bias_analysis'
+)
+
+_ATTRIBUTES = {'urlToImage': 'url_to_image', 'publishedAt': 'published_at'}
+_BIAS_KEYS = {'bias_score', 'bias_type', 'confidence', 'sentiment_breakdown'}
+_SENTIMENT_KEYS = ('positive', 'negative', 'neutral', 'compound')
+
+
+def fallback_summary(description):
+    """Summary used when no LLM summary is available."""
+    return (description or '')[:200] + '...'
+
+
+def _pack_bias(bias_analysis):
+    """Flat tuple for the usual detect_bias shape; anything else is kept as is."""
+    if not isinstance(bias_analysis, dict) or not {'bias_score', 'bias_type', 'confidence'} <= bias_analysis.keys() \
+            or not bias_analysis.keys() <= _BIAS_KEYS:
+        return bias_analysis
+    breakdown = bias_analysis.get('sentiment_breakdown')
+    if breakdown is None:
+        values = (None,) * len(_SENTIMENT_KEYS)
+    elif isinstance(breakdown, dict) and set(breakdown) == set(_SENTIMENT_KEYS):
+        values = tuple(breakdown[key] for key in _SENTIMENT_KEYS)
+    else:
+        return bias_analysis
+    return (bias_analysis['bias_score'], sys.intern(bias_analysis['bias_type']), bias_analysis['confidence']) + values
+
+
+def _unpack_bias(bias):
+    if not isinstance(bias, tuple):
+        return bias
+    data = {'bias_score': bias[0], 'bias_type': bias[1], 'confidence': bias[2]}
+    if bias[3] is not None:
+        data['sentiment_breakdown'] = dict(zip(_SENTIMENT_KEYS, bias[3:]))
+    return data
+
+
+class ArticleRecord(Mapping):
+    __slots__ = ('id', 'title', 'description', 'content', 'url', 'url_to_image', 'published_at',
+                 'source', 'topic', '_summary', '_bias')
+
+    def __init__(self, id, title, description, content, url, url_to_image, published_at,
+                 source, topic, summary, bias_analysis):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.content = content
+        self.url = url
+        self.url_to_image = url_to_image
+        self.published_at = published_at
+        self.source = sys.intern(source or '')
+        self.topic = sys.intern(topic or '')
+        self._summary = None if summary == fallback_summary(description) else summary
+        self._bias = _pack_bias(bias_analysis)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record from an article dict in the API shape (records are returned unchanged)."""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get('id'), data.get('title', ''), data.get('description', ''), data.get('content', ''),
+            data.get('url', ''), data.get('urlToImage', ''), data.get('publishedAt', ''),
+            data.get('source', ''), data.get('topic', ''), data.get('summary', ''), data.get('bias_analysis', {})
+        )
+
+    @property
+    def summary(self):
+        return fallback_summary(self.description) if self._summary is None else self._summary
+
+    @property
+    def bias_analysis(self):
+        return _unpack_bias(self._bias)
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, _ATTRIBUTES.get(key, key))
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def to_dict(self):
+        return {key: self[key] for key in FIELDS}
+
+    def __repr__(self):
+        return f"ArticleRecord(id={self.id!r}, title={self.title!r})"
+
+
+def json_default(obj):
+    """`default=` hook for json.dumps that serializes records to their API shape."""
+    if isinstance(obj, ArticleRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Offline bulk processing of NewsAPI archives.
+
+Reads JSONL dumps where each line is either a raw NewsAPI response
+({"status": "ok", "articles": [...]}) or a single article, and writes the
+same article dicts the API returns (category, summary, bias analysis) as
+gzip-compressed JSONL.
+
+    python batch.py archive-2024-01.jsonl archive-2024-02.jsonl.gz -o processed.jsonl.gz
+
+Input is streamed line by line. Categorization and bias detection run on a
+process pool. Extractive summaries are computed once per batch, and LLM
+summaries run on a bounded asyncio pool (through the usual LLM scheduler
+and summary cache). Progress is checkpointed after every batch, and
+rerunning the same command resumes where it stopped.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app import (
+    build_processed_article, categorize_article, detect_bias, summarize_article
+)
+from summarizer import summarize_batch
+
+
+def open_text(path, mode='rt'):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_lines(paths, start_file=0, start_line=0):
+    """Yield (file_index, line_number, articles) for each line, skipping done work."""
+    for file_index, path in enumerate(paths):
+        if file_index < start_file:
+            continue
+        with open_text(path) as f:
+            for line_number, line in enumerate(f, 1):
+                if file_index == start_file and line_number <= start_line:
+                    continue
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"Skipping bad JSON at {path}:{line_number}: {e}", file=sys.stderr)
+                    yield file_index, line_number, []
+                    continue
+                if not isinstance(payload, dict):
+                    print(f"Skipping non-object JSON at {path}:{line_number}", file=sys.stderr)
+                    yield file_index, line_number, []
+                    continue
+                articles = payload.get('articles') if 'articles' in payload else [payload]
+                yield file_index, line_number, articles or []
+
+
+def iter_batches(lines, batch_size):
+    """Group whole lines until a batch has at least `batch_size` articles."""
+    batch, position, yielded = [], None, None
+    for file_index, line_number, articles in lines:
+        batch.extend(article for article in articles
+                     if isinstance(article, dict) and article.get('title') and article.get('description'))
+        position = (file_index, line_number)
+        if len(batch) >= batch_size:
+            yield batch, position
+            batch, yielded = [], position
+    if position != yielded:
+        yield batch, position
+
+
+def analyze(article):
+    """CPU-bound enrichment, run in a worker process."""
+    topic = categorize_article(
+        article.get('title', ''),
+        article.get('description', ''),
+        article.get('content', '')
+    )
+    return topic, detect_bias(article)
+
+
+async def summarize_all(articles, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    # Local summaries for the whole batch in one pass, as process_articles does
+    extractive_summaries = summarize_batch(articles)
+
+    async def summarize(article, extractive):
+        async with semaphore:
+            return await asyncio.to_thread(summarize_article, article, extractive)
+
+    return await asyncio.gather(*(
+        summarize(article, extractive) for article, extractive in zip(articles, extractive_summaries)
+    ))
+
+
+def load_checkpoint(path, inputs):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('inputs') != inputs:
+        raise SystemExit(f"Checkpoint {path} was written for different inputs; remove it to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='JSONL files (optionally .gz) of NewsAPI payloads or articles')
+    parser.add_argument('-o', '--output', required=True, help='output .jsonl.gz file')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--llm-concurrency', type=int, default=8)
+    parser.add_argument('--overwrite', action='store_true', help='replace an existing output that has no checkpoint')
+    args = parser.parse_args()
+
+    inputs = [os.path.abspath(path) for path in args.inputs]
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path, inputs)
+    if checkpoint is None:
+        if os.path.exists(args.output) and not args.overwrite:
+            raise SystemExit(f"{args.output} exists but has no checkpoint; pass --overwrite to replace it")
+        checkpoint = {'inputs': inputs, 'file_index': 0, 'line': 0, 'output_bytes': 0, 'articles': 0}
+
+    # Drop anything written after the last checkpoint (e.g. an interrupted batch)
+    if os.path.exists(args.output):
+        with open(args.output, 'r+b') as f:
+            f.truncate(checkpoint['output_bytes'])
+    elif checkpoint['output_bytes']:
+        raise SystemExit(f"Checkpoint expects existing output {args.output}")
+
+    if checkpoint['articles']:
+        print(f"Resuming after {checkpoint['articles']} articles "
+              f"(file {checkpoint['file_index'] + 1}, line {checkpoint['line']})")
+
+    started = time.time()
+    processed_count = 0
+    lines = iter_lines(inputs, checkpoint['file_index'], checkpoint['line'])
+
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        for batch, (file_index, line_number) in iter_batches(lines, args.batch_size):
+            analyses = list(pool.map(analyze, batch, chunksize=max(1, len(batch) // (args.processes * 4))))
+            summaries = asyncio.run(summarize_all(batch, args.llm_concurrency))
+
+            # One gzip member per batch; concatenated members are a valid gzip file
+            with gzip.open(args.output, 'at', encoding='utf-8') as out:
+                for offset, (article, (topic, bias_analysis), summary) in enumerate(zip(batch, analyses, summaries)):
+                    record = build_processed_article(
+                        checkpoint['articles'] + offset + 1, article, topic, summary, bias_analysis
+                    )
+                    out.write(json.dumps(record.to_dict()) + '\n')
+
+            checkpoint.update({
+                'file_index': file_index,
+                'line': line_number,
+                'output_bytes': os.path.getsize(args.output),
+                'articles': checkpoint['articles'] + len(batch)
+            })
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            processed_count += len(batch)
+            elapsed = time.time() - started
+            print(f"{checkpoint['articles']} articles done ({processed_count / elapsed:.1f}/s)")
+
+    print(f"Finished: {checkpoint['articles']} articles written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
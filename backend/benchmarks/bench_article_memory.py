@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bytes per processed article held in memory: plain dicts versus
+ArticleRecord.
+
+Articles are decoded from JSON, as they are when read from the shared
+cache, so repeated strings such as the source and topic are separate
+objects unless interned:
+
+    python benchmarks/bench_article_memory.py --sizes 10000 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from articles import ArticleRecord, fallback_summary
+from stubs import make_articles
+
+TOPICS = ['Technology', 'Business', 'Science', 'Health', 'Sports', 'Politics']
+
+
+def processed_json(n, seed=0):
+    """JSON lines of processed articles in the API shape."""
+    rng = random.Random(seed)
+    lines = []
+    for i, article in enumerate(make_articles(n, seed)):
+        compound = round(rng.uniform(-1, 1), 3)
+        lines.append(json.dumps({
+            'id': i + 1,
+            'title': article['title'],
+            'description': article['description'],
+            'content': article['content'],
+            'url': article['url'],
+            'urlToImage': article['urlToImage'],
+            'publishedAt': article['publishedAt'],
+            'source': article['source']['name'],
+            'topic': rng.choice(TOPICS),
+            # Half with an LLM summary, half with the description fallback
+            'summary': f"Summary of article {i}." if i % 2 else fallback_summary(article['description']),
+            'bias_analysis': {
+                'bias_score': round(rng.uniform(0, 100), 1),
+                'bias_type': rng.choice(['neutral', 'positive', 'negative', 'mixed']),
+                'confidence': round(rng.uniform(0, 100), 1),
+                'sentiment_breakdown': {'positive': 0.1, 'negative': 0.05, 'neutral': 0.85, 'compound': compound}
+            }
+        }))
+    return lines
+
+
+def measure(lines, build):
+    """Bytes still allocated after building all articles from `lines`."""
+    gc.collect()
+    tracemalloc.start()
+    articles = [build(json.loads(line)) for line in lines]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del articles
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'articles':>9} {'dict B/article':>15} {'record B/article':>17} {'saved':>7}")
+    for n in args.sizes:
+        lines = processed_json(n)
+        as_dicts = measure(lines, lambda data: data)
+        as_records = measure(lines, ArticleRecord.from_dict)
+        print(f"{n:>9} {as_dicts / n:>15.0f} {as_records / n:>17.0f} {1 - as_records / as_dicts:>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Compare the single-call and parallel conversation modes on end-to-end
+latency and parse-failure rate.
+
+Runs generate_conversation in-process against a local LLM stub whose
+latency grows with output length and which truncates a share of its
+replies (no keys needed):
+
+    python benchmarks/bench_conversation_modes.py --runs 20 --token-latency 0.005 --malformed-rate 0.1
+
+Pass --provider openai to go through the OpenAI client instead.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import LLMStub, make_articles
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider', choices=['anthropic', 'openai'], default='anthropic')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.1, help='stub time to first token (seconds)')
+    parser.add_argument('--token-latency', type=float, default=0.005, help='stub seconds per output token')
+    parser.add_argument('--malformed-rate', type=float, default=0.1, help='share of stub replies with broken JSON')
+    parser.add_argument('--style', default='casual', choices=['casual', 'genz'])
+    args = parser.parse_args()
+
+    with LLMStub(latency=args.latency, cached_latency=args.latency, token_latency=args.token_latency,
+                 malformed_rate=args.malformed_rate) as llm:
+        os.environ.update(
+            NEWS_API_KEY='bench',
+            ANTHROPIC_API_KEY='bench' if args.provider == 'anthropic' else '',
+            ANTHROPIC_BASE_URL=llm.url,
+            OPENAI_API_KEY='bench' if args.provider == 'openai' else '',
+            OPENAI_BASE_URL=f"{llm.url}/v1",
+            PLAZA_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+            PREFETCH_TOP_N='0',
+            ROOM_REFRESH_SECONDS='0'
+        )
+        sys.path.insert(0, BACKEND_DIR)
+        import app
+
+        articles = [
+            dict(article, source=article['source']['name'], bias_analysis={'bias_type': 'neutral'})
+            for article in make_articles(5)
+        ]
+        for mode in ('single', 'parallel'):
+            app.CONVERSATION_MODE = mode
+            for _ in range(args.runs):
+                app.generate_conversation(articles, 'Technology', args.style)
+
+        print(f"{'mode':<10} {'runs':>5} {'messages':>9} {'p50 ms':>9} {'p95 ms':>9} {'parse fail':>11}")
+        for mode, stats in app.conversation_stats.snapshot().items():
+            print(f"{mode:<10} {stats['runs']:>5} {stats['avg_messages']:>9} {stats['latency_ms_p50']:>9} "
+                  f"{stats['latency_ms_p95']:>9} {stats['parse_failure_rate']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Exercise the full-text fetch stage against a local article site stub.
+
+Fetches every article page three times: cold (downloads), warm (served
+from the disk cache) and stale (revalidated, answered with 304). Checks
+that the per-host limit is respected and that the main text is extracted:
+
+    python benchmarks/bench_fulltext.py --articles 50 --per-host 4 --latency 0.05
+
+Exits with status 1 if a check fails.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fulltext import FullTextFetcher
+from shared_cache import SharedCache
+from stubs import ArticleSiteStub, make_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub seconds per page')
+    args = parser.parse_args()
+
+    with ArticleSiteStub(latency=args.latency) as site:
+        articles = make_articles(args.articles, base_url=site.url)
+        urls = [article['url'] for article in articles]
+        cache = SharedCache(os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+                            'article_text', ttl_seconds=86400, max_entries=args.articles * 2)
+        fetcher = FullTextFetcher(cache, max_workers=args.workers, per_host=args.per_host)
+
+        failures = []
+        print(f"{'pass':<12} {'seconds':>8} {'texts':>6} {'requests':>9} {'304s':>5}")
+        for name in ('cold', 'warm', 'revalidate'):
+            if name == 'revalidate':
+                fetcher.fresh_seconds = 0
+            requests_before, not_modified_before = site.requests, site.not_modified
+            started = time.perf_counter()
+            texts = fetcher.fetch_all(urls)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<12} {elapsed:>8.2f} {len(texts):>6} {site.requests - requests_before:>9} "
+                  f"{site.not_modified - not_modified_before:>5}")
+            if len(texts) != len(urls):
+                failures.append(f"{name}: only {len(texts)} of {len(urls)} texts")
+
+        if site.max_in_flight > args.per_host:
+            failures.append(f"{site.max_in_flight} requests in flight to one host (limit {args.per_host})")
+        if site.not_modified != len(urls):
+            failures.append(f"{site.not_modified} of {len(urls)} revalidations answered 304")
+        sample = fetcher.cached_text(urls[0])
+        if 'Copyright' in sample or 'Home |' in sample or not sample:
+            failures.append('main text extraction kept navigation/footer or found nothing')
+
+        snippet = sum(len(article['content']) for article in articles) / len(articles)
+        full = sum(len(fetcher.cached_text(url)) for url in urls) / len(urls)
+        print(f"\nmax in flight per host: {site.max_in_flight} (limit {args.per_host})")
+        print(f"avg chars: NewsAPI content {snippet:.0f}, full text {full:.0f}")
+        print(f"fetcher stats: {fetcher.stats()}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Response sizes of the subtopic endpoints with and without field
+projection, compression and conditional requests.
+
+Runs the app in-process against a local NewsAPI stub (no keys needed):
+
+    python benchmarks/bench_payloads.py --articles 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import NewsAPIStub, make_articles
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--topic', default='Technology')
+    args = parser.parse_args()
+
+    with NewsAPIStub(make_articles(args.articles)) as stub:
+        os.environ.update(
+            NEWS_API_KEY='bench',
+            NEWS_API_URL=stub.url,
+            OPENAI_API_KEY='',
+            ANTHROPIC_API_KEY='',
+            PLAZA_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+            PREFETCH_TOP_N='0',
+            ROOM_REFRESH_SECONDS='0'
+        )
+        sys.path.insert(0, BACKEND_DIR)
+        from app import app
+
+        client = app.test_client()
+        listing = client.get(f"/api/subtopics/{args.topic}").get_json()
+        if not listing.get('subtopics'):
+            raise SystemExit('No subtopics were produced; try more --articles')
+        subtopic_id = listing['subtopics'][0]['id']
+
+        cases = [
+            ('listing', f"/api/subtopics/{args.topic}", None),
+            ('listing', f"/api/subtopics/{args.topic}", 'id,title'),
+            ('subtopic', f"/api/subtopic/{args.topic}/{subtopic_id}", None),
+            ('subtopic', f"/api/subtopic/{args.topic}/{subtopic_id}", '-content,-bias_analysis'),
+        ]
+
+        print(f"{'endpoint':<10} {'fields':<26} {'identity':>10} {'gzip':>10} {'br':>10} {'304':>6}")
+        for name, path, fields in cases:
+            url = f"{path}?fields={fields}" if fields else path
+            sizes = []
+            for encoding in ('identity', 'gzip', 'br'):
+                response = client.get(url, headers={'Accept-Encoding': encoding})
+                served = response.headers.get('Content-Encoding', 'identity')
+                sizes.append(f"{len(response.get_data())}" if served == encoding else 'n/a')
+            etag = client.get(url).headers.get('ETag')
+            revalidated = client.get(url, headers={'If-None-Match': etag})
+            print(f"{name:<10} {fields or '(all)':<26} {sizes[0]:>10} {sizes[1]:>10} {sizes[2]:>10} "
+                  f"{len(revalidated.get_data()) if revalidated.status_code == 304 else 'miss':>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Profile the full request pipeline offline by replaying recorded upstream calls.
+
+First record a cassette against the real APIs (keys required):
+
+    PLAZA_CASSETTE_MODE=record python benchmarks/bench_pipeline.py --runs 1
+
+Then replay it as often as needed, with no network and no keys. Set the
+same *_API_KEY variables as when recording (dummy values are fine) so the
+same providers are chosen:
+
+    python benchmarks/bench_pipeline.py --runs 5 --latency-scale 0 --save before.json
+    git checkout my-branch
+    python benchmarks/bench_pipeline.py --runs 5 --latency-scale 0 --compare before.json
+
+Each run is a fresh process with an empty cache, so "cold" timings include
+fetching, enrichment and generation, and "warm" timings show the cached path.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_REQUESTS = [
+    ('GET', '/api/subtopics/Technology', None),
+    ('GET', '/api/topic/Technology', None),
+    ('POST', '/api/chat', {'message': 'What does this mean for us?', 'topic': 'Technology',
+                           'subtopic': 'AI News', 'articles': [], 'history': []})
+]
+
+
+def run_once():
+    """Runs inside a fresh process: time each request cold, then warm."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+
+    client = app.test_client()
+    timings = {}
+    for phase in ('cold', 'warm'):
+        for method, path, body in DEFAULT_REQUESTS:
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            elapsed = time.perf_counter() - started
+            timings[f"{phase} {method} {path}"] = {'seconds': elapsed, 'status': response.status_code}
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--mode', default=os.getenv('PLAZA_CASSETTE_MODE', 'replay'), choices=['record', 'replay'])
+    parser.add_argument('--cassette-dir', default=os.path.join(BACKEND_DIR, 'cassettes'))
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='replay latency multiplier (0 = instant, 1 = as recorded)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare against results saved earlier with --save')
+    parser.add_argument('--run-once', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:
+        run_once()
+        return
+
+    samples = {}
+    for _ in range(args.runs):
+        env = dict(
+            os.environ,
+            PLAZA_CASSETTE_MODE=args.mode,
+            PLAZA_CASSETTE_DIR=args.cassette_dir,
+            PLAZA_CASSETTE_LATENCY_SCALE=str(args.latency_scale),
+            PLAZA_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+            PLAZA_RANDOM_SEED=os.getenv('PLAZA_RANDOM_SEED', '1'),
+            PREFETCH_TOP_N='0',
+            ROOM_REFRESH_SECONDS='0'
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-once'],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        for name, timing in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(timing['seconds'])
+
+    results = {name: statistics.median(values) for name, values in samples.items()}
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{'request':<45} {'median ms':>10} {'baseline':>10} {'change':>8}")
+    for name, seconds in results.items():
+        line = f"{name:<45} {seconds * 1000:>10.1f}"
+        if name in baseline:
+            change = (seconds - baseline[name]) / baseline[name] * 100 if baseline[name] else 0.0
+            line += f" {baseline[name] * 1000:>10.1f} {change:>+7.1f}%"
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check that static prompt prefixes are sent in a cacheable form and report
+cached-token ratios and latency per call site.
+
+Runs the app in-process against local NewsAPI and LLM stubs (no keys
+needed). The LLM stub answers repeated system prompts as cache hits,
+after --cached-latency instead of --latency:
+
+    python benchmarks/bench_prompt_cache.py --provider anthropic
+    python benchmarks/bench_prompt_cache.py --provider openai --latency 0.2 --cached-latency 0.1
+
+Exits with status 1 if a request is missing its system prompt, cache
+breakpoint or caching header, or if a call site made no LLM calls at all.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import LLMStub, NewsAPIStub, make_articles
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Call sites the run below exercises (summaries run in the default SUMMARY_MODE=llm)
+EXPECTED_SITES = ('summary', 'conversation', 'chat')
+
+
+def check_request(provider, recorded):
+    """Problems with one recorded LLM request (empty if it is cacheable)."""
+    body = recorded['body']
+    if provider == 'anthropic':
+        system = body.get('system')
+        if not isinstance(system, list) or not system:
+            return ['no system blocks']
+        problems = []
+        if system[-1].get('cache_control') != {'type': 'ephemeral'}:
+            problems.append('no cache_control breakpoint on the system prompt')
+        headers = {name.lower(): value for name, value in recorded['headers'].items()}
+        if 'prompt-caching' not in headers.get('anthropic-beta', ''):
+            problems.append('no prompt-caching beta header')
+        return problems
+    messages = body.get('messages', [])
+    if not messages or messages[0].get('role') != 'system':
+        return ['system prompt is not the first message']
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider', choices=['anthropic', 'openai'], default='anthropic')
+    parser.add_argument('--articles', type=int, default=40)
+    parser.add_argument('--chat-messages', type=int, default=6)
+    parser.add_argument('--topic', default='Technology')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub latency for uncached prompts (seconds)')
+    parser.add_argument('--cached-latency', type=float, default=0.02, help='stub latency for cached prompts (seconds)')
+    args = parser.parse_args()
+
+    with NewsAPIStub(make_articles(args.articles)) as news, LLMStub(args.latency, args.cached_latency) as llm:
+        os.environ.update(
+            NEWS_API_KEY='bench',
+            NEWS_API_URL=news.url,
+            ANTHROPIC_API_KEY='bench' if args.provider == 'anthropic' else '',
+            ANTHROPIC_BASE_URL=llm.url,
+            OPENAI_API_KEY='bench' if args.provider == 'openai' else '',
+            OPENAI_BASE_URL=f"{llm.url}/v1",
+            PLAZA_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+            PREFETCH_TOP_N='0',
+            ROOM_REFRESH_SECONDS='0',
+            SUMMARY_MODE='llm'
+        )
+        sys.path.insert(0, BACKEND_DIR)
+        from app import app
+
+        client = app.test_client()
+        listing = client.get(f"/api/subtopics/{args.topic}").get_json()
+        if not listing.get('subtopics'):
+            raise SystemExit('No subtopics were produced; try more --articles')
+        for subtopic in listing['subtopics'][:3]:
+            client.get(f"/api/subtopic/{args.topic}/{subtopic['id']}")
+
+        subtopic = listing['subtopics'][0]
+        session = client.post('/api/chat/session', json={
+            'subtopic_id': subtopic['id'], 'topic': args.topic, 'subtopic': subtopic['title'], 'articles': []
+        }).get_json()
+        for i in range(args.chat_messages):
+            client.post('/api/chat', json={
+                'session_id': session['session_id'], 'subtopic_id': subtopic['id'],
+                'message': f"Question number {i} about why this matters?"
+            })
+
+        failures = 0
+        for recorded in llm.requests:
+            for problem in check_request(args.provider, recorded):
+                failures += 1
+                print(f"FAIL {recorded['path']}: {problem}")
+        print(f"{len(llm.requests)} {args.provider} requests checked, {failures} problems\n")
+
+        prompts = client.get('/api/metrics').get_json()['prompts']
+        print(f"{'site':<14} {'calls':>6} {'prefix tok':>11} {'cached ratio':>13} {'ms cached':>10} {'ms uncached':>12}")
+        for site, stats in prompts.items():
+            print(f"{site:<14} {stats.get('llm_calls', 0):>6} {stats.get('avg_prefix_tokens', 0):>11} "
+                  f"{stats.get('cached_token_ratio', 0.0):>13} {str(stats.get('avg_latency_ms_cached')):>10} "
+                  f"{str(stats.get('avg_latency_ms_uncached')):>12}")
+
+        # Calls that failed before reaching the stub would otherwise pass unchecked
+        for site in EXPECTED_SITES:
+            if not prompts.get(site, {}).get('llm_calls'):
+                failures += 1
+                print(f"FAIL {site}: no LLM calls recorded")
+        if not llm.requests:
+            failures += 1
+            print("FAIL no requests reached the LLM stub")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Summary throughput: the local extractive summarizer versus the LLM path.
+
+The extractive side runs summarize_batch over batches of synthetic
+articles. The LLM side runs summarize_article in-process against a local
+LLM stub (no keys needed), one article at a time as process_articles
+does:
+
+    python benchmarks/bench_summaries.py --articles 2000 --llm-articles 20 --latency 0.5
+
+Use --skip-llm to time only the extractive summarizer (needs only numpy).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stubs import LLMStub, make_articles
+from summarizer import summarize_batch
+
+
+def report(name, seconds, count, summaries):
+    lengths = [len(summary) for summary in summaries if summary]
+    print(f"{name:<12} {count:>8} {count / seconds:>12.1f} {seconds / count * 1000:>12.2f} "
+          f"{sum(lengths) / (len(lengths) or 1):>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=2000, help='articles for the extractive summarizer')
+    parser.add_argument('--batch-size', type=int, default=50, help='articles per summarize_batch call')
+    parser.add_argument('--llm-articles', type=int, default=20, help='articles for the LLM path')
+    parser.add_argument('--provider', choices=['anthropic', 'openai'], default='anthropic')
+    parser.add_argument('--latency', type=float, default=0.5, help='stub seconds per LLM call')
+    parser.add_argument('--skip-llm', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'path':<12} {'articles':>8} {'articles/s':>12} {'ms/article':>12} {'avg chars':>10}")
+
+    articles = make_articles(args.articles)
+    started = time.perf_counter()
+    summaries = []
+    for i in range(0, len(articles), args.batch_size):
+        summaries.extend(summarize_batch(articles[i:i + args.batch_size]))
+    report('extractive', time.perf_counter() - started, len(articles), summaries)
+
+    if args.skip_llm:
+        return
+
+    with LLMStub(latency=args.latency, cached_latency=args.latency) as llm:
+        os.environ.update(
+            SUMMARY_MODE='llm',
+            ANTHROPIC_API_KEY='bench' if args.provider == 'anthropic' else '',
+            ANTHROPIC_BASE_URL=llm.url,
+            OPENAI_API_KEY='bench' if args.provider == 'openai' else '',
+            OPENAI_BASE_URL=f"{llm.url}/v1",
+            PLAZA_CACHE_PATH=os.path.join(tempfile.mkdtemp(prefix='plaza-bench-'), 'plaza.sqlite3'),
+            PREFETCH_TOP_N='0',
+            ROOM_REFRESH_SECONDS='0'
+        )
+        import app
+
+        articles = make_articles(args.llm_articles)
+        started = time.perf_counter()
+        summaries = [app.summarize_article(article) for article in articles]
+        report('llm', time.perf_counter() - started, len(articles), summaries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Throughput of /api/subtopics/<topic> as the number of gunicorn workers grows.
+
+Starts a local NewsAPI stub, then for each worker count runs the backend
+under gunicorn with a fresh shared cache and hammers it from concurrent
+clients. Reports requests per second, latency percentiles, and how many
+times the stub was called (1 per run means cross-worker coalescing worked).
+
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import NewsAPIStub, make_articles
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_up(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def run_load(url, concurrency, duration):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=120).ok
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def bench(workers, args, stub):
+    port = 5100 + workers
+    cache_dir = tempfile.mkdtemp(prefix='plaza-bench-')
+    env = dict(
+        os.environ,
+        NEWS_API_KEY='bench',
+        NEWS_API_URL=stub.url,
+        OPENAI_API_KEY='',
+        ANTHROPIC_API_KEY='',
+        PLAZA_CACHE_PATH=os.path.join(cache_dir, 'plaza.sqlite3'),
+        PREFETCH_TOP_N='0',
+        ROOM_REFRESH_SECONDS='0',
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}"
+    )
+    stub.requests = 0
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(f"{base}/api/health")
+        latencies, errors = run_load(f"{base}/api/subtopics/{args.topic}", args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        'workers': workers,
+        'rps': len(latencies) / args.duration,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        'errors': errors,
+        'upstream_fetches': stub.requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--upstream-latency', type=float, default=0.5)
+    parser.add_argument('--topic', default='Technology')
+    args = parser.parse_args()
+
+    with NewsAPIStub(make_articles(args.articles), latency=args.upstream_latency) as stub:
+        print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'upstream':>9}")
+        for workers in args.workers:
+            result = bench(workers, args, stub)
+            print(f"{result['workers']:>8} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} "
+                  f"{result['p95_ms']:>8.1f} {result['errors']:>7} {result['upstream_fetches']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+Synthetic NewsAPI data and local stub servers (NewsAPI, LLM providers, article pages) for benchmarks.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUBJECTS = ['Apple', 'Google', 'Microsoft', 'OpenAI', 'Tesla', 'Meta', 'Amazon', 'Nvidia']
+SOURCES = ['Reuters', 'BBC News', 'The Verge', 'TechCrunch', 'Associated Press', 'Wired']
+PHRASES = [
+    'announced a new artificial intelligence software platform for developers',
+    'faces questions about data privacy in its latest app update',
+    'reported strong earnings as demand for cloud computing and AI hardware grew',
+    'is investing heavily in machine learning research and robotics',
+    'unveiled a cybersecurity initiative after a shocking breach at a startup',
+    'says its new algorithm is a breakthrough for digital innovation'
+]
+
+
+def make_article(i, rng=random, base_url='https://example.com'):
+    subject = rng.choice(SUBJECTS)
+    phrase = rng.choice(PHRASES)
+    published = datetime(2024, 1, 15) - timedelta(minutes=i * 7)
+    body = ' '.join(f"{subject} {rng.choice(PHRASES)}." for _ in range(8))
+    return {
+        'source': {'id': None, 'name': rng.choice(SOURCES)},
+        'author': 'Staff',
+        'title': f"{subject} {phrase} ({i})",
+        'description': f"{subject} {phrase}. Analysts said the technology could reshape the industry.",
+        'url': f"{base_url}/{subject.lower()}/{i}",
+        'urlToImage': f"{base_url}/{subject.lower()}/{i}.jpg",
+        'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'content': body[:200] + ' [+2400 chars]'
+    }
+
+
+def make_articles(n, seed=0, base_url='https://example.com'):
+    rng = random.Random(seed)
+    return [make_article(i, rng, base_url) for i in range(n)]
+
+
+class NewsAPIStub:
+    """Serves a fixed article list in NewsAPI's format and counts requests."""
+
+    def __init__(self, articles, latency=0.0, port=0):
+        self.articles = articles
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = json.dumps({
+                    'status': 'ok',
+                    'totalResults': len(stub.articles),
+                    'articles': stub.articles
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v2/everything"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LLMStub:
+    """Minimal Anthropic Messages and OpenAI Chat Completions server.
+
+    Records every request (path, headers, JSON body) and simulates prefix
+    caching: a system prompt seen before is reported as cached and answered
+    faster. Replies take `token_latency` per output token, and a share of
+    them (`malformed_rate`) are cut short to break their JSON. Point the
+    SDKs at it with ANTHROPIC_BASE_URL / OPENAI_BASE_URL.
+    """
+
+    def __init__(self, latency=0.0, cached_latency=0.0, token_latency=0.0, malformed_rate=0.0, seed=0, port=0):
+        self.latency = latency
+        self.cached_latency = cached_latency
+        self.token_latency = token_latency
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self.requests = []
+        self._seen = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub._lock:
+                    stub.requests.append({'path': self.path, 'headers': dict(self.headers), 'body': body})
+                if self.path.endswith('/messages'):
+                    payload = stub._anthropic(body)
+                else:
+                    payload = stub._openai(body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _cache(self, prefix):
+        """Returns (cached_tokens, written_tokens) for a prefix and sleeps accordingly."""
+        tokens = len(prefix) // 4
+        with self._lock:
+            hit = prefix in self._seen
+            self._seen.add(prefix)
+        time.sleep(self.cached_latency if hit and tokens else self.latency)
+        return (tokens, 0) if hit else (0, tokens)
+
+    def _reply(self, system):
+        if 'JSON plan' in system:
+            text = json.dumps([
+                {'speaker': SOURCES[i % len(SOURCES)], 'article': i % 3 + 1, 'angle': f"Angle number {i}"}
+                for i in range(7)
+            ])
+        elif 'JSON object' in system:
+            text = json.dumps({'text': 'Big news today, worth watching closely.', 'quote': 'A relevant quote.'})
+        elif 'JSON array' in system:
+            text = json.dumps([
+                {'speaker': SOURCES[i % len(SOURCES)], 'side': 'left' if i % 2 == 0 else 'right',
+                 'text': 'Big news today, worth watching closely.', 'timestamp': '2024-01-15T10:30:00Z',
+                 'source_url': 'https://example.com', 'quote': 'A relevant quote from the article.'}
+                for i in range(7)
+            ])
+        else:
+            text = 'A short stub reply.'
+        with self._lock:
+            malformed = self._rng.random() < self.malformed_rate
+        if malformed:
+            text = text[:len(text) // 2]
+        time.sleep(self.token_latency * (len(text) // 4))
+        return text
+
+    def _anthropic(self, body):
+        system = body.get('system') or ''
+        if isinstance(system, list):
+            system = ''.join(block.get('text', '') for block in system)
+        cached, written = self._cache(system)
+        user_tokens = len(json.dumps(body.get('messages', []))) // 4
+        return {
+            'id': 'msg_stub', 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+            'content': [{'type': 'text', 'text': self._reply(system)}],
+            'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': user_tokens, 'output_tokens': 20,
+                      'cache_read_input_tokens': cached, 'cache_creation_input_tokens': written}
+        }
+
+    def _openai(self, body):
+        messages = body.get('messages', [])
+        system = messages[0]['content'] if messages and messages[0].get('role') == 'system' else ''
+        cached, _ = self._cache(system)
+        prompt_tokens = len(json.dumps(messages)) // 4
+        return {
+            'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': 0, 'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': self._reply(system)},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 20, 'total_tokens': prompt_tokens + 20,
+                      'prompt_tokens_details': {'cached_tokens': cached}}
+        }
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ArticleSiteStub:
+    """Serves an HTML page for any path, with ETag/Last-Modified revalidation.
+
+    Counts requests, 304 responses and the highest number of requests in
+    flight at once (all paths share one host).
+    """
+
+    LAST_MODIFIED = 'Mon, 15 Jan 2024 10:00:00 GMT'
+
+    def __init__(self, latency=0.0, paragraphs=12, port=0):
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self.requests = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    body = stub.page(self.path).encode('utf-8')
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                    not_modified = self.headers.get('If-None-Match') == etag or \
+                        self.headers.get('If-Modified-Since') == stub.LAST_MODIFIED
+                finally:
+                    # Leave the count before replying, or a client may start its next request first
+                    with stub._lock:
+                        stub.in_flight -= 1
+                if not_modified:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', stub.LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def page(self, path):
+        rng = random.Random(path)
+        subject = rng.choice(SUBJECTS)
+        paragraphs = ''.join(
+            f"<p>{subject} {rng.choice(PHRASES)}, according to people familiar with the matter. "
+            f"The company {rng.choice(PHRASES)}.</p>"
+            for _ in range(self.paragraphs)
+        )
+        return (f"<html><head><title>{subject}</title><script>var tracking = 1;</script></head><body>"
+                f"<nav><p>Home | World | Business | Technology | Science | Sports</p></nav>"
+                f"<article><h1>{subject} news</h1>{paragraphs}</article>"
+                f"<footer><p>Copyright 2024 Example News. All rights reserved worldwide.</p></footer></body></html>")
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,113 @@
+"""
+Record/replay of upstream calls (NewsAPI, OpenAI, Anthropic).
+
+In record mode every upstream response is written to disk next to the
+request that produced it, keyed by a hash of the normalized request. In
+replay mode the same requests are answered from disk, optionally sleeping
+for the recorded (or scaled) latency, so the full pipeline can be profiled
+offline and deterministically and runs can be compared between revisions.
+
+    PLAZA_CASSETTE_MODE=record|replay|off
+    PLAZA_CASSETTE_DIR=cassettes
+    PLAZA_CASSETTE_LATENCY_SCALE=1.0   # 0 replays instantly
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+# Request fields that change between otherwise identical calls
+VOLATILE_FIELDS = {'apiKey', 'api_key', 'from', 'to'}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recording exists for a request."""
+
+
+def normalize(value):
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, str):
+        return _WHITESPACE.sub(' ', value).strip()
+    return value
+
+
+def request_hash(kind, request):
+    payload = json.dumps([kind, normalize(request)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    def __init__(self, mode='off', directory='cassettes', latency_scale=1.0):
+        if mode not in ('off', 'record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, key[:2], f"{key}.json")
+
+    def _count(self, kind, field, latency=0.0):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {'recorded': 0, 'replayed': 0, 'misses': 0, 'latency_seconds': 0.0})
+            stats[field] += 1
+            stats['latency_seconds'] += latency
+
+    def call(self, kind, request, fn):
+        """Return `fn()` (a JSON-serializable response), recording or replaying it."""
+        if self.mode == 'off':
+            return fn()
+
+        key = request_hash(kind, request)
+        path = self._path(kind, key)
+
+        if self.mode == 'replay':
+            try:
+                with open(path, encoding='utf-8') as f:
+                    recording = json.load(f)
+            except FileNotFoundError:
+                self._count(kind, 'misses')
+                raise CassetteMiss(f"No {kind} recording for request {key[:12]}")
+            latency = recording['latency'] * self.latency_scale
+            if latency > 0:
+                time.sleep(latency)
+            self._count(kind, 'replayed', latency)
+            return recording['response']
+
+        started = time.perf_counter()
+        response = fn()
+        latency = time.perf_counter() - started
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'kind': kind,
+                'request': normalize(request),
+                'response': response,
+                'latency': latency,
+                'recorded_at': datetime.now().isoformat()
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._count(kind, 'recorded', latency)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'latency_scale': self.latency_scale,
+                'calls': {kind: dict(stats, latency_seconds=round(stats['latency_seconds'], 3))
+                          for kind, stats in self._stats.items()}
+            }
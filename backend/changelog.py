@@ -0,0 +1,218 @@
+"""
+Append-only log of processed articles, for incremental feeds.
+
+Each time a feed's articles are processed, the ones that are new or
+whose content changed (summary, bias analysis, ...) are appended to a
+SQLite table. Sequence numbers come from AUTOINCREMENT, so cursors
+increase monotonically across all worker processes sharing the file. A
+client passes the last cursor it saw and gets only the later entries.
+Old entries are trimmed, and each feed remembers the newest of its
+entries that were dropped. A cursor from before that point cannot be
+served and the client has to reload the full list.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed TEXT NOT NULL,
+    key TEXT NOT NULL,
+    article TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_feed ON changes (feed, seq);
+CREATE TABLE IF NOT EXISTS change_heads (
+    feed TEXT NOT NULL,
+    key TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (feed, key)
+);
+CREATE TABLE IF NOT EXISTS change_trims (
+    feed TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+
+
+def _connect(path):
+    """One connection per thread, process and database file."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn_key = (path, os.getpid())
+    conn = connections.get(conn_key)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[conn_key] = conn
+    return conn
+
+
+def _as_dict(article):
+    return article.to_dict() if hasattr(article, 'to_dict') else dict(article)
+
+
+def content_digest(article):
+    """Hash of everything but the batch-position `id`, so only real changes are logged."""
+    data = {key: value for key, value in article.items() if key != 'id'}
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ChangeLog:
+    """Monotonic change feed of articles per feed name, keyed by article URL."""
+
+    def __init__(self, path, max_entries=20000, poll_interval=0.5):
+        self.path = path
+        self.max_entries = max_entries
+        self.poll_interval = poll_interval
+        self._changed = threading.Condition()
+        self._lock = threading.Lock()
+        self.appended = 0
+        self.resets = 0
+        self._appends = 0
+
+    def append(self, feed, articles):
+        """Log the articles that are new or changed. Returns the feed's cursor afterwards."""
+        conn = _connect(self.path)
+        now = time.time()
+        appended = 0
+        # One write transaction, so the digest check and the insert see the same heads
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for article in articles:
+                data = _as_dict(article)
+                key = data.get('url')
+                if not key:
+                    continue
+                digest = content_digest(data)
+                head = conn.execute(
+                    'SELECT digest FROM change_heads WHERE feed = ? AND key = ?', (feed, key)
+                ).fetchone()
+                if head is not None and head[0] == digest:
+                    continue
+                seq = conn.execute(
+                    'INSERT INTO changes (feed, key, article, created_at) VALUES (?, ?, ?, ?)',
+                    (feed, key, json.dumps(data), now)
+                ).lastrowid
+                conn.execute(
+                    'INSERT OR REPLACE INTO change_heads (feed, key, digest, seq) VALUES (?, ?, ?, ?)',
+                    (feed, key, digest, seq)
+                )
+                appended += 1
+            cursor = self._latest(conn, feed)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        if appended:
+            with self._lock:
+                self.appended += appended
+                self._appends += 1
+                trim = self._appends % 20 == 0
+            if trim:
+                self.trim()
+            with self._changed:
+                self._changed.notify_all()
+        return cursor
+
+    @staticmethod
+    def _trimmed(conn, feed):
+        row = conn.execute('SELECT seq FROM change_trims WHERE feed = ?', (feed,)).fetchone()
+        return row[0] if row else 0
+
+    @classmethod
+    def _latest(cls, conn, feed):
+        row = conn.execute('SELECT MAX(seq) FROM changes WHERE feed = ?', (feed,)).fetchone()
+        # A feed whose entries were all trimmed keeps its position
+        return max(row[0] or 0, cls._trimmed(conn, feed))
+
+    def latest(self, feed):
+        """Cursor of the newest entry of `feed` (0 if there is none)."""
+        return self._latest(_connect(self.path), feed)
+
+    def since(self, feed, cursor, limit=500):
+        """(articles, next_cursor, has_more) for `feed` after `cursor`, or None if the log no longer reaches back that far.
+
+        An article changed several times in the range is returned once, in its latest version.
+        """
+        conn = _connect(self.path)
+        # Read the bound first so entries appended meanwhile are left for the next call
+        newest = self._latest(conn, feed)
+        if cursor < self._trimmed(conn, feed):
+            with self._lock:
+                self.resets += 1
+            return None
+        rows = conn.execute(
+            'SELECT seq, key, article FROM changes WHERE feed = ? AND seq > ? AND seq <= ? ORDER BY seq LIMIT ?',
+            (feed, cursor, newest, limit)
+        ).fetchall()
+        has_more = len(rows) == limit
+        latest_by_key = {}
+        for seq, key, article in rows:
+            latest_by_key.pop(key, None)
+            latest_by_key[key] = article
+        next_cursor = rows[-1][0] if has_more else max(cursor, newest)
+        return [json.loads(article) for article in latest_by_key.values()], next_cursor, has_more
+
+    def wait(self, feed, cursor, timeout, refresh=None):
+        """Block until `feed` has entries after `cursor` or `timeout` seconds pass. Returns True on new entries.
+
+        Appends in this process wake waiters at once; other workers' are seen within poll_interval.
+        `refresh()`, if given, is called before each check, e.g. to reload the feed once it is stale.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if refresh is not None:
+                refresh()
+            if self.latest(feed) > cursor:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def trim(self):
+        """Drop all but the newest max_entries entries (and the heads pointing at them).
+
+        Each feed records the newest of its entries dropped, so only cursors from
+        before it are reset.
+        """
+        conn = _connect(self.path)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT MAX(seq) FROM changes').fetchone()
+            cutoff = (row[0] or 0) - self.max_entries
+            if cutoff > 0:
+                conn.execute(
+                    'INSERT OR REPLACE INTO change_trims (feed, seq) '
+                    'SELECT feed, MAX(seq) FROM changes WHERE seq <= ? GROUP BY feed',
+                    (cutoff,)
+                )
+                conn.execute('DELETE FROM changes WHERE seq <= ?', (cutoff,))
+                conn.execute('DELETE FROM change_heads WHERE seq <= ?', (cutoff,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stats(self):
+        conn = _connect(self.path)
+        entries, newest = conn.execute('SELECT COUNT(*), MAX(seq) FROM changes').fetchone()
+        with self._lock:
+            return {'entries': entries, 'cursor': newest or 0, 'appended': self.appended, 'resets': self.resets}
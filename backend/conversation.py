@@ -0,0 +1,104 @@
+"""
+Helpers for the parallel conversation mode and per-mode statistics.
+
+In parallel mode one short call plans the speakers, the article each one
+reacts to and their angle. Each message is then generated by its own call
+from the shared article context, and each result is checked on its own,
+so a malformed reply costs one message rather than the whole conversation.
+"""
+
+import json
+import threading
+from collections import deque
+
+MIN_TURNS = 2
+MAX_TURNS = 8
+
+
+def _json_slice(text, opener, closer):
+    start = text.find(opener)
+    end = text.rfind(closer)
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_plan(text, article_count, max_turns=MAX_TURNS):
+    """Validated turns from a plan reply, or None if it is unusable.
+
+    Each turn is {'speaker', 'article' (1-based), 'angle'}; invalid turns
+    are dropped.
+    """
+    data = _json_slice(text or '', '[', ']')
+    if not isinstance(data, list):
+        return None
+    turns = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        speaker = item.get('speaker')
+        try:
+            article = int(item.get('article'))
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(speaker, str) or not speaker.strip() or not 1 <= article <= article_count:
+            continue
+        turns.append({'speaker': speaker.strip(), 'article': article, 'angle': str(item.get('angle', '')).strip()})
+    return turns[:max_turns] if len(turns) >= MIN_TURNS else None
+
+
+def default_plan(articles, turns=6):
+    """Plan used when the planning call fails: rotate through the articles."""
+    return [
+        {'speaker': articles[i % len(articles)].get('source', 'Unknown'), 'article': i % len(articles) + 1, 'angle': ''}
+        for i in range(turns)
+    ]
+
+
+def parse_message(text):
+    """{'text', 'quote'} from a single-message reply, or None if malformed."""
+    data = _json_slice(text or '', '{', '}')
+    if not isinstance(data, dict):
+        return None
+    message = data.get('text')
+    if not isinstance(message, str) or not message.strip():
+        return None
+    return {'text': message.strip(), 'quote': str(data.get('quote', '') or '').strip()}
+
+
+class ConversationStats:
+    """End-to-end latency and parse failures per generation mode."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._modes = {}
+
+    def record(self, mode, seconds, messages, parses, parse_failures):
+        with self._lock:
+            stats = self._modes.setdefault(mode, {
+                'runs': 0, 'messages': 0, 'parses': 0, 'parse_failures': 0,
+                'latencies': deque(maxlen=self._window)
+            })
+            stats['runs'] += 1
+            stats['messages'] += messages
+            stats['parses'] += parses
+            stats['parse_failures'] += parse_failures
+            stats['latencies'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for mode, stats in self._modes.items():
+                latencies = sorted(stats['latencies'])
+                result[mode] = {
+                    'runs': stats['runs'],
+                    'avg_messages': round(stats['messages'] / stats['runs'], 1),
+                    'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 1),
+                    'latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                    'parse_failure_rate': round(stats['parse_failures'] / stats['parses'], 3) if stats['parses'] else 0.0
+                }
+            return result
@@ -0,0 +1,94 @@
+"""
+Per-request latency budgets, propagated through a context variable.
+
+An endpoint starts a budget and every stage below it asks how much time
+is left. This covers upstream HTTP timeouts, LLM call timeouts, LLM
+queue waits and the conversation parsing fallbacks. A stage that gives
+up early records itself with mark_partial(). The response can then be
+marked partial, and caches can avoid storing the degraded result.
+
+Work running outside a budget (background threads, batch jobs) sees no
+deadline: remaining() is None and timeout(default) returns `default`.
+Thread pools do not inherit context variables; submit work with
+contextvars.copy_context().run to keep the caller's budget.
+"""
+
+import contextvars
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage is asked to start after the budget ran out."""
+
+
+class Budget:
+    __slots__ = ('expires_at', 'stages', 'cuts')
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        self.stages = []   # stages cut short, in order, without repeats
+        self.cuts = 0      # every mark_partial() call, including repeats
+
+
+_budget = contextvars.ContextVar('plaza_budget', default=None)
+
+
+def start(seconds):
+    """Start a budget of `seconds` for the current context. Returns a token for finish()."""
+    return _budget.set(Budget(seconds))
+
+
+def finish(token):
+    _budget.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget (never negative), or None without one."""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return max(0.0, budget.expires_at - time.monotonic())
+
+
+def expired(reserve=0.0):
+    """True if less than `reserve` seconds of the budget are left."""
+    left = remaining()
+    return left is not None and left <= reserve
+
+
+def timeout(default):
+    """`default` (seconds, a (connect, read) tuple or None) capped at what is left.
+
+    Raises DeadlineExceeded if nothing is left.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded('request deadline exceeded')
+    if default is None:
+        return left
+    if isinstance(default, tuple):
+        return tuple(min(part, left) for part in default)
+    return min(default, left)
+
+
+def mark_partial(stage):
+    """Record that `stage` returned less than it would have with more time."""
+    budget = _budget.get()
+    if budget is None:
+        return
+    budget.cuts += 1
+    if stage not in budget.stages:
+        budget.stages.append(stage)
+
+
+def partial_stages():
+    budget = _budget.get()
+    return list(budget.stages) if budget is not None else []
+
+
+def cuts():
+    """Number of mark_partial() calls so far; compare before and after a computation to tell if it was cut short."""
+    budget = _budget.get()
+    return budget.cuts if budget is not None else 0
@@ -0,0 +1,236 @@
+"""
+Full-article text fetching for enrichment.
+
+NewsAPI's `content` is cut off at about 200 characters. The fetcher
+downloads the article pages concurrently (a thread pool, since the rest
+of the backend uses requests), with a per-host concurrency limit and
+timeouts. It extracts the main text from the HTML and keeps it in a
+disk-backed cache. Stale cache entries are revalidated with
+If-None-Match / If-Modified-Since, so unchanged pages cost a 304.
+"""
+
+import codecs
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+import requests
+
+# Elements whose text is never part of the article body
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'figure', 'button'}
+MIN_PARAGRAPH_CHARS = 40
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+class _ParagraphParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []          # (inside <article>, text)
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'article':
+            self._article_depth += 1
+        elif tag == 'p' and not self._skip_depth:
+            self._current = []
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'article':
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag == 'p' and self._current is not None:
+            text = ' '.join(''.join(self._current).split())
+            if len(text) >= MIN_PARAGRAPH_CHARS:
+                self.paragraphs.append((self._article_depth > 0, text))
+            self._current = None
+
+    def handle_data(self, data):
+        if self._current is not None and not self._skip_depth:
+            self._current.append(data)
+
+
+def extract_main_text(html, max_chars=10000):
+    """Article body from a page: its substantial <p> paragraphs, preferring those inside <article>."""
+    parser = _ParagraphParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    in_article = [text for inside, text in parser.paragraphs if inside]
+    paragraphs = in_article or [text for _, text in parser.paragraphs]
+    return '\n\n'.join(paragraphs)[:max_chars]
+
+
+def _codec(name):
+    """Python's name for an encoding label, or None if unknown."""
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def decode_html(body, content_type='', header_encoding=None):
+    """Text of an HTML page in the first encoding found of: the Content-Type
+    charset, a <meta charset>, UTF-8 (if the bytes are valid UTF-8), a detected one.
+
+    `header_encoding` (e.g. requests' response.encoding) only counts when the
+    header names a charset; requests reports ISO-8859-1 for any text/* without one.
+    """
+    encoding = None
+    if header_encoding and 'charset' in content_type.lower():
+        encoding = _codec(header_encoding)
+    if encoding is None:
+        match = _META_CHARSET.search(body[:4096])
+        encoding = _codec(match.group(1)) if match else None
+    if encoding is None:
+        try:
+            # Not final: the body may have been cut off in the middle of a character
+            codecs.getincrementaldecoder('utf-8')().decode(body, final=False)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            detector = getattr(requests.compat, 'chardet', None)
+            detected = detector.detect(body).get('encoding') if detector is not None else None
+            encoding = (detected and _codec(detected)) or 'utf-8'
+    return body.decode(encoding, errors='replace')
+
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class FullTextFetcher:
+    """Concurrent, cached full-text downloads.
+
+    `cache` needs get(key) and set(key, value) (a SharedCache). `wrap(url, fn)`
+    may wrap each download, e.g. to record or replay it.
+    """
+
+    def __init__(self, cache, max_workers=16, per_host=2, timeout=(3.05, 10), fresh_seconds=21600,
+                 retry_seconds=3600, max_bytes=2_000_000, max_chars=10000, wrap=None,
+                 user_agent='Plaza/1.0 (news discussion app)'):
+        self.cache = cache
+        self.per_host = per_host
+        self.timeout = timeout
+        self.fresh_seconds = fresh_seconds
+        self.retry_seconds = retry_seconds
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.wrap = wrap or (lambda url, fn: fn())
+        self.user_agent = user_agent
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fulltext')
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'fetched': 0, 'not_modified': 0, 'cache_hits': 0, 'errors': 0, 'bytes': 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _session(self):
+        # requests.Session is not thread-safe; one per worker thread keeps connections reusable
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.headers['User-Agent'] = self.user_agent
+        return self._local.session
+
+    def _download(self, url, entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        with self._host_slot(url):
+            with self._session().get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    return {'status': 304}
+                response.raise_for_status()
+                if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                    return {'status': response.status_code, 'text': ''}
+                body = b''
+                for chunk in response.iter_content(65536):
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                html = decode_html(body, response.headers.get('Content-Type', ''), response.encoding)
+                return {
+                    'status': response.status_code,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'bytes': len(body),
+                    'text': extract_main_text(html, self.max_chars)
+                }
+
+    def fetch(self, url):
+        """Full text for one URL ('' if unavailable), from the cache when fresh."""
+        key = url_key(url)
+        entry = self.cache.get(key)
+        now = time.time()
+        if entry:
+            fresh_for = self.fresh_seconds if entry.get('text') else self.retry_seconds
+            if now - entry['checked_at'] < fresh_for:
+                self._count('cache_hits')
+                return entry.get('text', '')
+
+        try:
+            result = self.wrap(url, lambda: self._download(url, entry))
+        except Exception as e:
+            print(f"Error fetching article text from {url}: {e}")
+            self._count('errors')
+            # Keep serving what we had; otherwise remember the failure to avoid hammering the site
+            self.cache.set(key, dict(entry or {'text': ''}, checked_at=now))
+            return (entry or {}).get('text', '')
+
+        if result['status'] == 304 and entry:
+            self._count('not_modified')
+            self.cache.set(key, dict(entry, checked_at=now))
+            return entry.get('text', '')
+
+        self._count('fetched')
+        self._count('bytes', result.get('bytes', 0))
+        self.cache.set(key, {
+            'text': result.get('text', ''),
+            'etag': result.get('etag'),
+            'last_modified': result.get('last_modified'),
+            'checked_at': now
+        })
+        return result.get('text', '')
+
+    def fetch_all(self, urls, timeout=None):
+        """{url: text} for the URLs whose text arrived within `timeout` seconds.
+
+        Downloads still running at the deadline finish in the background and
+        are served from the cache next time.
+        """
+        urls = list(dict.fromkeys(url for url in urls if url and url.startswith(('http://', 'https://'))))
+        futures = {self._executor.submit(self.fetch, url): url for url in urls}
+        done, _ = wait(futures, timeout=timeout)
+        return {futures[future]: future.result() for future in done if future.result()}
+
+    def cached_text(self, url):
+        """Text already in the cache for `url`, without fetching ('' if none)."""
+        entry = self.cache.get(url_key(url)) if url else None
+        return (entry or {}).get('text', '')
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, hosts=len(self._hosts))
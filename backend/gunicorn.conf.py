@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for running Plaza with several worker processes.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is loaded once in the master before forking, so the NLP models are
+loaded a single time and shared copy-on-write. Workers share fetched
+articles, summaries, conversations and chat sessions through the SQLite
+cache at PLAZA_CACHE_PATH.
+"""
+
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Threads keep Server-Sent Events streams from tying up a whole worker
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+preload_app = True
+timeout = 120
+graceful_timeout = 30
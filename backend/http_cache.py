@@ -0,0 +1,99 @@
+"""
+HTTP helpers for the JSON API: field projection, validators (ETag /
+Last-Modified) and response compression.
+"""
+
+import gzip
+import hashlib
+from collections.abc import Mapping
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Keys whose values are article dicts (or lists of them) in API payloads
+ARTICLE_KEYS = ('articles', 'latest_article')
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+
+def parse_fields(value):
+    """Parse `fields=title,url` (keep only these) or `fields=-content` (drop these).
+
+    Returns (include, exclude); include is None when not restricted.
+    """
+    if not value:
+        return None, set()
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    include = {name for name in names if not name.startswith('-')}
+    exclude = {name[1:] for name in names if name.startswith('-')}
+    return (include or None), exclude
+
+
+def _project_article(article, include, exclude):
+    return {
+        key: value for key, value in article.items()
+        if (include is None or key in include) and key not in exclude
+    }
+
+
+def project_articles(payload, fields):
+    """Copy of `payload` with every article dict reduced to the requested fields."""
+    include, exclude = parse_fields(fields)
+    if include is None and not exclude:
+        return payload
+    if include is not None:
+        # Always keep the ID so clients can match duplicates
+        include = include | {'id'}
+
+    def walk(value, key=None):
+        # Articles may be dicts or article records (read-only Mappings)
+        if isinstance(value, Mapping):
+            if key in ARTICLE_KEYS:
+                return _project_article(value, include, exclude)
+            return {k: walk(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            if key in ARTICLE_KEYS:
+                return [_project_article(item, include, exclude) if isinstance(item, Mapping) else item
+                        for item in value]
+            return [walk(item) for item in value]
+        return value
+
+    return walk(payload)
+
+
+def data_etag(*parts):
+    """Opaque validator derived from the data version and request shape."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """True if the client's cached copy is still current."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def compress(response, accept_encoding, min_size=1024):
+    """Brotli- or gzip-encode a buffered response if the client accepts it."""
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or response.status_code < 200 or response.status_code >= 300:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    if brotli is not None and 'br' in accept_encoding:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accept_encoding:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
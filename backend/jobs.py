@@ -0,0 +1,220 @@
+"""
+Background jobs for long-running generation requests.
+
+A job runs a function on a background executor and records each pipeline
+stage as it completes, so clients can poll (or stream) progress instead of
+holding a connection open for the whole request. Jobs for identical
+inputs are deduplicated, and finished results are kept for a while so
+repeat requests are answered immediately.
+
+With several worker processes, a job runs in the worker that accepted it,
+and its status is written to a cache shared by the workers (`store`) on
+every change. Any worker can then answer polls and streams for it.
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from cache import TTLCache
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    def __init__(self, key, stages, on_change=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.stages = [{'name': name, 'status': 'pending', 'completed_at': None} for name in stages]
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.version = 0
+        self._cond = threading.Condition()
+        self._on_change = on_change
+
+    def _changed(self):
+        self.version += 1
+        self._cond.notify_all()
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def start(self):
+        with self._cond:
+            self.status = RUNNING
+            self._changed()
+
+    def complete_stage(self, name):
+        """Mark a stage done. Unknown or already completed stages are ignored."""
+        with self._cond:
+            for stage in self.stages:
+                if stage['name'] == name and stage['status'] != 'done':
+                    stage['status'] = 'done'
+                    stage['completed_at'] = datetime.now().isoformat()
+                    self._changed()
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.status = FAILED if error else DONE
+            self._changed()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def wait_for_change(self, version, timeout):
+        """Block until the job changes past `version` or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.version <= version and not self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self.version
+
+    def to_dict(self, include_result=True):
+        with self._cond:
+            data = {
+                'job_id': self.id,
+                'status': self.status,
+                'stages': [dict(stage) for stage in self.stages],
+                'version': self.version,
+                'created_at': self.created_at
+            }
+            if self.error:
+                data['error'] = self.error
+            if include_result and self.status == DONE:
+                data['result'] = self.result
+            return data
+
+
+class StoredJob:
+    """Read-only view of a job running in another worker, read from the shared store."""
+
+    def __init__(self, store, data, poll_interval=0.5):
+        self._store = store
+        self._data = data
+        self.poll_interval = poll_interval
+
+    @property
+    def id(self):
+        return self._data['job_id']
+
+    @property
+    def status(self):
+        return self._data['status']
+
+    @property
+    def version(self):
+        return self._data['version']
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def wait_for_change(self, version, timeout):
+        """Poll the store until the job changes past `version` or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        while self.version <= version and not self.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(self.poll_interval, remaining))
+            data = self._store.get(self.id)
+            if data is None:
+                # Expired or evicted; report it as failed rather than waiting forever
+                self._data = dict(self._data, status=FAILED, error='Job expired', version=self.version + 1)
+            else:
+                self._data = data
+        return self.version
+
+    def to_dict(self, include_result=True):
+        data = dict(self._data)
+        if not include_result:
+            data.pop('result', None)
+        return data
+
+
+class JobManager:
+    def __init__(self, max_workers=4, result_ttl=300, max_jobs=1000, store=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self.result_ttl = result_ttl
+        self.store = store  # SharedCache of job states shared by the workers (optional)
+        self._jobs = TTLCache(max_entries=max_jobs, ttl_seconds=result_ttl)  # id -> Job
+        self._by_key = TTLCache(max_entries=max_jobs, ttl_seconds=result_ttl)  # key -> Job
+        self.submitted = 0
+        self.deduplicated = 0
+
+    @staticmethod
+    def _key_id(key):
+        return 'key:' + json.dumps(key)
+
+    def _stored(self, job):
+        # Every change restarts the TTL, so results are kept result_ttl seconds after the job finishes
+        self.store.set(job.id, job.to_dict())
+        if job.finished:
+            self.store.set(self._key_id(job.key), job.id)
+
+    def submit(self, key, stages, fn):
+        """Run `fn(job)` in the background, or return the live/cached job for `key`."""
+        with self._lock:
+            job = self._by_key.get(key) or self._stored_by_key(key)
+            if job is not None and job.status != FAILED:
+                self.deduplicated += 1
+                return job
+            job = Job(key, stages, on_change=self._stored if self.store is not None else None)
+            self._jobs.set(job.id, job)
+            self._by_key.set(key, job)
+            self.submitted += 1
+        if self.store is not None:
+            self.store.set(self._key_id(key), job.id)
+            self._stored(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _stored_by_key(self, key):
+        if self.store is None:
+            return None
+        job_id = self.store.get(self._key_id(key))
+        return self.get(job_id) if job_id else None
+
+    def _run(self, job, fn):
+        job.start()
+        try:
+            job.finish(result=fn(job))
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.finish(error=str(e))
+        # Keep finished jobs for result_ttl seconds from now, not from submission
+        self._jobs.set(job.id, job)
+        if self._by_key.get(job.key) in (None, job):
+            self._by_key.set(job.key, job)
+
+    def get(self, job_id):
+        """The job, from this worker or (if it runs elsewhere) from the shared store; None if unknown."""
+        job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        data = self.store.get(job_id)
+        return StoredJob(self.store, data) if isinstance(data, dict) else None
+
+    def stats(self):
+        jobs = [job for _, job in self._jobs.items()]
+        return {
+            'jobs': len(jobs),
+            'running': sum(1 for job in jobs if job.status == RUNNING),
+            'queued': sum(1 for job in jobs if job.status == QUEUED),
+            'submitted': self.submitted,
+            'deduplicated': self.deduplicated
+        }
@@ -0,0 +1,285 @@
+"""
+Central scheduler for LLM calls.
+
+Every call to OpenAI or Anthropic goes through an LLMScheduler so that
+interactive chat, conversation generation and background summarization
+share the provider quota fairly:
+
+- each provider has a request bucket (requests per minute), a token
+  bucket (tokens per minute) and a cap on calls in flight at once
+- waiting calls are admitted in priority order (chat first, summaries
+  next, speculative prefetch last)
+- once the queue for a provider is too deep, low-priority work is shed
+
+Speculative work runs with its calls lowered to the prefetch priority.
+If a real request has to wait for that work, it lifts the lowering, so
+the request does not end up queued behind background priorities.
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+# Priorities (lower runs first)
+PRIORITY_CHAT = 0
+PRIORITY_CONVERSATION = 1
+PRIORITY_SUMMARY = 2
+PRIORITY_PREFETCH = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_CHAT: 'chat',
+    PRIORITY_CONVERSATION: 'conversation',
+    PRIORITY_SUMMARY: 'summary',
+    PRIORITY_PREFETCH: 'prefetch'
+}
+
+# Seconds between checks of whether a lowered call waiting in the queue has been lifted
+LIFT_POLL_SECONDS = 0.25
+
+
+class Lowering:
+    """The priority LLM calls of a run_at_priority() call are lowered to, until lifted."""
+
+    __slots__ = ('priority', 'lifted')
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.lifted = False
+
+    def lift(self):
+        """Queue this work's calls (including waiting ones) at their normal priority from now on.
+
+        For when a real request ends up waiting for the speculative work.
+        """
+        self.lifted = True
+
+
+# Lowering of LLM calls in the current context (see run_at_priority)
+_lowered_to = contextvars.ContextVar('llm_lowered_to', default=None)
+
+
+def run_at_priority(priority, fn, *args):
+    """Call fn(*args) with every LLM call it makes queued at `priority` or lower.
+
+    Used for speculative work that reuses the normal code paths. Thread pools
+    only keep the lowering for work submitted with contextvars.copy_context().run.
+    """
+    token = _lowered_to.set(Lowering(priority))
+    try:
+        return fn(*args)
+    finally:
+        _lowered_to.reset(token)
+
+
+def current_lowering():
+    """The Lowering in effect for the current context, or None."""
+    lowering = _lowered_to.get()
+    return None if lowering is None or lowering.lifted else lowering
+
+
+def lowered():
+    """True inside run_at_priority, unless it has been lifted."""
+    return current_lowering() is not None
+
+
+class LLMQueueFull(Exception):
+    """Raised when a low-priority call is shed because the queue is too deep."""
+
+
+class LLMQueueTimeout(Exception):
+    """Raised when a call is still waiting for a slot when its timeout runs out."""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute) if per_minute else None
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0 if self.capacity else None
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.capacity is None:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (0 if available now)."""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        if self.capacity is None:
+            return
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        if self.capacity is None:
+            return
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    """Admit LLM calls per provider by priority, subject to rate limits."""
+
+    def __init__(self, limits, max_queue_depth=50, shed_priority=PRIORITY_SUMMARY):
+        # limits: {provider: {'rpm': int or None, 'tpm': int or None, 'concurrency': int or None}}
+        self.limits = limits
+        self.max_queue_depth = max_queue_depth
+        self.shed_priority = shed_priority
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._queues = {}
+        self._buckets = {}
+        self._in_flight = {}
+        self._stats = {}
+
+    def _provider_state(self, provider):
+        if provider not in self._queues:
+            limit = self.limits.get(provider, {})
+            self._queues[provider] = []
+            self._buckets[provider] = (TokenBucket(limit.get('rpm')), TokenBucket(limit.get('tpm')))
+            self._in_flight[provider] = 0
+            self._stats[provider] = {
+                name: {'admitted': 0, 'shed': 0, 'timed_out': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+                for name in PRIORITY_NAMES.values()
+            }
+        return self._queues[provider], self._buckets[provider], self._stats[provider]
+
+    def run(self, provider, priority, fn, tokens=0, timeout=None):
+        """Wait for a slot for `provider`, then call `fn()` and return its result.
+
+        `tokens` is the estimated prompt + completion size used against the
+        token bucket. Raises LLMQueueFull if the call is shed, and
+        LLMQueueTimeout if no slot is free within `timeout` seconds.
+        """
+        self.acquire(provider, priority, tokens, timeout)
+        try:
+            return fn()
+        finally:
+            self.release(provider)
+
+    def acquire(self, provider, priority, tokens=0, timeout=None):
+        """Block until the call may proceed. Returns the time spent waiting.
+
+        Every acquire() that returns must be followed by release() once the call is done.
+        """
+        requested = priority
+        lowering = current_lowering()
+        if lowering is not None:
+            priority = max(priority, lowering.priority)
+        name = PRIORITY_NAMES.get(priority, 'summary')
+        with self._cond:
+            queue, (requests_bucket, tokens_bucket), stats = self._provider_state(provider)
+            concurrency = self.limits.get(provider, {}).get('concurrency')
+
+            if priority >= self.shed_priority and len(queue) >= self.max_queue_depth:
+                stats[name]['shed'] += 1
+                raise LLMQueueFull(f"{provider} queue is full ({len(queue)} waiting)")
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(queue, entry)
+            enqueued = time.monotonic()
+
+            try:
+                while True:
+                    if priority != requested and lowering.lifted:
+                        # A real request is waiting for this work; move it up to where it belongs
+                        queue.remove(entry)
+                        priority, entry = requested, (requested, entry[1])
+                        name = PRIORITY_NAMES.get(priority, 'summary')
+                        heapq.heappush(queue, entry)
+                        heapq.heapify(queue)
+                    now = time.monotonic()
+                    wait = None
+                    # At the concurrency cap, the head waits for release() rather than a bucket refill
+                    if queue[0] == entry and (not concurrency or self._in_flight[provider] < concurrency):
+                        wait = max(requests_bucket.wait_time(1, now), tokens_bucket.wait_time(tokens, now))
+                        if wait == 0:
+                            requests_bucket.take(1)
+                            tokens_bucket.take(tokens)
+                            self._in_flight[provider] += 1
+                            break
+                    if timeout is not None:
+                        left = enqueued + timeout - now
+                        if left <= 0:
+                            stats[name]['timed_out'] += 1
+                            raise LLMQueueTimeout(f"no {provider} slot within {timeout:.1f}s")
+                        wait = left if wait is None else min(wait, left)
+                    if priority != requested:
+                        wait = LIFT_POLL_SECONDS if wait is None else min(wait, LIFT_POLL_SECONDS)
+                    self._cond.wait(timeout=wait)
+            finally:
+                # Only the head is ever admitted, but a failed wait may leave us anywhere
+                if entry in queue:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - enqueued
+            stats[name]['admitted'] += 1
+            stats[name]['total_wait'] += waited
+            stats[name]['max_wait'] = max(stats[name]['max_wait'], waited)
+            return waited
+
+    def release(self, provider):
+        """Free the concurrency slot of a call admitted by acquire()."""
+        with self._cond:
+            self._in_flight[provider] -= 1
+            self._cond.notify_all()
+
+    def refund(self, provider, tokens):
+        """Return unused tokens when the actual usage was below the estimate."""
+        if tokens <= 0:
+            return
+        with self._cond:
+            _, (_, tokens_bucket), _ = self._provider_state(provider)
+            tokens_bucket.give_back(tokens)
+            self._cond.notify_all()
+
+    def queue_depth(self):
+        """Total number of calls waiting across all providers."""
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def snapshot(self):
+        """Queue depth and wait-time metrics per provider and priority."""
+        with self._cond:
+            result = {}
+            for provider, queue in self._queues.items():
+                requests_bucket, tokens_bucket = self._buckets[provider]
+                depth = {name: 0 for name in PRIORITY_NAMES.values()}
+                for priority, _ in queue:
+                    depth[PRIORITY_NAMES.get(priority, 'summary')] += 1
+
+                priorities = {}
+                for name, stats in self._stats[provider].items():
+                    admitted = stats['admitted']
+                    priorities[name] = {
+                        'queue_depth': depth[name],
+                        'admitted': admitted,
+                        'shed': stats['shed'],
+                        'timed_out': stats['timed_out'],
+                        'avg_wait_seconds': round(stats['total_wait'] / admitted, 4) if admitted else 0.0,
+                        'max_wait_seconds': round(stats['max_wait'], 4)
+                    }
+
+                result[provider] = {
+                    'queue_depth': len(queue),
+                    'in_flight': self._in_flight[provider],
+                    'concurrency': self.limits.get(provider, {}).get('concurrency'),
+                    'requests_available': None if requests_bucket.capacity is None else round(requests_bucket.tokens, 1),
+                    'tokens_available': None if tokens_bucket.capacity is None else round(tokens_bucket.tokens, 1),
+                    'priorities': priorities
+                }
+            return result
@@ -0,0 +1,135 @@
+"""
+Speculative prefetch of subtopic conversations.
+
+When a subtopic listing is served, the conversations for the first few
+subtopics are generated in the background (in the viewer's last-used
+style) so they are ready when one is opened. Prefetching is capped by a
+per-minute budget and an in-flight limit, is skipped while the LLM queue
+is busy, and queued work is cancelled once the viewer picks a subtopic or
+a newer listing replaces it.
+
+Prefetch LLM calls are queued below every real request and are the first
+to be shed. A conversation degraded by shed calls (or by running out of
+its time budget) is marked partial, so the first real viewer regenerates it.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import deadlines
+from cache import TTLCache
+from llm_scheduler import PRIORITY_PREFETCH, TokenBucket, run_at_priority
+
+
+class Prefetcher:
+    def __init__(self, registry, top_n=3, max_in_flight=4, max_per_minute=30,
+                 is_busy=None, used_window_seconds=900, budget_seconds=120):
+        self.registry = registry
+        # 0 for either disables prefetching (a TokenBucket of 0 would mean unlimited)
+        self.top_n = top_n if max_per_minute else 0
+        self.max_in_flight = max_in_flight
+        self.budget_seconds = budget_seconds
+        self.is_busy = is_busy or (lambda: False)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='prefetch')
+        self._budget = TokenBucket(max_per_minute)
+        # Re-entrant: done callbacks may run inline while schedule() holds the lock
+        self._lock = threading.RLock()
+        self._pending = {}  # room key -> Future
+        # Rooms we prefetched and nobody has opened yet
+        self._unused = TTLCache(max_entries=10000, ttl_seconds=used_window_seconds)
+        # Top subtopics of each topic's last listing, for clients revalidating with a 304
+        self._listings = TTLCache(max_entries=1000, ttl_seconds=used_window_seconds)
+
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.used = 0
+
+    def schedule(self, topic_name, subtopics, style):
+        """Start background generation for the top subtopics of a listing."""
+        if self.top_n <= 0:
+            return
+        self._listings.set(topic_name.lower(), subtopics[:self.top_n])
+        keys = set()
+        with self._lock:
+            for subtopic in subtopics[:self.top_n]:
+                room = self.registry.get_or_create(topic_name, subtopic, style)
+                keys.add(room.key)
+                if room.conversation is not None or room.key in self._pending:
+                    continue
+                if len(self._pending) >= self.max_in_flight or self.is_busy() \
+                        or self._budget.wait_time(1, time.monotonic()) > 0:
+                    self.skipped += 1
+                    continue
+                self._budget.take(1)
+                self.scheduled += 1
+                future = self._executor.submit(self._run, room)
+                self._pending[room.key] = future
+                future.add_done_callback(lambda _, key=room.key: self._done(key))
+        # A newer listing replaces queued work for this topic and style
+        self.cancel(topic_name, style, keep=keys)
+
+    def schedule_unchanged(self, topic_name, style, load):
+        """schedule() for a listing the client already has (e.g. a 304 response).
+
+        Uses the last listing seen for the topic, or calls `load()` for it in the
+        background so the response is not held up.
+        """
+        if self.top_n <= 0:
+            return
+        subtopics = self._listings.get(topic_name.lower())
+        if subtopics is not None:
+            self.schedule(topic_name, subtopics, style)
+        else:
+            self._executor.submit(self._schedule_loaded, topic_name, style, load)
+
+    def _schedule_loaded(self, topic_name, style, load):
+        try:
+            self.schedule(topic_name, load(), style)
+        except Exception as e:
+            print(f"Error prefetching {topic_name}: {e}")
+
+    def _run(self, room):
+        token = deadlines.start(self.budget_seconds)
+        try:
+            generated = run_at_priority(PRIORITY_PREFETCH, self.registry.ensure_conversation, room)
+        finally:
+            deadlines.finish(token)
+        if generated and not room.partial:
+            self._unused.set(room.key, True)
+            with self._lock:
+                self.completed += 1
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def cancel(self, topic_name, style, keep=()):
+        """Cancel queued (not yet running) prefetches for a topic and style."""
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if key[0] == topic_name.lower() and key[2] == style and key not in keep:
+                    if future.cancel():
+                        self._pending.pop(key, None)
+                        self.cancelled += 1
+
+    def record_view(self, key):
+        """Call when a subtopic room is opened; counts prefetches that paid off."""
+        if self._unused.pop(key) is not None:
+            with self._lock:
+                self.used += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'scheduled': self.scheduled,
+                'completed': self.completed,
+                'in_flight': len(self._pending),
+                'cancelled': self.cancelled,
+                'skipped': self.skipped,
+                'used': self.used,
+                'use_rate': round(self.used / self.completed, 3) if self.completed else 0.0
+            }
@@ -0,0 +1,226 @@
+"""
+Sampling profiler for single requests and for continuous low-rate sampling.
+
+A background thread periodically captures Python stacks (via
+sys._current_frames) and counts them as collapsed stacks, the
+`frame;frame;frame count` format read by flamegraph.pl and speedscope.
+Profiled requests also record the top allocation sites with tracemalloc.
+Everything is pure Python, so it works under any WSGI server.
+
+A request profile samples the request's thread plus any thread running
+work the request handed off with contextvars.copy_context().run(sampled,
+fn, ...). Finished profiles go to `store` when one is given (a cache
+shared by the workers), so any worker can serve them.
+"""
+
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from cache import TTLCache
+
+MAX_DEPTH = 128
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_LEAVES = {
+    'threading.py:wait', 'threading.py:_wait_for_tstate_lock', 'selectors.py:select',
+    'queue.py:get', 'socket.py:accept', 'socketserver.py:serve_forever', 'thread.py:_worker'
+}
+
+
+# Thread IDs sampled by the profile of the current context's request
+_profiled_threads = contextvars.ContextVar('plaza_profiled_threads', default=None)
+
+
+def sampled(fn, *args, **kwargs):
+    """Call fn, sampling this thread for the current context's request profile, if any."""
+    threads = _profiled_threads.get()
+    if threads is None:
+        return fn(*args, **kwargs)
+    ident = threading.get_ident()
+    threads.add(ident)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        threads.discard(ident)
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame, limit=MAX_DEPTH):
+    """Root-to-leaf `file:function` names of a frame's stack, joined by ';'."""
+    names = []
+    while frame is not None and len(names) < limit:
+        names.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Counts collapsed stacks of some (or all) threads every `interval` seconds."""
+
+    def __init__(self, interval, thread_ids=None, skip_idle=False, max_stacks=5000):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.skip_idle = skip_idle
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude=None):
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == exclude or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                if self.skip_idle and frame_label(frame.f_code) in IDLE_LEAVES:
+                    continue
+                self._stacks[collapse(frame)] += 1
+            self.samples += 1
+            if len(self._stacks) > self.max_stacks:
+                # Keep the heaviest half so memory stays bounded under long runs
+                self._stacks = Counter(dict(self._stacks.most_common(self.max_stacks // 2)))
+
+    def collapsed(self):
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def top_functions(self, limit=20):
+        """Functions by samples as the leaf (self) and anywhere on the stack (total)."""
+        own, total = Counter(), Counter()
+        with self._lock:
+            for stack, count in self._stacks.items():
+                names = stack.split(';')
+                own[names[-1]] += count
+                for name in set(names):
+                    total[name] += count
+            samples = sum(self._stacks.values()) or 1
+        return [
+            {'function': name, 'self': own[name], 'total': count, 'total_share': round(count / samples, 3)}
+            for name, count in total.most_common(limit)
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+
+class _Session:
+    def __init__(self, label, sampler, snapshot, token):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.sampler = sampler
+        self.snapshot = snapshot
+        self.token = token
+        self.started = time.perf_counter()
+        self.created_at = datetime.now().isoformat()
+
+
+class RequestProfiler:
+    """Profiles individual requests that present the configured token."""
+
+    def __init__(self, token=None, interval=0.002, max_profiles=100, ttl_seconds=3600, top_allocations=25,
+                 store=None):
+        self.token = token
+        self.interval = interval
+        self.top_allocations = top_allocations
+        # Finished profiles: in `store` (a SharedCache) if given, else in this process
+        self._profiles = store if store is not None else TTLCache(max_entries=max_profiles, ttl_seconds=ttl_seconds)
+        self._tracing_lock = threading.Lock()
+        self._tracing_users = 0
+        self._started_tracing = False
+
+    def authorized(self, token):
+        return bool(self.token) and bool(token) and hmac.compare_digest(token, self.token)
+
+    def _start_tracing(self):
+        with self._tracing_lock:
+            if self._tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracing = True
+            self._tracing_users += 1
+
+    def _stop_tracing(self):
+        with self._tracing_lock:
+            self._tracing_users -= 1
+            if self._tracing_users == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def start(self, label):
+        """Start profiling the calling thread and the work it hands off with sampled()."""
+        self._start_tracing()
+        thread_ids = {threading.get_ident()}
+        token = _profiled_threads.set(thread_ids)
+        sampler = StackSampler(self.interval, thread_ids=thread_ids).start()
+        return _Session(label, sampler, tracemalloc.take_snapshot(), token)
+
+    def _allocations(self, before):
+        after = tracemalloc.take_snapshot()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        return [
+            {'site': str(stat.traceback[0]), 'size_kb': round(stat.size_diff / 1024, 1), 'count': stat.count_diff}
+            for stat in stats[:self.top_allocations] if stat.size_diff > 0
+        ]
+
+    def finish(self, session, status=None, error=None):
+        """Stop profiling and store the result; returns the profile ID."""
+        session.sampler.stop()
+        try:
+            _profiled_threads.reset(session.token)
+        except ValueError:
+            # Finished from another context; the sampler is stopped, which is what matters
+            pass
+        try:
+            allocations = self._allocations(session.snapshot)
+        finally:
+            self._stop_tracing()
+        self._profiles.set(session.id, {
+            'id': session.id,
+            'request': session.label,
+            'status': status,
+            'error': error,
+            'created_at': session.created_at,
+            'duration_ms': round((time.perf_counter() - session.started) * 1000, 1),
+            'interval_ms': self.interval * 1000,
+            'samples': session.sampler.samples,
+            'top_functions': session.sampler.top_functions(),
+            'collapsed': session.sampler.collapsed(),
+            'allocations': allocations
+        })
+        return session.id
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def stats(self):
+        return {'enabled': bool(self.token), 'profiles': len(self._profiles)}
@@ -0,0 +1,207 @@
+"""
+Token-budget prompt building shared by every LLM call site.
+
+Article text is fitted into a per-call token budget by ranking sentences
+(overlap with the headline, plus a bonus for lead sentences) and keeping
+the best ones in their original order, instead of cutting at a fixed
+number of characters. Static instructions are returned separately as a
+constant prefix, sent as the system prompt, so providers can cache it.
+
+Token counts use tiktoken when it is installed and a local word-piece
+estimate otherwise.
+"""
+
+import re
+import threading
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    _encoding = None
+
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+_TRUNCATION_MARKER = re.compile(r'\s*(\.\.\.)?\s*\[\+\d+ chars\]\s*$')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=["\'“(]?[A-Z0-9])')
+_TERM = re.compile(r"[a-z][a-z0-9']{3,}")
+
+STOPWORDS = {
+    'that', 'this', 'with', 'from', 'have', 'will', 'would', 'there', 'their', 'about',
+    'which', 'when', 'what', 'were', 'been', 'they', 'said', 'says', 'into', 'than',
+    'more', 'also', 'after', 'over', 'could', 'just', 'some', 'other', 'such'
+}
+
+
+def count_tokens(text):
+    """Number of tokens in `text` (approximate without tiktoken)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # Short words are one token, longer ones roughly one per 4 characters
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD_PIECES.findall(text))
+
+
+def clean_text(text):
+    """Strip NewsAPI's '[+1234 chars]' truncation marker."""
+    return _TRUNCATION_MARKER.sub('', text or '').strip()
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_END.split(clean_text(text)) if sentence.strip()]
+
+
+def _terms(text):
+    return {term for term in _TERM.findall(text.lower()) if term not in STOPWORDS}
+
+
+def rank_sentences(sentences, query=''):
+    """Indices of `sentences`, best first."""
+    query_terms = _terms(query)
+    scores = []
+    for i, sentence in enumerate(sentences):
+        terms = _terms(sentence)
+        overlap = len(terms & query_terms) / (len(query_terms) or 1)
+        position = 1.0 / (1 + i)
+        scores.append((overlap + 0.5 * position, -i))
+    return [-neg_i for _, neg_i in sorted(scores, reverse=True)]
+
+
+def truncate_to_tokens(text, budget):
+    """Cut `text` at a word boundary so it fits in `budget` tokens."""
+    if budget <= 0:
+        return ''
+    words = text.split()
+    kept = []
+    used = 0
+    for word in words:
+        cost = count_tokens(word) + 1
+        if used + cost > budget:
+            break
+        kept.append(word)
+        used += cost
+    return ' '.join(kept) + ('...' if len(kept) < len(words) else '')
+
+
+def fit_text(text, budget, query=''):
+    """Best sentences of `text` (in original order) that fit in `budget` tokens."""
+    text = clean_text(text)
+    if count_tokens(text) <= budget:
+        return text
+    sentences = split_sentences(text)
+    chosen = []
+    used = 0
+    for i in rank_sentences(sentences, query):
+        cost = count_tokens(sentences[i]) + 1
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    if not chosen:
+        # Even the best sentence is too long; keep its beginning
+        return truncate_to_tokens(sentences[rank_sentences(sentences, query)[0]], budget) if sentences else ''
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+def article_text(article):
+    """Everything we know about an article's body, description first."""
+    description = clean_text(article.get('description', ''))
+    content = clean_text(article.get('content', ''))
+    if content.startswith(description[:50]):
+        return content
+    return f"{description} {content}".strip()
+
+
+def fit_articles(articles, budget, render, text_of=article_text):
+    """Render each article with its text fitted to a share of `budget` tokens.
+
+    `render(article, text)` formats one article. Budget left over by short
+    articles is passed on to the next ones. Returns (blocks, tokens_saved)
+    where tokens_saved is how much shorter the blocks are than with full text.
+    """
+    blocks = []
+    tokens_saved = 0
+    remaining = budget
+    for i, article in enumerate(articles):
+        full_text = text_of(article)
+        share = remaining // (len(articles) - i)
+        overhead = count_tokens(render(article, ''))
+        block = render(article, fit_text(full_text, share - overhead, article.get('title', '')))
+        block_tokens = count_tokens(block)
+        blocks.append(block)
+        remaining -= block_tokens
+        tokens_saved += count_tokens(render(article, full_text)) - block_tokens
+    return blocks, tokens_saved
+
+
+class PromptStats:
+    """Per call site token usage: prompt size versus the untrimmed context,
+    and how much of each prompt the provider served from its prefix cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = {}
+        self._usage = {}
+
+    def record(self, site, prefix_tokens, context_tokens, tokens_saved):
+        with self._lock:
+            stats = self._sites.setdefault(site, {
+                'calls': 0, 'prefix_tokens': 0, 'context_tokens': 0, 'tokens_saved': 0
+            })
+            stats['calls'] += 1
+            stats['prefix_tokens'] += prefix_tokens
+            stats['context_tokens'] += context_tokens
+            stats['tokens_saved'] += tokens_saved
+
+    def record_usage(self, site, input_tokens, cached_tokens, cache_write_tokens, seconds):
+        """Record one LLM response. `input_tokens` includes cached tokens."""
+        with self._lock:
+            usage = self._usage.setdefault(site, {
+                'calls': 0, 'input_tokens': 0, 'cached_tokens': 0, 'cache_write_tokens': 0,
+                'cached_calls': 0, 'cached_seconds': 0.0, 'uncached_seconds': 0.0
+            })
+            usage['calls'] += 1
+            usage['input_tokens'] += input_tokens or 0
+            usage['cached_tokens'] += cached_tokens or 0
+            usage['cache_write_tokens'] += cache_write_tokens or 0
+            if cached_tokens:
+                usage['cached_calls'] += 1
+                usage['cached_seconds'] += seconds
+            else:
+                usage['uncached_seconds'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for site, usage in self._usage.items():
+                uncached_calls = usage['calls'] - usage['cached_calls']
+                result[site] = {
+                    'llm_calls': usage['calls'],
+                    'cached_token_ratio': round(usage['cached_tokens'] / usage['input_tokens'], 3)
+                    if usage['input_tokens'] else 0.0,
+                    'cache_write_tokens': usage['cache_write_tokens'],
+                    'avg_latency_ms_cached': round(usage['cached_seconds'] / usage['cached_calls'] * 1000, 1)
+                    if usage['cached_calls'] else None,
+                    'avg_latency_ms_uncached': round(usage['uncached_seconds'] / uncached_calls * 1000, 1)
+                    if uncached_calls else None
+                }
+            for site, stats in self._sites.items():
+                calls = stats['calls']
+                untrimmed = stats['context_tokens'] + stats['tokens_saved']
+                result.setdefault(site, {}).update({
+                    'calls': calls,
+                    'avg_prefix_tokens': round(stats['prefix_tokens'] / calls, 1),
+                    'avg_context_tokens': round(stats['context_tokens'] / calls, 1),
+                    'avg_tokens_saved': round(stats['tokens_saved'] / calls, 1),
+                    'context_saved_rate': round(stats['tokens_saved'] / untrimmed, 3) if untrimmed else 0.0
+                })
+            return result
+
+
+prompt_stats = PromptStats()
+
+
+def build_prompt(site, prefix, context, tokens_saved=0):
+    """Record token usage and return (system, user) for the static `prefix`
+    and the per-call `context`."""
+    prompt_stats.record(site, count_tokens(prefix), count_tokens(context), tokens_saved)
+    return prefix, context
@@ -0,0 +1,343 @@
+"""
+Shared live plaza rooms.
+
+Each subtopic x style has one server-side conversation. It is generated
+once, no matter how many viewers arrive at the same time, and every new
+message is pushed to all subscribers (served over Server-Sent Events by
+app.py). When new articles show up for the subtopic, messages about them
+are generated once and appended for everyone.
+
+With several worker processes, each room is also kept in a cache shared
+by the workers (`store`). A worker that does not have a room yet loads
+it from there. Workers pull messages that another worker appended and
+push them to their own subscribers. Generation itself goes through the
+shared conversation cache, so it happens once per deployment.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+
+import deadlines
+from cache import TTLCache
+from llm_scheduler import current_lowering, lowered
+
+
+def room_key(topic_name, subtopic_id, style):
+    return (topic_name.lower(), subtopic_id, style)
+
+
+class Room:
+    """One shared conversation plus the clients listening to it."""
+
+    def __init__(self, key, topic_name, subtopic, style):
+        self.key = key
+        self.topic_name = topic_name
+        self.subtopic = subtopic
+        self.style = style
+        self.articles = list(subtopic.get('articles', []))
+        self.seen_urls = {article.get('url', '') for article in self.articles}
+        self.conversation = None
+        self.partial = False  # conversation was cut short by the generating request's deadline
+        self.updated_at = time.time()
+        self.synced_at = 0.0  # stored_at of the shared copy this room last matched
+
+        self._generate_lock = threading.Lock()
+        self._generating = None  # Lowering of speculative generation holding the lock, if any
+        self._subscribers_lock = threading.Lock()
+        self._subscribers = []
+        self._message_ids = itertools.count(1)
+
+    def to_state(self):
+        """JSON-serializable copy of the conversation and its articles (subscribers are not kept)."""
+        return {
+            'key': list(self.key),
+            'topic_name': self.topic_name,
+            'subtopic': {name: value for name, value in self.subtopic.items() if name != 'articles'},
+            'style': self.style,
+            'articles': self.articles,
+            'seen_urls': sorted(self.seen_urls),
+            'conversation': self.conversation,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_state(cls, state, load_article=dict):
+        room = cls(tuple(state['key']), state['topic_name'], dict(state['subtopic'], articles=[]), state['style'])
+        room._apply(state, state['conversation'], load_article)
+        return room
+
+    def _apply(self, state, conversation, load_article):
+        self.articles = [load_article(article) for article in state['articles']]
+        self.subtopic['articles'] = self.articles
+        self.seen_urls = set(state['seen_urls'])
+        self.conversation = conversation
+        self.partial = False
+        self.updated_at = state['updated_at']
+        # New message IDs continue after the restored ones
+        numbers = [int(message['id'].rsplit('-', 1)[1]) for message in conversation
+                   if str(message.get('id', '')).rsplit('-', 1)[-1].isdigit()]
+        self._message_ids = itertools.count(max(numbers, default=0) + 1)
+
+    def merge(self, state, load_article=dict):
+        """Take the messages another worker appended (from its to_state()) and broadcast them."""
+        with self._generate_lock:
+            if not state['conversation']:
+                return []
+            if self.conversation is None or self.partial:
+                new_messages = state['conversation']
+                conversation = new_messages
+            else:
+                known = {message.get('id') for message in self.conversation}
+                new_messages = [message for message in state['conversation'] if message.get('id') not in known]
+                if not new_messages:
+                    return []
+                conversation = self.conversation + new_messages
+            self._apply(state, conversation, load_article)
+        self.broadcast('messages', new_messages)
+        return new_messages
+
+    @property
+    def subscriber_count(self):
+        with self._subscribers_lock:
+            return len(self._subscribers)
+
+    def _number(self, messages):
+        for message in messages:
+            message['id'] = f"{self.key[1]}-{self.style}-{next(self._message_ids)}"
+        return messages
+
+    def ensure_conversation(self, generate):
+        """Generate the conversation once; concurrent callers wait for the first.
+
+        Returns True if this call did the generation. A conversation cut short
+        by the request's deadline is served to that request and generated
+        again for the next viewer. A real viewer who has to wait for a
+        prefetch lifts its lowered LLM priority rather than waiting behind it.
+        """
+        if self.conversation is not None and not self.partial:
+            return False
+        self._acquire_generate_lock()
+        try:
+            if self.conversation is not None and not self.partial:
+                return False
+            self._generating = current_lowering()
+            cuts = deadlines.cuts()
+            self.conversation = self._number(generate(self.articles, self.subtopic['title'], self.style))
+            self.partial = deadlines.cuts() != cuts
+            self.updated_at = time.time()
+            return True
+        finally:
+            self._generating = None
+            self._generate_lock.release()
+
+    def _acquire_generate_lock(self, lift_interval=0.5):
+        if lowered():
+            self._generate_lock.acquire()
+            return
+        if self._generate_lock.acquire(blocking=False):
+            return
+        # Checked again after each interval, since the holder records its lowering after taking the lock
+        while True:
+            generating = self._generating
+            if generating is not None:
+                generating.lift()
+            if self._generate_lock.acquire(timeout=lift_interval):
+                return
+
+    def add_articles(self, articles, generate):
+        """Generate messages for articles not seen before and broadcast them."""
+        with self._generate_lock:
+            new_articles = [article for article in articles if article.get('url', '') not in self.seen_urls]
+            if not new_articles or self.conversation is None:
+                return []
+            messages = self._number(generate(new_articles, self.subtopic['title'], self.style))
+            self.seen_urls.update(article.get('url', '') for article in new_articles)
+            self.articles = (new_articles + self.articles)[:5]
+            self.subtopic['articles'] = self.articles
+            self.conversation = self.conversation + messages
+            self.updated_at = time.time()
+        self.broadcast('messages', messages)
+        return messages
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=100)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def broadcast(self, event, data):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # Slow client; drop it rather than block everyone else
+                self.unsubscribe(subscriber)
+
+
+class RoomRegistry:
+    """Bounded, expiring set of rooms. Rooms with viewers are kept alive."""
+
+    def __init__(self, generate, max_rooms=500, ttl_seconds=1800, store=None, load_article=dict):
+        self.generate = generate
+        self.store = store  # SharedCache of room states shared by the workers (optional)
+        self.load_article = load_article
+        self._rooms = TTLCache(max_entries=max_rooms, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.conversations_generated = 0
+        self.views = 0
+        self.loaded = 0
+        self.synced = 0
+
+    @staticmethod
+    def _store_key(key):
+        return json.dumps(list(key))
+
+    def get(self, key):
+        """The room for `key`: this process's copy (updated from the shared one), or the shared one."""
+        room = self._rooms.get(key)
+        if room is not None:
+            self._rooms.touch(key)
+            self.sync(room)
+            return room
+        if self.store is None:
+            return None
+        state = self.store.get(self._store_key(key))
+        if state is None:
+            return None
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                room = Room.from_state(state, self.load_article)
+                room.synced_at = self.store.stored_at(self._store_key(key)) or 0.0
+                self._rooms.set(key, room)
+                self.loaded += 1
+        return room
+
+    def publish(self, room):
+        """Write a room with a complete conversation to the shared store."""
+        if self.store is None or room.conversation is None or room.partial:
+            return
+        store_key = self._store_key(room.key)
+        self.store.set(store_key, room.to_state())
+        room.synced_at = self.store.stored_at(store_key) or time.time()
+
+    def sync(self, room):
+        """Pull messages other workers added to the shared copy of `room`. Returns the new messages."""
+        if self.store is None:
+            return []
+        store_key = self._store_key(room.key)
+        stored_at = self.store.stored_at(store_key)
+        if stored_at is None or stored_at <= room.synced_at:
+            return []
+        state = self.store.get(store_key)
+        room.synced_at = stored_at
+        if state is None:
+            return []
+        messages = room.merge(state, self.load_article)
+        if messages:
+            self.synced += 1
+        return messages
+
+    def sync_active(self):
+        for room in self.active_rooms():
+            self.sync(room)
+
+    def get_or_create(self, topic_name, subtopic, style):
+        key = room_key(topic_name, subtopic['id'], style)
+        room = self.get(key)
+        if room is not None:
+            return room
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                room = Room(key, topic_name, subtopic, style)
+                self._rooms.set(key, room)
+        return room
+
+    def ensure_conversation(self, room):
+        """Generate the room's conversation if needed. Returns True if this call generated it."""
+        generated = room.ensure_conversation(self.generate)
+        if generated:
+            self.conversations_generated += 1
+            self.publish(room)
+        return generated
+
+    def add_articles(self, room, articles):
+        """Append messages about new articles, after taking any another worker already appended."""
+        self.sync(room)
+        messages = room.add_articles(articles, self.generate)
+        if messages:
+            self.publish(room)
+        return messages
+
+    def conversation(self, room):
+        """The room's shared conversation, generating it if this is the first viewer."""
+        self.views += 1
+        self.ensure_conversation(room)
+        return room.conversation
+
+    def active_rooms(self):
+        """Rooms that currently have at least one subscriber."""
+        return [room for _, room in self._rooms.items() if room.subscriber_count > 0]
+
+    def keep_alive(self):
+        for room in self.active_rooms():
+            self._rooms.touch(room.key)
+
+    def export_state(self):
+        """Rooms with a complete conversation, with their wall-clock expiry."""
+        now = time.time()
+        return [dict(room.to_state(), expires_at=now + seconds_left)
+                for _, room, seconds_left in self._rooms.entries()
+                if room.conversation is not None and not room.partial]
+
+    def restore_state(self, rooms, load_article=None):
+        """Add exported rooms that have not expired and are not open already. Returns the number added."""
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for state in rooms:
+                key = tuple(state['key'])
+                if state['expires_at'] <= now or key in self._rooms:
+                    continue
+                self._rooms.set(key, Room.from_state(state, load_article or self.load_article),
+                                ttl_seconds=state['expires_at'] - now)
+                restored += 1
+        return restored
+
+    def stats(self):
+        rooms = [room for _, room in self._rooms.items()]
+        return {
+            'rooms': len(rooms),
+            'subscribers': sum(room.subscriber_count for room in rooms),
+            'views': self.views,
+            'conversations_generated': self.conversations_generated,
+            'loaded_from_shared': self.loaded,
+            'synced_from_shared': self.synced
+        }
+
+
+def sse_stream(room, keepalive_seconds=15):
+    """Yield Server-Sent Events for a room: a snapshot, then appended messages."""
+    subscriber = room.subscribe()
+    try:
+        yield f"event: snapshot\ndata: {json.dumps(room.conversation or [])}\n\n"
+        while True:
+            try:
+                event, data = subscriber.get(timeout=keepalive_seconds)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        room.unsubscribe(subscriber)
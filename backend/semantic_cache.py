@@ -0,0 +1,215 @@
+"""
+Similarity-based answer cache for /api/chat.
+
+Questions are vectorized locally with hashed character n-grams plus word
+unigrams, and compared by cosine similarity against earlier questions in
+the same scope (topic, subtopic, persona, style, recent history). A near
+neighbour above the threshold returns one of its cached answers instead of
+a new LLM call. Questions that differ in negation ("is this good?" versus
+"is this not good?") never match, however similar they look. While an
+entry has fewer than max_variants answers, a share of its hits is passed
+to the LLM anyway and the new answer is added, so repeat askers do not all
+get the same reply.
+"""
+
+import itertools
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_SPACES = re.compile(r"\s+")
+
+NEGATIONS = {'not', 'no', 'never', 'nor', 'none', 'nobody', 'nothing', 'neither', 'nowhere', 'without', 'cannot'}
+
+
+def normalize_question(text):
+    text = _NON_WORD.sub(' ', text.lower())
+    return _SPACES.sub(' ', text).strip()
+
+
+def negations(text):
+    """Negation words in a question ("isn't" counts as "not")."""
+    words = normalize_question(text).split()
+    return frozenset('not' if word.endswith("n't") else word
+                     for word in words if word in NEGATIONS or word.endswith("n't"))
+
+
+def vectorize(text, ngram=3, dims=1 << 18):
+    """Sparse, L2-normalized hashed n-gram vector as {index: weight}."""
+    text = normalize_question(text)
+    counts = {}
+    padded = f" {text} "
+    for i in range(len(padded) - ngram + 1):
+        index = zlib.crc32(padded[i:i + ngram].encode('utf-8')) % dims
+        counts[index] = counts.get(index, 0) + 1
+    for word in text.split():
+        # Whole words weigh more than a single n-gram
+        index = zlib.crc32(f"w:{word}".encode('utf-8')) % dims
+        counts[index] = counts.get(index, 0) + 2
+
+    vector = {index: 1 + math.log(count) for index, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {index: weight / norm for index, weight in vector.items()}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+class SemanticCache:
+    """Bounded, expiring nearest-neighbour cache of answers per scope."""
+
+    def __init__(self, threshold=0.8, max_entries=5000, max_per_scope=100,
+                 max_variants=3, variant_rate=0.25, ttl_seconds=3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_scope = max_per_scope
+        self.max_variants = max_variants
+        self.variant_rate = variant_rate
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._entries = OrderedDict()  # entry_id -> entry dict, oldest first
+        self._scopes = {}              # scope -> OrderedDict of entry ids
+        self.hits = 0
+        self.misses = 0
+        self.variant_misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._scopes.get(entry['scope'])
+        if ids is not None:
+            ids.pop(entry_id, None)
+            if not ids:
+                del self._scopes[entry['scope']]
+
+    def _nearest(self, scope, vector, negated, now):
+        best_id, best_score = None, 0.0
+        for entry_id in list(self._scopes.get(scope, ())):
+            entry = self._entries[entry_id]
+            if entry['expires_at'] <= now:
+                self._remove(entry_id)
+                self.expirations += 1
+                continue
+            if entry['negations'] != negated:
+                continue
+            score = cosine(vector, entry['vector'])
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        return best_id, best_score
+
+    def lookup(self, scope, question):
+        """Return a cached answer for a similar question in `scope`, or None.
+
+        None is also returned for a share (variant_rate) of hits on entries that
+        have room for more answers; store() then adds the fresh one.
+        """
+        vector = vectorize(question)
+        with self._lock:
+            entry_id, score = self._nearest(scope, vector, negations(question), time.monotonic())
+            if entry_id is None or score < self.threshold:
+                self.misses += 1
+                return None
+            answers = self._entries[entry_id]['answers']
+            if len(answers) < self.max_variants and random.random() < self.variant_rate:
+                self.variant_misses += 1
+                return None
+            self.hits += 1
+            return random.choice(answers)
+
+    def _insert(self, scope, question, vector, answers, expires_at):
+        entry_id = next(self._ids)
+        self._entries[entry_id] = {
+            'scope': scope,
+            'question': question,
+            'vector': vector,
+            'negations': negations(question),
+            'answers': answers,
+            'expires_at': expires_at
+        }
+        scope_ids = self._scopes.setdefault(scope, OrderedDict())
+        scope_ids[entry_id] = True
+
+        if len(scope_ids) > self.max_per_scope:
+            self._remove(next(iter(scope_ids)))
+            self.evictions += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def store(self, scope, question, answer):
+        """Cache `answer`; near-duplicate questions collect up to max_variants answers."""
+        vector = vectorize(question)
+        if not vector:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry_id, score = self._nearest(scope, vector, negations(question), now)
+            if entry_id is not None and score >= self.threshold:
+                answers = self._entries[entry_id]['answers']
+                if answer not in answers and len(answers) < self.max_variants:
+                    answers.append(answer)
+                return
+            self._insert(scope, question, vector, [answer], now + self.ttl_seconds)
+
+    def export_state(self):
+        """Live entries, oldest first, with wall-clock expiry. Vectors are recomputed on restore."""
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            return [
+                {
+                    'scope': entry['scope'],
+                    'question': entry['question'],
+                    'answers': list(entry['answers']),
+                    'expires_at': wall + entry['expires_at'] - now
+                }
+                for entry in self._entries.values() if entry['expires_at'] > now
+            ]
+
+    def restore_state(self, entries):
+        """Add exported entries that have not expired and have no near duplicate yet. Returns the number added."""
+        now, wall = time.monotonic(), time.time()
+        restored = 0
+        for saved in entries:
+            if saved['expires_at'] <= wall:
+                continue
+            vector = vectorize(saved['question'])
+            if not vector:
+                continue
+            # JSON turns tuple scopes into lists
+            scope = tuple(saved['scope']) if isinstance(saved['scope'], list) else saved['scope']
+            with self._lock:
+                entry_id, score = self._nearest(scope, vector, negations(saved['question']), now)
+                if entry_id is not None and score >= self.threshold:
+                    continue
+                self._insert(scope, saved['question'], vector, saved['answers'][:self.max_variants],
+                             now + saved['expires_at'] - wall)
+            restored += 1
+        return restored
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.variant_misses
+            return {
+                'entries': len(self._entries),
+                'scopes': len(self._scopes),
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'variant_misses': self.variant_misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -0,0 +1,271 @@
+"""
+Cache shared between worker processes, backed by SQLite in WAL mode.
+
+Several gunicorn workers (and the threads inside each) read and write the
+same database file, so fetched article pools, summaries, conversations
+and chat sessions are computed once for the whole deployment.
+`get_or_compute` also coalesces concurrent misses across processes: the
+first caller takes a lease on the key and computes the value, the others
+wait for it to appear instead of calling upstream themselves.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import deadlines
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+_local = threading.local()
+
+
+def _to_json(obj):
+    """Store objects with a to_dict() (e.g. article records) as their dict."""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _connect(path):
+    """One connection per thread and database file."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    # Connections do not survive fork; key by pid as well
+    conn_key = (path, os.getpid())
+    conn = connections.get(conn_key)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[conn_key] = conn
+    return conn
+
+
+class SharedCache:
+    """Expiring key/value store for one namespace of a shared SQLite file.
+
+    Values must be JSON-serializable. Falsy results of `get_or_compute` are
+    not stored, so failed upstream calls are retried on the next request.
+    Neither are results cut short by the request's deadline (see deadlines).
+    """
+
+    def __init__(self, path, namespace, ttl_seconds=600, max_entries=10000,
+                 lease_seconds=120, poll_interval=0.1):
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+        self.computed = 0
+        self.coalesced = 0
+
+    def _read(self, key):
+        row = _connect(self.path).execute(
+            'SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (self.namespace, key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get(self, key, default=None):
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return entry[0]
+
+    def stored_at(self, key):
+        """Unix time the live value for `key` was stored, or None. Does not read the value."""
+        row = _connect(self.path).execute(
+            'SELECT stored_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (self.namespace, key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        _connect(self.path).execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+            (self.namespace, key, json.dumps(value, default=_to_json), now, now + ttl)
+        )
+        with self._lock:
+            self._sets += 1
+            trim = self._sets % 100 == 0
+        if trim:
+            self.purge_expired()
+
+    def update(self, key, fn, ttl_seconds=None):
+        """Replace the live value for `key` with fn(value) atomically. Returns the new value, or None if missing.
+
+        The read and the write share one write transaction, so concurrent
+        updates from any thread or worker apply one after another instead of
+        overwriting each other. `fn` runs inside it and should be quick.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        conn = _connect(self.path)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (self.namespace, key, now)
+            ).fetchone()
+            value = None
+            if row is not None:
+                value = fn(json.loads(row[0]))
+                conn.execute(
+                    'UPDATE entries SET value = ?, stored_at = ?, expires_at = ? WHERE namespace = ? AND key = ?',
+                    (json.dumps(value, default=_to_json), now, now + ttl, self.namespace, key)
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def touch(self, key):
+        """Restart the TTL of `key`. Returns False if missing or expired."""
+        now = time.time()
+        cursor = _connect(self.path).execute(
+            'UPDATE entries SET expires_at = ? WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (now + self.ttl_seconds, self.namespace, key, now)
+        )
+        return cursor.rowcount > 0
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        _connect(self.path).execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (self.namespace, key))
+        return value
+
+    def purge_expired(self):
+        """Drop expired rows and the oldest rows beyond max_entries."""
+        conn = _connect(self.path)
+        conn.execute('DELETE FROM entries WHERE namespace = ? AND expires_at <= ?', (self.namespace, time.time()))
+        conn.execute(
+            'DELETE FROM entries WHERE namespace = ? AND key IN ('
+            ' SELECT key FROM entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def _acquire_lease(self, key, owner):
+        conn = _connect(self.path)
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM leases WHERE namespace = ? AND key = ? AND expires_at <= ?',
+                (self.namespace, key, now)
+            )
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)',
+                (self.namespace, key, owner, now + self.lease_seconds)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def _release_lease(self, key, owner):
+        _connect(self.path).execute(
+            'DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?',
+            (self.namespace, key, owner)
+        )
+
+    def get_or_compute(self, key, compute, ttl_seconds=None):
+        """Return the cached value or compute it, once across all processes.
+
+        Returns None if the request's deadline passes while waiting for another process.
+        """
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        waited = False
+        while True:
+            entry = self._read(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                    if waited:
+                        self.coalesced += 1
+                return entry[0]
+
+            if self._acquire_lease(key, owner):
+                try:
+                    # Another process may have finished just before we got the lease
+                    entry = self._read(key)
+                    if entry is not None:
+                        with self._lock:
+                            self.hits += 1
+                        return entry[0]
+                    with self._lock:
+                        self.misses += 1
+                        self.computed += 1
+                    cuts = deadlines.cuts()
+                    value = compute()
+                    if value and deadlines.cuts() == cuts:
+                        self.set(key, value, ttl_seconds)
+                    return value
+                finally:
+                    self._release_lease(key, owner)
+
+            # Out of time while another process computes it
+            if deadlines.expired():
+                deadlines.mark_partial(self.namespace)
+                return None
+            waited = True
+            time.sleep(self.poll_interval)
+
+    def __len__(self):
+        row = _connect(self.path).execute(
+            'SELECT COUNT(*) FROM entries WHERE namespace = ? AND expires_at > ?',
+            (self.namespace, time.time())
+        ).fetchone()
+        return row[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'computed': self.computed,
+                'coalesced': self.coalesced
+            }
+        stats['entries'] = len(self)
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
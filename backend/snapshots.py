@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered API responses served from disk.
+
+A build writes every response into a new version directory, then points
+the CURRENT file at it with os.replace. Readers see either the old
+version or the new one, never a mix. Each file is stored as JSON and
+gzipped JSON, so serving it costs a file read. The newest `keep`
+versions are kept for readers that still hold an older pointer.
+
+Builds normally run in the app's background thread (SNAPSHOT_INTERVAL).
+To build once from cron or a deploy script instead:
+
+    python snapshots.py
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+POINTER = 'CURRENT'
+MANIFEST = 'MANIFEST.json'
+BUILDING_PREFIX = '.building-'
+
+_UNSAFE = re.compile(r'[^a-z0-9_-]+')
+
+
+def snapshot_name(endpoint, *parts, fields=''):
+    """Relative path of a pre-rendered response, e.g. subtopic/business/business_tesla_0/casual.json."""
+    safe = [_UNSAFE.sub('_', str(part).lower()) for part in parts]
+    if fields:
+        safe[-1] += '.' + _UNSAFE.sub('_', fields.lower())
+    return '/'.join([endpoint] + safe) + '.json'
+
+
+class SnapshotWriter:
+    """Files of one snapshot being built; use as a context manager to commit or discard it."""
+
+    def __init__(self, store):
+        self.store = store
+        self.version = datetime.now(timezone.utc).strftime('v%Y%m%dT%H%M%S') + f"-{os.getpid()}"
+        self.directory = os.path.join(store.root, BUILDING_PREFIX + self.version)
+        self.files = 0
+        os.makedirs(self.directory)
+
+    def write(self, name, body):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=9))
+        self.files += 1
+
+    def commit(self):
+        """Make this the live snapshot."""
+        with open(os.path.join(self.directory, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'built_at': time.time(), 'files': self.files}, f)
+        os.rename(self.directory, os.path.join(self.store.root, self.version))
+        self.store.swap(self.version)
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+
+class SnapshotStore:
+    """Versioned directory of pre-rendered responses under `root`.
+
+    Snapshots older than `max_age` seconds are not served, so a forgotten
+    snapshot cannot shadow live data indefinitely.
+    """
+
+    def __init__(self, root, max_age=3600, keep=2, check_seconds=1.0):
+        self.root = root
+        self.max_age = max_age
+        self.keep = keep
+        self.check_seconds = check_seconds
+        self._current = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'builds': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def current(self):
+        """Manifest of the live snapshot (with its directory), or None if there is none."""
+        now = time.monotonic()
+        with self._lock:
+            # Re-read the pointer at most every check_seconds
+            if now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                self._current = self._load(self._current)
+            current = self._current
+        if current is None or time.time() - current['built_at'] > self.max_age:
+            return None
+        return current
+
+    def _load(self, previous):
+        try:
+            with open(os.path.join(self.root, POINTER), encoding='utf-8') as f:
+                version = f.read().strip()
+            if previous is not None and previous['version'] == version:
+                return previous
+            directory = os.path.join(self.root, version)
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+                return dict(json.load(f), directory=directory)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, snapshot, name, gzip_ok=False):
+        """(body, content_encoding) of a file in `snapshot`, or None if it was not pre-rendered."""
+        path = os.path.join(snapshot['directory'], name)
+        candidates = [(path + '.gz', 'gzip'), (path, None)] if gzip_ok else [(path, None)]
+        for candidate, encoding in candidates:
+            try:
+                with open(candidate, 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                continue
+            self._count('hits')
+            return body, encoding
+        self._count('misses')
+        return None
+
+    def miss(self):
+        self._count('misses')
+
+    def begin(self):
+        os.makedirs(self.root, exist_ok=True)
+        return SnapshotWriter(self)
+
+    def swap(self, version):
+        """Atomically point CURRENT at `version` and drop versions beyond `keep`."""
+        tmp_path = os.path.join(self.root, f"{POINTER}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, POINTER))
+        with self._lock:
+            self._checked_at = 0.0
+            self._stats['builds'] += 1
+        self._prune(version)
+
+    def _prune(self, current):
+        versions = sorted(name for name in os.listdir(self.root) if name.startswith('v'))
+        for name in versions[:-self.keep]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        # Builds that crashed halfway
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(BUILDING_PREFIX) and time.time() - os.path.getmtime(path) > 3600:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def build_lock(self):
+        """Open file holding an exclusive build lock, or None if another process is building."""
+        os.makedirs(self.root, exist_ok=True)
+        lock_file = open(os.path.join(self.root, '.lock'), 'w')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def age(self):
+        """Seconds since the live snapshot was built (None if there is none)."""
+        current = self._load(None)
+        return None if current is None else time.time() - current['built_at']
+
+    def stats(self):
+        current = self.current()
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                version=current['version'] if current else None,
+                files=current['files'] if current else 0
+            )
+
+
+if __name__ == '__main__':
+    from app import build_snapshot, snapshot_store
+
+    if snapshot_store is None:
+        raise SystemExit('Snapshots are disabled (set SNAPSHOT_DIR)')
+    version = build_snapshot()
+    print(f"Built snapshot {version} in {snapshot_store.root}" if version else "Another process is building a snapshot")
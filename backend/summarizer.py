@@ -0,0 +1,122 @@
+"""
+Local extractive summaries, computed for a whole batch of articles at once.
+
+Sentences are weighted with TF-IDF, where document frequency is counted
+over the batch's articles. Each sentence is scored by cosine similarity
+to its article's centroid, plus bonuses for headline terms and for lead
+sentences. The best sentences are kept in their original order.
+
+Scoring works on flat (sentence, term, weight) arrays with numpy, so
+the cost of a batch is a handful of array operations. There are no
+per-sentence Python loops and no dense sentence x vocabulary matrix.
+"""
+
+import re
+
+import numpy as np
+
+from prompts import STOPWORDS, article_text, split_sentences
+
+_TERM = re.compile(r"[a-z][a-z0-9']{2,}")
+
+MAX_SENTENCES_PER_ARTICLE = 40
+MIN_SENTENCE_WORDS = 5
+TITLE_WEIGHT = 0.3
+LEAD_WEIGHT = 0.2
+
+
+def _terms(text):
+    return [term for term in _TERM.findall(text.lower()) if term not in STOPWORDS]
+
+
+def _shorten(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0].rstrip(',;:') + '...'
+
+
+def summarize_batch(articles, max_sentences=2, max_chars=320, text_of=article_text, redundancy=0.7):
+    """Extractive summary for each article ('' when it has no usable sentences).
+
+    A candidate is skipped if more than `redundancy` of the terms of it or of
+    an already chosen sentence (whichever is shorter) are shared, which
+    catches a description repeated in the article's lead.
+    """
+    owners, positions, sentences, term_sets = [], [], [], []
+    rows, cols, title_keys = [], [], []
+    vocabulary = {}
+    for a, article in enumerate(articles):
+        candidates = [
+            sentence for sentence in split_sentences(text_of(article))
+            if len(sentence.split()) >= MIN_SENTENCE_WORDS
+        ][:MAX_SENTENCES_PER_ARTICLE]
+        for position, sentence in enumerate(candidates):
+            terms = _terms(sentence)
+            row = len(sentences)
+            owners.append(a)
+            positions.append(position)
+            sentences.append(sentence)
+            term_sets.append(set(terms))
+            for term in terms:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+        title_keys.extend({(a, vocabulary[term]) for term in _terms(article.get('title', '')) if term in vocabulary})
+
+    summaries = [''] * len(articles)
+    if not rows:
+        return summaries
+
+    n_articles, n_terms = len(articles), len(vocabulary)
+    owners = np.array(owners, dtype=np.int64)
+    positions = np.array(positions, dtype=np.float64)
+
+    # One entry per (sentence, term) with its count
+    keys, tf = np.unique(np.array(rows, dtype=np.int64) * n_terms + np.array(cols, dtype=np.int64),
+                         return_counts=True)
+    rows, cols = keys // n_terms, keys % n_terms
+    entry_articles = owners[rows]
+
+    # Document frequency over articles, and the (article, term) cell of each entry
+    cells, cell_of_entry = np.unique(entry_articles * n_terms + cols, return_inverse=True)
+    df = np.bincount(cells % n_terms, minlength=n_terms)
+    idf = np.log((1 + n_articles) / (1 + df)) + 1.0
+
+    weights = (1.0 + np.log(tf)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(sentences)))
+    weights /= norms[rows]
+
+    # Article centroids are the sums of their sentences' unit vectors
+    centroid = np.bincount(cell_of_entry, weights=weights, minlength=len(cells))
+    centroid_norms = np.sqrt(np.bincount(cells // n_terms, weights=centroid ** 2, minlength=n_articles))
+    similarity = np.bincount(rows, weights=weights * centroid[cell_of_entry], minlength=len(sentences))
+    similarity /= np.maximum(centroid_norms[owners], 1e-12)
+
+    title_terms = np.bincount(np.array([a for a, _ in title_keys], dtype=np.int64), minlength=n_articles)
+    in_title = np.isin(entry_articles * n_terms + cols,
+                       np.array([a * n_terms + term for a, term in title_keys], dtype=np.int64))
+    title_overlap = np.bincount(rows, weights=in_title, minlength=len(sentences)) / np.maximum(title_terms[owners], 1)
+
+    scores = similarity + TITLE_WEIGHT * title_overlap + LEAD_WEIGHT / (1.0 + positions)
+
+    # Sentences are grouped by article; pick the best few of each
+    starts = np.searchsorted(owners, np.arange(n_articles), side='left')
+    ends = np.searchsorted(owners, np.arange(n_articles), side='right')
+    for a in range(n_articles):
+        chosen = []
+        for row in starts[a] + np.argsort(-scores[starts[a]:ends[a]], kind='stable'):
+            terms = term_sets[row]
+            if any(len(terms & term_sets[other]) > redundancy * min(len(terms), len(term_sets[other])) for other in chosen):
+                continue
+            chosen.append(row)
+            if len(chosen) == max_sentences:
+                break
+        if not chosen:
+            continue
+        text = ''
+        for row in sorted(chosen):
+            candidate = f"{text} {sentences[row]}".strip()
+            if text and len(candidate) > max_chars:
+                break
+            text = candidate
+        summaries[a] = _shorten(text, max_chars)
+    return summaries
@@ -0,0 +1,276 @@
+"""
+Streaming trend detection over ingested articles in constant memory.
+
+Keywords and entities from each article are counted in a ring of
+time buckets (by publish time), each holding a count-min sketch. A small
+Bloom filter per bucket skips articles that were already counted, since
+the same articles are re-fetched and re-processed many times. Candidate
+terms are kept in a bounded LRU set. Velocity compares the rate in the
+most recent buckets with the rate over the rest of the window.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+ALL_TOPICS = '*'
+
+STOPWORDS = {
+    'that', 'this', 'with', 'from', 'have', 'will', 'would', 'there', 'their', 'about',
+    'which', 'when', 'what', 'were', 'been', 'they', 'said', 'says', 'into', 'than',
+    'more', 'also', 'after', 'over', 'could', 'just', 'some', 'other', 'such', 'your',
+    'year', 'years', 'new', 'news', 'first', 'last', 'most', 'many', 'much', 'very',
+    'week', 'today', 'while', 'where', 'here', 'them', 'then', 'these', 'those', 'only',
+    'being', 'does', 'make', 'makes', 'made', 'like', 'back', 'still', 'even', 'because'
+}
+
+# Capitalized words that start sentences rather than name things
+ENTITY_STOPWORDS = {'The', 'A', 'An', 'In', 'On', 'At', 'For', 'And', 'But', 'How', 'Why', 'What',
+                    'Who', 'When', 'This', 'That', 'It', 'Its', 'As', 'By', 'Is', 'Are', 'After', 'New'}
+
+_ENTITY = re.compile(r"\b[A-Z][\w&'-]*(?:\s+[A-Z][\w&'-]*)*")
+_KEYWORD = re.compile(r"[a-z][a-z0-9'-]{3,}")
+
+MAX_TERMS_PER_ARTICLE = 30
+
+
+def extract_terms(title, description=''):
+    """Keywords ('k:...') and entities ('e:...') mentioned in an article."""
+    text = f"{title}. {description}"
+    terms = []
+    entity_words = set()
+    for match in _ENTITY.findall(text):
+        words = [word for word in match.split() if word not in ENTITY_STOPWORDS]
+        if words and (len(words) > 1 or len(words[0]) > 2):
+            terms.append('e:' + ' '.join(words).strip("'-"))
+            entity_words.update(word.lower() for word in words)
+    for word in _KEYWORD.findall(text.lower()):
+        # Words of an entity are already counted as part of it
+        if word not in STOPWORDS and word not in entity_words:
+            terms.append('k:' + word.strip("'-"))
+    return list(dict.fromkeys(terms))[:MAX_TERMS_PER_ARTICLE]
+
+
+def _hashes(key, count):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * count).digest()
+    return [int.from_bytes(digest[i * 4:i * 4 + 4], 'little') for i in range(count)]
+
+
+class CountMinSketch:
+    """Approximate counts (never under-estimated) in width x depth counters."""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('I', bytes(4 * width)) for _ in range(depth)]
+
+    def indexes(self, key):
+        return [h % self.width for h in _hashes(key, self.depth)]
+
+    def add(self, indexes, count=1):
+        for row, i in zip(self.rows, indexes):
+            row[i] += count
+
+    def estimate(self, indexes):
+        return min(row[i] for row, i in zip(self.rows, indexes))
+
+    def clear(self):
+        for row in self.rows:
+            row[:] = array('I', bytes(4 * self.width))
+
+    def memory_bytes(self):
+        return sum(row.itemsize * len(row) for row in self.rows)
+
+
+class BloomFilter:
+    def __init__(self, bits=1 << 16, hashes=4):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(bits // 8)
+
+    def add(self, key):
+        """Add `key`; returns False if it was (probably) already present."""
+        present = True
+        for h in _hashes(key, self.hashes):
+            i = h % self.bits
+            if not self.data[i >> 3] & (1 << (i & 7)):
+                present = False
+                self.data[i >> 3] |= 1 << (i & 7)
+        return not present
+
+    def clear(self):
+        self.data[:] = bytes(len(self.data))
+
+
+class _Bucket:
+    def __init__(self, width, depth, bloom_bits):
+        self.epoch = None
+        self.sketch = CountMinSketch(width, depth)
+        self.seen = BloomFilter(bloom_bits)
+        self.articles = 0
+
+    def reset(self, epoch):
+        self.epoch = epoch
+        self.sketch.clear()
+        self.seen.clear()
+        self.articles = 0
+
+
+def _published_at(article, now):
+    try:
+        published = datetime.fromisoformat(article.get('publishedAt', '').replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return now
+    return min(published, now)
+
+
+class TrendEngine:
+    def __init__(self, bucket_seconds=300, buckets=24, recent_buckets=3,
+                 width=2048, depth=4, max_candidates=2000, bloom_bits=1 << 16):
+        self.bucket_seconds = bucket_seconds
+        self.recent_buckets = recent_buckets
+        self.max_candidates = max_candidates
+        self._buckets = [_Bucket(width, depth, bloom_bits) for _ in range(buckets)]
+        self._candidates = OrderedDict()  # scoped term -> None, least recently seen first
+        self._lock = threading.Lock()
+        self.counted = 0
+        self.duplicates = 0
+        self.too_old = 0
+
+    def _epoch(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def add_article(self, article, now=None):
+        """Count an article's terms once, in the bucket of its publish time."""
+        now = time.time() if now is None else now
+        epoch = self._epoch(_published_at(article, now))
+        if epoch <= self._epoch(now) - len(self._buckets):
+            self.too_old += 1
+            return False
+
+        key = article.get('url') or article.get('title', '')
+        topic = (article.get('topic') or ALL_TOPICS).lower()
+        with self._lock:
+            bucket = self._buckets[epoch % len(self._buckets)]
+            if bucket.epoch is not None and bucket.epoch > epoch:
+                self.too_old += 1
+                return False
+            if bucket.epoch != epoch:
+                bucket.reset(epoch)
+            if not bucket.seen.add(key):
+                self.duplicates += 1
+                return False
+            bucket.articles += 1
+            for term in extract_terms(article.get('title', ''), article.get('description', '')):
+                for scope in {ALL_TOPICS, topic}:
+                    scoped = f"{scope}\t{term}"
+                    bucket.sketch.add(bucket.sketch.indexes(scoped))
+                    self._candidates[scoped] = None
+                    self._candidates.move_to_end(scoped)
+            while len(self._candidates) > self.max_candidates:
+                self._candidates.popitem(last=False)
+            self.counted += 1
+            return True
+
+    def trending(self, topic=None, limit=20, min_recent=2, now=None):
+        """Terms ranked by velocity: how much faster they appear recently than before.
+
+        velocity = (recent rate - baseline rate) / (baseline rate + 1), with
+        rates in mentions per bucket; 0 means steady.
+        """
+        now = time.time() if now is None else now
+        current = self._epoch(now)
+        window = len(self._buckets)
+        scope = (topic or ALL_TOPICS).lower()
+        results = []
+        with self._lock:
+            live = [bucket for bucket in self._buckets
+                    if bucket.epoch is not None and current - window < bucket.epoch <= current]
+            recent = [bucket for bucket in live if bucket.epoch > current - self.recent_buckets]
+            baseline = [bucket for bucket in live if bucket.epoch <= current - self.recent_buckets]
+            for scoped in self._candidates:
+                term_scope, term = scoped.split('\t', 1)
+                if term_scope != scope:
+                    continue
+                indexes = self._buckets[0].sketch.indexes(scoped)
+                recent_count = sum(bucket.sketch.estimate(indexes) for bucket in recent)
+                if recent_count < min_recent:
+                    continue
+                baseline_count = sum(bucket.sketch.estimate(indexes) for bucket in baseline)
+                recent_rate = recent_count / self.recent_buckets
+                baseline_rate = baseline_count / (window - self.recent_buckets)
+                results.append({
+                    'term': term[2:],
+                    'type': 'entity' if term.startswith('e:') else 'keyword',
+                    'recent_count': recent_count,
+                    'window_count': recent_count + baseline_count,
+                    'velocity': round((recent_rate - baseline_rate) / (baseline_rate + 1), 3)
+                })
+        results.sort(key=lambda item: (item['velocity'], item['recent_count']), reverse=True)
+        return results[:limit]
+
+    def _layout(self):
+        sketch = self._buckets[0].sketch
+        return [self.bucket_seconds, len(self._buckets), sketch.width, sketch.depth, self._buckets[0].seen.bits]
+
+    def export_state(self):
+        """(state, blob): bucket epochs and candidate terms, and the raw counters and Bloom filters of every bucket."""
+        with self._lock:
+            state = {
+                'layout': self._layout(),
+                'buckets': [[bucket.epoch, bucket.articles] for bucket in self._buckets],
+                'candidates': list(self._candidates)
+            }
+            blob = b''.join(
+                b''.join(row.tobytes() for row in bucket.sketch.rows) + bytes(bucket.seen.data)
+                for bucket in self._buckets
+            )
+        return state, blob
+
+    def restore_state(self, state, blob):
+        """Load exported counts into an engine that has not counted anything yet.
+
+        Returns the number of candidate terms loaded (0 if the engine is in use or
+        was exported with other dimensions). Buckets outside the window are
+        ignored by trending() and reset when reused, as usual.
+        """
+        first = self._buckets[0]
+        bucket_bytes = first.sketch.memory_bytes() + len(first.seen.data)
+        if state['layout'] != self._layout() or len(blob) != bucket_bytes * len(self._buckets):
+            return 0
+        view = memoryview(blob)
+        offset = 0
+        with self._lock:
+            if self.counted or self._candidates:
+                return 0
+            for bucket, (epoch, articles) in zip(self._buckets, state['buckets']):
+                for i, row in enumerate(bucket.sketch.rows):
+                    size = row.itemsize * len(row)
+                    bucket.sketch.rows[i] = array('I')
+                    bucket.sketch.rows[i].frombytes(view[offset:offset + size])
+                    offset += size
+                size = len(bucket.seen.data)
+                bucket.seen.data[:] = view[offset:offset + size]
+                offset += size
+                bucket.epoch = epoch
+                bucket.articles = articles
+            self._candidates = OrderedDict.fromkeys(state['candidates'])
+            return len(self._candidates)
+
+    def window_seconds(self):
+        return self.bucket_seconds * len(self._buckets)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'articles_counted': self.counted,
+                'duplicates_skipped': self.duplicates,
+                'too_old': self.too_old,
+                'candidates': len(self._candidates),
+                'window_seconds': self.window_seconds(),
+                'sketch_bytes': sum(bucket.sketch.memory_bytes() + len(bucket.seen.data) for bucket in self._buckets)
+            }
@@ -0,0 +1,193 @@
+"""
+Warm-restart files for state that lives in process memory.
+
+The SQLite shared cache already outlives the process, so fetched pools,
+summaries and conversations survive a restart. Rooms (with the messages
+appended to their conversations), the chat answer cache and the trend
+sketches do not. Each worker writes them to its own file every few
+minutes and at exit. A new worker restores the sections of every recent
+file in a background thread, so neither startup nor the first requests
+wait for it. Sections that cannot merge with entries added meanwhile can
+instead be restored up front with restore(names).
+
+File layout (little-endian prefix):
+
+    b'PLZW' | format version (u16) | header length (u32) | header (JSON) | sections
+
+The header records when, by which process and with which byte order the
+file was saved, plus each section's offset and compressed lengths. A
+section is zlib-compressed JSON, optionally followed by a zlib-compressed
+binary blob. Files are memory-mapped and a section is only decompressed
+when it is restored. Files with another magic, version or byte order are
+skipped. Expiry times inside sections are wall-clock timestamps, so
+entries that expired while the process was down are dropped on restore.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+MAGIC = b'PLZW'
+FORMAT_VERSION = 1
+SUFFIX = '.plzw'
+
+_PREFIX = struct.Struct('<4sHI')
+
+
+class WarmState:
+    """Named sections of in-process state, saved to and restored from files under `directory`.
+
+    Files older than `max_age` seconds are neither restored nor kept.
+    `default` is the json.dumps hook for objects inside exported state.
+    """
+
+    def __init__(self, directory, max_age=7200, default=None):
+        self.directory = directory
+        self.max_age = max_age
+        self.default = default
+        self._sections = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'saves': 0, 'last_saved_at': None, 'last_save_bytes': 0, 'last_save_ms': 0.0,
+            'files_restored': 0, 'files_skipped': 0, 'restored': {}, 'restore_ms': None
+        }
+
+    def register(self, name, export, restore):
+        """Add a section.
+
+        `export()` returns JSON-serializable state, or a (state, blob) tuple with
+        raw bytes. `restore(state, blob)` applies it and returns the number of
+        entries it added.
+        """
+        self._sections[name] = (export, restore)
+
+    def path(self):
+        return os.path.join(self.directory, f"worker-{os.getpid()}{SUFFIX}")
+
+    def save(self):
+        """Write every section to this process's file, replacing it atomically. Returns the file size."""
+        started = time.perf_counter()
+        header = {'saved_at': time.time(), 'pid': os.getpid(), 'byteorder': sys.byteorder, 'sections': {}}
+        bodies = []
+        offset = 0
+        for name, (export, _) in self._sections.items():
+            exported = export()
+            state, blob = exported if isinstance(exported, tuple) else (exported, b'')
+            body = zlib.compress(json.dumps(state, separators=(',', ':'), default=self.default).encode('utf-8'))
+            packed = zlib.compress(blob) if blob else b''
+            header['sections'][name] = {'offset': offset, 'state': len(body), 'blob': len(packed)}
+            bodies += [body, packed]
+            offset += len(body) + len(packed)
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for body in bodies:
+                f.write(body)
+        os.replace(tmp_path, path)
+        self._prune()
+
+        size = _PREFIX.size + len(header_bytes) + offset
+        with self._lock:
+            self._stats.update(
+                saves=self._stats['saves'] + 1,
+                last_saved_at=header['saved_at'],
+                last_save_bytes=size,
+                last_save_ms=round((time.perf_counter() - started) * 1000, 1)
+            )
+        return size
+
+    def _files(self):
+        """Recent state files, newest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(SUFFIX)]
+        except FileNotFoundError:
+            return []
+        now = time.time()
+        files = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if now - mtime <= self.max_age:
+                files.append((mtime, path))
+        return [path for _, path in sorted(files, reverse=True)]
+
+    def _prune(self):
+        # Files of processes that stopped saving, and temporary files of interrupted saves
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _header(self, data):
+        """(header, sections_start) of a mapped file, or None if it cannot be used."""
+        if len(data) < _PREFIX.size:
+            return None
+        magic, version, length = _PREFIX.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        header = json.loads(data[_PREFIX.size:_PREFIX.size + length])
+        if header['byteorder'] != sys.byteorder or time.time() - header['saved_at'] > self.max_age:
+            return None
+        return header, _PREFIX.size + length
+
+    def restore(self, names=None):
+        """Restore the registered sections (or only `names`) from recent files, newest first.
+
+        Returns entries added per section. Sections only add entries they do
+        not hold yet, so the newest copy of an entry wins.
+        """
+        started = time.perf_counter()
+        sections = {name: section for name, section in self._sections.items() if names is None or name in names}
+        restored = dict.fromkeys(sections, 0)
+        files_restored = files_skipped = 0
+        for path in self._files():
+            try:
+                with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    found = self._header(data)
+                    if found is None:
+                        files_skipped += 1
+                        continue
+                    header, start = found
+                    for name, (_, restore) in sections.items():
+                        section = header['sections'].get(name)
+                        if section is None:
+                            continue
+                        offset = start + section['offset']
+                        state = json.loads(zlib.decompress(data[offset:offset + section['state']]))
+                        offset += section['state']
+                        blob = zlib.decompress(data[offset:offset + section['blob']]) if section['blob'] else b''
+                        restored[name] += restore(state, blob)
+                files_restored += 1
+            except (OSError, ValueError, KeyError, zlib.error) as e:
+                print(f"Warning: could not restore warm state from {path}: {e}")
+                files_skipped += 1
+
+        with self._lock:
+            self._stats.update(
+                files_restored=self._stats['files_restored'] + files_restored,
+                files_skipped=self._stats['files_skipped'] + files_skipped,
+                restored=dict(self._stats['restored'], **restored),
+                restore_ms=round((self._stats['restore_ms'] or 0.0) + (time.perf_counter() - started) * 1000, 1)
+            )
+        return restored
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, directory=self.directory, sections=list(self._sections))
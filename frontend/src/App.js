@@ -88,7 +88,8 @@ function Plaza() {
       try {
         setIsLoading(true);
         
-        const response = await fetch(`${API_BASE_URL}/api/subtopics/${topic.category}`);
+        const style = localStorage.getItem("conversationStyle") || "casual";
+        const response = await fetch(`${API_BASE_URL}/api/subtopics/${topic.category}?style=${style}&fields=id,title`);
         
         if (!response.ok) {
           throw new Error(`Backend API error: ${response.status}`);
@@ -200,7 +201,10 @@ function SubPlaza() {
   const [isLoading, setIsLoading] = useState(true);
   const [articles, setArticles] = useState([]);
   const [subtopic, setSubtopic] = useState(null);
-  const [conversationStyle, setConversationStyle] = useState("casual");
+  const [conversationStyle, setConversationStyle] = useState(
+    () => localStorage.getItem("conversationStyle") || "casual"
+  );
+  const [chatSessionId, setChatSessionId] = useState(null);
   const [isPlaying, setIsPlaying] = useState(false);
   const messagesEndRef = useRef(null);
 
@@ -339,6 +343,11 @@ function SubPlaza() {
     };
   };
 
+  // Remember the style so subtopic listings can prefetch conversations in it
+  useEffect(() => {
+    localStorage.setItem("conversationStyle", conversationStyle);
+  }, [conversationStyle]);
+
   // Fetch subtopic data
   useEffect(() => {
     const fetchSubtopicData = async () => {
@@ -347,7 +356,7 @@ function SubPlaza() {
       try {
         setIsLoading(true);
         
-        const response = await fetch(`${API_BASE_URL}/api/subtopic/${topic.category}/${subtopicId}?style=${conversationStyle}`);
+        const response = await fetch(`${API_BASE_URL}/api/subtopic/${topic.category}/${subtopicId}?style=${conversationStyle}&fields=-content,-bias_analysis`);
         
         if (!response.ok) {
           throw new Error(`Backend API error: ${response.status}`);
@@ -359,6 +368,7 @@ function SubPlaza() {
           setSubtopic(data.subtopic);
           setArticles(data.articles || []);
           setMessages(data.conversation || []);
+          setChatSessionId(null);
         } else {
           throw new Error(`Backend error: ${data.message || 'Invalid response'}`);
         }
@@ -381,6 +391,19 @@ function SubPlaza() {
     fetchSubtopicData();
   }, [topicId, subtopicId, topic, conversationStyle]);
 
+  // Subscribe to the shared room so new messages show up for every viewer
+  useEffect(() => {
+    if (!subtopic || !topic?.category) return;
+
+    const source = new EventSource(`${API_BASE_URL}/api/rooms/${topic.category}/${subtopicId}/stream?style=${conversationStyle}`);
+    source.addEventListener('messages', (event) => {
+      const newMessages = JSON.parse(event.data);
+      setMessages(prev => [...prev, ...newMessages]);
+    });
+
+    return () => source.close();
+  }, [subtopic, subtopicId, topic, conversationStyle]);
+
 
   if (!topic) {
     return (
@@ -391,15 +414,56 @@ function SubPlaza() {
     );
   }
 
+  // Create a server-side chat session holding the article context
+  const createChatSession = async () => {
+    const response = await fetch(`${API_BASE_URL}/api/chat/session`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        topic: topic?.title || '',
+        category: topic?.category || '', // rooms are keyed by category, not the display title
+        subtopic: subtopic?.title || '',
+        subtopic_id: subtopicId,
+        articles: articles,
+        history: messages.slice(-5), // Used when the server has no copy of the conversation
+        style: conversationStyle
+      })
+    });
+
+    if (!response.ok) {
+      throw new Error(`Backend API error: ${response.status}`);
+    }
+
+    const data = await response.json();
+    setChatSessionId(data.session_id);
+    return data.session_id;
+  };
+
+  const sendChatMessage = (sessionId, text) => fetch(`${API_BASE_URL}/api/chat`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      message: text,
+      session_id: sessionId,
+      subtopic_id: subtopicId,
+      style: conversationStyle
+    })
+  });
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!inputValue.trim() || isTyping) return;
+    const text = inputValue.trim();
 
     const userMessage = {
       id: Date.now(),
       speaker: "You",
       side: "right",
-      text: inputValue.trim(),
+      text: text,
       isUser: true,
       timestamp: new Date().toISOString()
     };
@@ -409,21 +473,14 @@ function SubPlaza() {
     setIsTyping(true);
 
     try {
-      // Send message to backend for AI response
-      const response = await fetch(`${API_BASE_URL}/api/chat`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          message: inputValue.trim(),
-          topic: topic?.title || '',
-          subtopic: subtopic?.title || '',
-          articles: articles,
-          history: messages.slice(-5), // Last 5 messages for context
-          style: conversationStyle
-        })
-      });
+      // Send only the new message; the session holds context and history
+      const sessionId = chatSessionId || await createChatSession();
+      let response = await sendChatMessage(sessionId, text);
+
+      if (response.status === 404) {
+        // Session expired on the server, start a new one and retry once
+        response = await sendChatMessage(await createChatSession(), text);
+      }
 
       if (!response.ok) {
         throw new Error(`Backend API error: ${response.status}`);